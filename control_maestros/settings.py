@@ -36,6 +36,7 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
+    'gestion_escolar.middleware.RendimientoMiddleware',  # Tiempos y consultas por vista (Ajustes > Rendimiento)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -157,4 +158,60 @@ else:
 # Si GOOGLE_SHEET_ID y GOOGLE_SHEET_WORKSHEET_NAME no son secretos, pueden estar aquí directamente.
 # Si son sensibles, se recomienda cargarlos también desde variables de entorno.
 GOOGLE_SHEET_ID = os.getenv('GOOGLE_SHEET_ID', '1Svs7eClLiHezipj9RnV_Q8yNuxJbxew--OqKemOeoSs') # Usar valor por defecto si no está en .env
-GOOGLE_SHEET_WORKSHEET_NAME = os.getenv('GOOGLE_SHEET_WORKSHEET_NAME', 'DatosVacancias') # Usar valor por defecto si no está en .env
\ No newline at end of file
+GOOGLE_SHEET_WORKSHEET_NAME = os.getenv('GOOGLE_SHEET_WORKSHEET_NAME', 'DatosVacancias') # Usar valor por defecto si no está en .env
+# Destino de las filas de vacancias (ver gestion_escolar/hojas_calculo.py): 'google' o 'csv'
+# ('csv' escribe en un archivo local, para trabajar sin conexión ni credenciales).
+GOOGLE_SHEETS_DESTINO = os.getenv('GOOGLE_SHEETS_DESTINO', 'google')
+GOOGLE_SHEETS_ARCHIVO_LOCAL = os.getenv('GOOGLE_SHEETS_ARCHIVO_LOCAL', os.path.join(BASE_DIR, 'tramites_generados', 'google_sheets_local.csv'))
+GOOGLE_SHEETS_REINTENTOS = 5  # reintentos ante errores de cuota (429) o temporales del servidor
+GOOGLE_SHEETS_ESPERA_BASE = 1.0  # segundos; la espera se duplica en cada reintento
+# Caché
+# LocMemCache es local a cada proceso: con varios procesos de servidor conviene un backend
+# compartido (Redis, Memcached o DatabaseCache) para que las invalidaciones por señales
+# lleguen a todos ellos.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'control-maestros',
+    }
+}
+
+# Conteos de las tablas DataTables (ver gestion_escolar/datatables.py)
+DATATABLES_CONTEO_TTL = 300  # segundos que se conserva un conteo en caché
+# Si se define, los conteos filtrados por encima de este número se estiman con el
+# planificador (solo PostgreSQL) en lugar de ejecutar COUNT(*).
+DATATABLES_CONTEO_ESTIMADO_MINIMO = int(os.getenv('DATATABLES_CONTEO_ESTIMADO_MINIMO', 0)) or None
+
+# Prelaciones por CURP que cada proceso conserva en memoria (ver gestion_escolar/identificadores.py).
+# Con LocMemCache las invalidaciones no llegan a otros procesos; el TTL acota cuánto tardan en verlas.
+PRELACIONES_CACHE_TAMANO = 2048
+PRELACIONES_CACHE_TTL = 300
+
+# Tema activo y conteo de alertas por usuario en caché (ver gestion_escolar/context_processors.py).
+# Las señales los invalidan; el TTL acota lo que tarda otro proceso en enterarse.
+CONTEXTO_CACHE_TTL = 300
+
+# Generación de documentos Word por lote (ver gestion_escolar/plantillas_word.py)
+# Procesos para renderizar en paralelo; 1 desactiva el pool. Por defecto, hasta 4 según los CPU.
+WORD_PROCESOS_RENDER = int(os.getenv('WORD_PROCESOS_RENDER', 0)) or None
+# Cada proceso 'spawn' tarda ~0.7 s en arrancar (importar Django y docxtpl) y un documento
+# ~20 ms en renderizarse: con menos documentos que esto el pool no alcanza a compensar.
+WORD_MINIMO_LOTE_PARALELO = 100
+
+# Trabajos en segundo plano (ver gestion_escolar/trabajos.py y `manage.py run_workers`)
+TRABAJOS_INTERVALO = 2  # segundos entre consultas a la cola cuando está vacía
+# Un trabajo EJECUTANDO sin señal del trabajador en este tiempo se considera abandonado
+# (el proceso se cerró o el equipo se reinició) y vuelve a la cola.
+TRABAJOS_ABANDONO_SEGUNDOS = 600
+TRABAJOS_MAX_INTENTOS = 3
+# Con TRABAJOS_SINCRONOS=1 los trabajos se ejecutan en la misma petición que los encola,
+# útil en desarrollo cuando no hay un `run_workers` corriendo.
+TRABAJOS_SINCRONOS = os.getenv('TRABAJOS_SINCRONOS', '0') == '1'
+
+# Instrumentación de vistas (ver gestion_escolar/rendimiento.py)
+RENDIMIENTO_ACTIVO = os.getenv('RENDIMIENTO_ACTIVO', '1') == '1'
+RENDIMIENTO_MUESTREO = 1.0  # fracción de peticiones que se guardan (el aviso de N+1 se revisa en todas)
+RENDIMIENTO_MAX_MUESTRAS = 50000  # tamaño de la tabla MuestraRendimiento
+RENDIMIENTO_UMBRAL_N1 = 10  # repeticiones de una misma consulta que se consideran N+1
+# Nombres de URL que no se guardan como muestra: trabajos.js consulta el estado cada segundo
+RENDIMIENTO_URLS_EXCLUIDAS = {'estado_trabajo'}
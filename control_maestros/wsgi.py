@@ -15,3 +15,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'control_maestros.settings')
 
 application = get_wsgi_application()
+
+# Precarga las plantillas Word de trámites y oficios en la caché del proceso
+from gestion_escolar.plantillas_word import precargar_en_segundo_plano
+
+precargar_en_segundo_plano()
@@ -3,7 +3,8 @@ from .models import (
     Tema, Zona, Escuela, Categoria, Maestro, Director, MotivoTramite, 
     PlantillaTramite, Prelacion, TipoApreciacion, LoteReporteVacancia, 
     Vacancia, Historial, DocumentoExpediente, Correspondencia, 
-    RegistroCorrespondencia, Notificacion, Pendiente, KardexMovimiento
+    RegistroCorrespondencia, Notificacion, Pendiente, KardexMovimiento,
+    Secuencia, JobEjecucion, MuestraRendimiento
 )
 
 @admin.register(Tema)
@@ -106,4 +107,20 @@ class PendienteAdmin(admin.ModelAdmin):
 @admin.register(KardexMovimiento)
 class KardexMovimientoAdmin(admin.ModelAdmin):
     list_display = ('maestro', 'fecha', 'descripcion')
-    search_fields = ('maestro__nombres',)
\ No newline at end of file
+    search_fields = ('maestro__nombres',)
+@admin.register(Secuencia)
+class SecuenciaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'ultimo_valor')
+    search_fields = ('nombre',)
+
+@admin.register(JobEjecucion)
+class JobEjecucionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'usuario', 'completados', 'total', 'intentos', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo')
+    search_fields = ('tipo', 'usuario__username', 'mensaje')
+
+@admin.register(MuestraRendimiento)
+class MuestraRendimientoAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'nombre_url', 'metodo', 'status', 'duracion_ms', 'consultas', 'duracion_sql_ms', 'repeticiones_sql')
+    list_filter = ('metodo', 'status')
+    search_fields = ('nombre_url', 'ruta')
@@ -0,0 +1,149 @@
+"""
+Búsqueda de personal por nombre mediante un índice de trigramas.
+
+Cada Maestro guarda en la tabla TrigramaMaestro los trigramas de su nombre
+normalizado (mayúsculas y sin acentos). Una búsqueda solo consulta los trigramas
+del término, que están indexados, en lugar de recorrer toda la tabla de personal
+con LIKE '%...%'. En PostgreSQL se usa directamente la extensión pg_trgm.
+"""
+from django.db import connection
+from django.db.models import Count, OuterRef, Q, Subquery
+from unidecode import unidecode
+
+# Campos de Maestro que alimentan el índice; si un save() no toca ninguno, no se reindexa.
+CAMPOS_NOMBRE = {'nombres', 'a_paterno', 'a_materno'}
+
+# Tamaño de lote para las inserciones masivas de trigramas.
+TAMANO_LOTE = 2000
+
+
+def normalizar_texto(texto):
+    """Convierte el texto al mismo formato que Maestro.nombre_completo_unaccented."""
+    return ' '.join(unidecode(str(texto or '')).upper().split())
+
+
+def generar_trigramas(texto, relleno=True):
+    """
+    Devuelve el conjunto de trigramas del texto normalizado.
+    Con `relleno` se añaden espacios al inicio y al final (como pg_trgm), de modo que
+    las coincidencias al principio de una palabra generan trigramas adicionales.
+    """
+    texto = normalizar_texto(texto)
+    if not texto:
+        return set()
+    if relleno:
+        texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def usa_pg_trgm():
+    return connection.vendor == 'postgresql'
+
+
+def indexar_maestros(maestros):
+    """Regenera los trigramas de los maestros indicados (lista o queryset)."""
+    from .models import TrigramaMaestro
+
+    maestros = list(maestros)
+    if not maestros or usa_pg_trgm():
+        return
+
+    TrigramaMaestro.objects.filter(maestro__in=[m.pk for m in maestros]).delete()
+    nuevos = [
+        TrigramaMaestro(maestro_id=maestro.pk, trigrama=trigrama)
+        for maestro in maestros
+        for trigrama in generar_trigramas(maestro.nombre_completo_unaccented)
+    ]
+    TrigramaMaestro.objects.bulk_create(nuevos, batch_size=TAMANO_LOTE)
+
+
+def reconstruir_indice():
+    """Reconstruye el índice completo; devuelve el número de maestros indexados."""
+    from .models import Maestro, TrigramaMaestro
+
+    if usa_pg_trgm():
+        return 0
+
+    TrigramaMaestro.objects.all().delete()
+    total = 0
+    lote = []
+    for maestro in Maestro.objects.only('pk', 'nombre_completo_unaccented').iterator(chunk_size=TAMANO_LOTE):
+        lote.extend(
+            TrigramaMaestro(maestro_id=maestro.pk, trigrama=trigrama)
+            for trigrama in generar_trigramas(maestro.nombre_completo_unaccented)
+        )
+        total += 1
+        if len(lote) >= TAMANO_LOTE:
+            TrigramaMaestro.objects.bulk_create(lote, batch_size=TAMANO_LOTE)
+            lote = []
+    TrigramaMaestro.objects.bulk_create(lote, batch_size=TAMANO_LOTE)
+    return total
+
+
+def _coincidencias_trigramas(termino):
+    """
+    Agrupa por maestro los trigramas que coinciden con el término.
+    Solo quedan los maestros que contienen todos los trigramas internos del término
+    (condición necesaria para que el término sea subcadena del nombre); el puntaje
+    suma además los trigramas de borde, lo que favorece coincidencias al inicio de palabra.
+    """
+    from .models import TrigramaMaestro
+
+    requeridos = generar_trigramas(termino, relleno=False)
+    todos = requeridos | generar_trigramas(termino)
+    return (
+        TrigramaMaestro.objects.filter(trigrama__in=todos)
+        .values('maestro_id')
+        .annotate(
+            puntaje=Count('id'),
+            requeridos=Count('id', filter=Q(trigrama__in=requeridos)),
+        )
+        .filter(requeridos=len(requeridos))
+    )
+
+
+def filtro_nombre(termino, campo='pk'):
+    """
+    Devuelve un Q que limita `campo` (un pk de Maestro o una FK a Maestro) a los maestros
+    cuyo nombre contiene el término. Equivale a `nombre_completo_unaccented__contains`
+    pero resuelto con el índice de trigramas. El nombre ya se guarda normalizado, así que
+    basta con normalizar el término: LIKE sin UPPER() es el que aprovecha pg_trgm.
+    """
+    from .models import Maestro
+
+    termino = normalizar_texto(termino)
+    por_contenido = Maestro.objects.filter(nombre_completo_unaccented__contains=termino)
+    if usa_pg_trgm() or len(termino) < 3:
+        # pg_trgm acelera LIKE con su índice GIN; los términos cortos no tienen trigramas.
+        return Q(**{f'{campo}__in': por_contenido.values('pk')})
+
+    candidatos = _coincidencias_trigramas(termino).values('maestro_id')
+    return Q(**{f'{campo}__in': por_contenido.filter(pk__in=candidatos).values('pk')})
+
+
+def buscar_maestros(termino, queryset=None, limite=20):
+    """Devuelve hasta `limite` maestros cuyo nombre contiene el término, ordenados por relevancia."""
+    from .models import Maestro
+
+    termino = normalizar_texto(termino)
+    if queryset is None:
+        queryset = Maestro.objects.all()
+    queryset = queryset.filter(nombre_completo_unaccented__contains=termino)
+
+    if usa_pg_trgm():
+        from django.contrib.postgres.search import TrigramSimilarity
+        return list(
+            queryset.annotate(similitud=TrigramSimilarity('nombre_completo_unaccented', termino))
+            .order_by('-similitud', 'nombres', 'a_paterno', 'a_materno')[:limite]
+        )
+
+    if len(termino) < 3:
+        return list(queryset.order_by('nombres', 'a_paterno', 'a_materno')[:limite])
+
+    coincidencias = _coincidencias_trigramas(termino)
+    puntaje = coincidencias.filter(maestro_id=OuterRef('pk')).values('puntaje')[:1]
+    return list(
+        queryset.filter(pk__in=coincidencias.values('maestro_id'))
+        .annotate(puntaje=Subquery(puntaje))
+        .order_by('-puntaje', 'nombres', 'a_paterno', 'a_materno')[:limite]
+    )
@@ -0,0 +1,217 @@
+"""
+Índice de texto completo para Historial, RegistroCorrespondencia y FUP.
+
+Cada registro de esos modelos tiene una fila en EntradaBusqueda con su texto
+normalizado; las señales de signals.py la mantienen al día. En SQLite la tabla
+se indexa con una tabla virtual FTS5 (sincronizada por triggers creados en la
+migración) y en PostgreSQL con un índice GIN sobre su tsvector.
+"""
+from django.db import connection
+from unidecode import unidecode
+
+TIPO_HISTORIAL = 'HISTORIAL'
+TIPO_CORRESPONDENCIA = 'CORRESPONDENCIA'
+TIPO_FUP = 'FUP'
+
+TABLA_FTS = 'gestion_escolar_entradabusqueda_fts'
+
+# Permiso necesario para ver resultados de cada tipo en la búsqueda global
+PERMISOS_POR_TIPO = {
+    TIPO_HISTORIAL: 'gestion_escolar.acceder_historial',
+    TIPO_CORRESPONDENCIA: 'gestion_escolar.view_registrocorrespondencia',
+    TIPO_FUP: 'gestion_escolar.acceder_fup',
+}
+
+TAMANO_LOTE = 1000
+
+
+def _normalizar(*partes):
+    return ' '.join(unidecode(str(p)) for p in partes if p not in (None, ''))
+
+
+def _aplanar(valor):
+    """Extrae los textos de un JSON (datos_tramite) para indexarlos."""
+    if isinstance(valor, dict):
+        return ' '.join(_aplanar(v) for v in valor.values())
+    if isinstance(valor, list):
+        return ' '.join(_aplanar(v) for v in valor)
+    if valor is None or isinstance(valor, bool):
+        return ''
+    return str(valor)
+
+
+def _nombre_maestro(maestro):
+    if not maestro:
+        return ''
+    return f"{maestro.nombres or ''} {maestro.a_paterno or ''} {maestro.a_materno or ''}".strip()
+
+
+# Los constructores solo usan campos simples para que también funcionen con los
+# modelos históricos dentro de las migraciones.
+def datos_historial(item):
+    nombre = _nombre_maestro(item.maestro)
+    return {
+        'titulo': (f"{item.tipo_documento} - {nombre}" if nombre else item.tipo_documento)[:255],
+        'contenido': _normalizar(
+            item.tipo_documento, nombre, item.maestro_secundario_nombre,
+            item.motivo, item.observaciones, _aplanar(item.datos_tramite),
+        ),
+        'fecha': item.fecha_creacion.date() if item.fecha_creacion else None,
+    }
+
+
+def datos_correspondencia(item):
+    return {
+        'titulo': f"{item.tipo_documento} {item.folio_documento} - {item.remitente}".strip()[:255],
+        'contenido': _normalizar(
+            item.folio_documento, item.remitente, _nombre_maestro(item.maestro),
+            item.contenido, item.observaciones, item.quien_recibio,
+        ),
+        'fecha': item.fecha_recibido,
+    }
+
+
+def datos_fup(item):
+    return {
+        'titulo': f"FUP {item.folio or ''} - {item.nombre_completo}"[:255],
+        'contenido': _normalizar(
+            item.folio, item.nombre_completo, item.rfc, item.curp,
+            item.efectos, item.observaciones,
+        ),
+        'fecha': item.fecha,
+    }
+
+
+FUENTES = {
+    TIPO_HISTORIAL: ('Historial', datos_historial),
+    TIPO_CORRESPONDENCIA: ('RegistroCorrespondencia', datos_correspondencia),
+    TIPO_FUP: ('FUP', datos_fup),
+}
+
+TIPO_POR_MODELO = {nombre_modelo: tipo for tipo, (nombre_modelo, _) in FUENTES.items()}
+
+
+def indexar_objeto(instancia):
+    from .models import EntradaBusqueda
+
+    tipo = TIPO_POR_MODELO[type(instancia).__name__]
+    constructor = FUENTES[tipo][1]
+    EntradaBusqueda.objects.update_or_create(
+        tipo=tipo, objeto_id=instancia.pk, defaults=constructor(instancia)
+    )
+
+
+def indexar_objetos(instancias):
+    """Indexa registros recién creados con bulk_create (que no dispara post_save)."""
+    from .models import EntradaBusqueda
+
+    entradas = []
+    for instancia in instancias:
+        tipo = TIPO_POR_MODELO[type(instancia).__name__]
+        entradas.append(EntradaBusqueda(tipo=tipo, objeto_id=instancia.pk, **FUENTES[tipo][1](instancia)))
+    EntradaBusqueda.objects.bulk_create(entradas, batch_size=TAMANO_LOTE)
+
+
+def desindexar_objeto(instancia):
+    from .models import EntradaBusqueda
+
+    tipo = TIPO_POR_MODELO[type(instancia).__name__]
+    EntradaBusqueda.objects.filter(tipo=tipo, objeto_id=instancia.pk).delete()
+
+
+def poblar_indice(EntradaBusqueda, modelos):
+    """
+    Llena EntradaBusqueda a partir de `modelos` ({tipo: clase del modelo}).
+    Recibe las clases como argumento para poder usarse desde una migración.
+    """
+    total = 0
+    for tipo, modelo in modelos.items():
+        constructor = FUENTES[tipo][1]
+        queryset = modelo.objects.all()
+        if tipo != TIPO_FUP:
+            queryset = queryset.select_related('maestro')
+        lote = []
+        for instancia in queryset.iterator(chunk_size=TAMANO_LOTE):
+            lote.append(EntradaBusqueda(tipo=tipo, objeto_id=instancia.pk, **constructor(instancia)))
+            if len(lote) >= TAMANO_LOTE:
+                EntradaBusqueda.objects.bulk_create(lote)
+                total += len(lote)
+                lote = []
+        EntradaBusqueda.objects.bulk_create(lote)
+        total += len(lote)
+    return total
+
+
+def reconstruir_indice_texto():
+    from . import models
+
+    models.EntradaBusqueda.objects.all().delete()
+    modelos = {tipo: getattr(models, nombre) for tipo, (nombre, _) in FUENTES.items()}
+    return poblar_indice(models.EntradaBusqueda, modelos)
+
+
+def _terminos(texto):
+    return [t for t in unidecode(texto or '').replace('"', ' ').split() if t]
+
+
+def _consulta_fts5(terminos):
+    # Cada término entre comillas (sin operadores de FTS5) y con búsqueda por prefijo
+    return ' '.join(f'"{t}"*' for t in terminos)
+
+
+def _consulta_tsquery(terminos):
+    limpios = [''.join(c for c in t if c.isalnum()) for t in terminos]
+    return ' & '.join(f'{t}:*' for t in limpios if t)
+
+
+def _fts5_disponible():
+    return TABLA_FTS in connection.introspection.table_names()
+
+
+def buscar_texto(texto, tipos, pagina=1, por_pagina=20):
+    """
+    Busca `texto` en el índice y devuelve (entradas, total), ordenadas por relevancia.
+    `tipos` limita los resultados a esos tipos de registro (según permisos del usuario).
+    """
+    from .models import EntradaBusqueda
+
+    terminos = _terminos(texto)
+    tipos = list(tipos)
+    if not terminos or not tipos:
+        return [], 0
+
+    tabla = EntradaBusqueda._meta.db_table
+    marcadores_tipo = ', '.join(['%s'] * len(tipos))
+    desplazamiento = (pagina - 1) * por_pagina
+
+    if connection.vendor == 'postgresql':
+        consulta = _consulta_tsquery(terminos)
+        if not consulta:
+            return [], 0
+        vector = "to_tsvector('simple', coalesce(e.titulo, '') || ' ' || coalesce(e.contenido, ''))"
+        desde = f"FROM {tabla} e WHERE {vector} @@ to_tsquery('simple', %s) AND e.tipo IN ({marcadores_tipo})"
+        seleccion = f"SELECT e.id, ts_rank({vector}, to_tsquery('simple', %s)) AS rango {desde} ORDER BY rango DESC, e.fecha DESC"
+        parametros_seleccion = [consulta, consulta, *tipos]
+        parametros_conteo = [consulta, *tipos]
+    elif connection.vendor == 'sqlite' and _fts5_disponible():
+        consulta = _consulta_fts5(terminos)
+        desde = f"FROM {TABLA_FTS} JOIN {tabla} e ON e.id = {TABLA_FTS}.rowid WHERE {TABLA_FTS} MATCH %s AND e.tipo IN ({marcadores_tipo})"
+        seleccion = f"SELECT e.id, bm25({TABLA_FTS}) AS rango {desde} ORDER BY rango, e.fecha DESC"
+        parametros_seleccion = [consulta, *tipos]
+        parametros_conteo = parametros_seleccion
+    else:
+        # Sin motor de texto completo: búsqueda simple sobre el texto normalizado
+        queryset = EntradaBusqueda.objects.filter(tipo__in=tipos)
+        for termino in terminos:
+            queryset = queryset.filter(contenido__icontains=termino)
+        total = queryset.count()
+        return list(queryset.order_by('-fecha')[desplazamiento:desplazamiento + por_pagina]), total
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) {desde}", parametros_conteo)
+        total = cursor.fetchone()[0]
+        cursor.execute(f"{seleccion} LIMIT %s OFFSET %s", [*parametros_seleccion, por_pagina, desplazamiento])
+        ids = [fila[0] for fila in cursor.fetchall()]
+
+    entradas = EntradaBusqueda.objects.in_bulk(ids)
+    return [entradas[i] for i in ids if i in entradas], total
@@ -1,45 +1,93 @@
-from .models import Tema, Notificacion, Pendiente
-from django.utils import timezone
+"""
+Procesadores de contexto de todas las plantillas.
+
+El tema activo y el número de alertas de cada usuario se guardan en caché junto con
+la fecha en que se calcularon: al cambiar el día se recalculan (un tema puede empezar
+o terminar y un pendiente programado puede vencer sin que nada se guarde). Las
+señales de Tema, Notificacion y Pendiente los invalidan (ver signals.py). La lista
+de alertas no se arma en cada página; la pide la campana por AJAX al abrirla.
+"""
+from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
+from django.utils import timezone
 
-def active_theme_processor(request):
-    """
-    Añade el tema activo (si existe) al contexto de todas las plantillas.
-    """
+from .models import Tema, Notificacion, Pendiente
+
+CLAVE_TEMA = 'contexto:tema_activo'
+
+
+def _clave_alertas(usuario_id):
+    return f'contexto:alertas:{usuario_id}'
+
+
+def _ttl():
+    # Tope por si la invalidación no llega (caché local de otro proceso)
+    return getattr(settings, 'CONTEXTO_CACHE_TTL', 300)
+
+
+def invalidar_tema():
+    cache.delete(CLAVE_TEMA)
+
+
+def invalidar_alertas(usuario_id):
+    cache.delete(_clave_alertas(usuario_id))
+
+
+def obtener_tema_activo():
     today = timezone.localdate()
-    
+    guardado = cache.get(CLAVE_TEMA)
+    if guardado is not None and guardado['fecha'] == today:
+        return guardado['tema']
+
     # Busca el primer tema activo que coincida con el rango de fechas
     active_theme = Tema.objects.filter(
         activo=True,
         fecha_inicio__lte=today,
         fecha_fin__gte=today
     ).first()
-    
-    return {'active_theme': active_theme}
+    cache.set(CLAVE_TEMA, {'fecha': today, 'tema': active_theme}, _ttl())
+    return active_theme
 
-def notifications_processor(request):
-    """
-    Añade notificaciones y pendientes al contexto de todas las plantillas.
-    """
-    if not request.user.is_authenticated:
-        return {'global_alerts': [], 'total_alerts': 0}
 
+def _pendientes_vencidos(usuario, today):
+    return Pendiente.objects.filter(usuario=usuario, completado=False, fecha_programada__lte=today)
+
+
+def contar_alertas(usuario):
+    """Mensajes no leídos más pendientes vencidos o para hoy, desde la caché si es del mismo día."""
+    today = timezone.localdate()
+    clave = _clave_alertas(usuario.pk)
+    guardado = cache.get(clave)
+    if guardado is not None and guardado['fecha'] == today:
+        return guardado['total']
+
+    total = (
+        Notificacion.objects.filter(usuario=usuario, leida=False).count()
+        + _pendientes_vencidos(usuario, today).count()
+    )
+    cache.set(clave, {'fecha': today, 'total': total}, _ttl())
+    return total
+
+
+def listar_alertas(usuario):
+    """Alertas del usuario para el menú de la campana (también actualiza el conteo en caché)."""
+    today = timezone.localdate()
     global_alerts = []
-    today = timezone.now().date()
 
     # 1. Obtener notificaciones de mensajes no leídos
-    unread_messages = Notificacion.objects.filter(usuario=request.user, leida=False)
+    unread_messages = Notificacion.objects.filter(usuario=usuario, leida=False)
     for msg in unread_messages:
         global_alerts.append({
             'type': 'message',
             'text': msg.mensaje,
             'date': msg.fecha_creacion,
-            'url': reverse('correspondencia_detail', args=[msg.correspondencia.id]) if msg.correspondencia else '#'
+            # correspondencia_id evita una consulta por mensaje
+            'url': reverse('correspondencia_detail', args=[msg.correspondencia_id]) if msg.correspondencia_id else '#'
         })
 
     # 2. Obtener pendientes vencidos o para hoy
-    due_tasks = Pendiente.objects.filter(usuario=request.user, completado=False, fecha_programada__lte=today)
-    for task in due_tasks:
+    for task in _pendientes_vencidos(usuario, today):
         global_alerts.append({
             'type': 'task',
             'text': f"Pendiente: {task.titulo}",
@@ -47,4 +95,21 @@ def notifications_processor(request):
             'url': reverse('pendientes_activos')
         })
 
-    return {'global_alerts': global_alerts, 'total_alerts': len(global_alerts)}
\ No newline at end of file
+    cache.set(_clave_alertas(usuario.pk), {'fecha': today, 'total': len(global_alerts)}, _ttl())
+    return global_alerts
+
+
+def active_theme_processor(request):
+    """
+    Añade el tema activo (si existe) al contexto de todas las plantillas.
+    """
+    return {'active_theme': obtener_tema_activo()}
+
+
+def notifications_processor(request):
+    """
+    Añade el número de alertas (notificaciones y pendientes) al contexto de todas las plantillas.
+    """
+    if not request.user.is_authenticated:
+        return {'total_alerts': 0}
+    return {'total_alerts': contar_alertas(request.user)}
@@ -0,0 +1,218 @@
+"""
+Utilidades compartidas para los endpoints AJAX de DataTables (server-side).
+
+SolicitudDataTables interpreta los parámetros que envía DataTables (draw, start,
+length, búsqueda y orden) y pagina el queryset por "keyset": en lugar de
+OFFSET, la página siguiente o anterior se obtiene filtrando a partir de la
+última (o primera) fila de la página vista, de modo que las páginas profundas
+cuestan lo mismo que la primera. Los límites de la página se devuelven en un
+token firmado (`cursor`) que custom_datatables.js reenvía en la siguiente petición.
+
+Los conteos (recordsTotal/recordsFiltered) se guardan en caché por vista, alcance
+del rol y término de búsqueda. Cada modelo involucrado tiene un número de versión
+que las señales incrementan al guardar o borrar, lo que invalida sus conteos.
+Un conteo en caché o estimado puede no coincidir con las filas actuales, así que
+solo un conteo exacto de la misma petición permite paginar con OFFSET desde el final.
+"""
+import hashlib
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+from django.http import JsonResponse
+
+SAL_CURSOR = 'gestion_escolar.datatables'
+CAMPO_ORDEN = 'dt_valor_orden'
+PREFIJO_CACHE = 'datatables'
+
+
+def _entero(valor, defecto):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return defecto
+
+
+def _serializar(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _clave_version(modelo):
+    return f"{PREFIJO_CACHE}:version:{modelo._meta.label_lower}"
+
+
+def invalidar_conteos(modelo):
+    """Invalida los conteos en caché que dependen de `modelo` (llamado desde signals.py)."""
+    clave = _clave_version(modelo)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, 1, None)
+
+
+def estimar_conteo(queryset):
+    """
+    Estimación del número de filas según el planificador de la base de datos.
+    Solo disponible en PostgreSQL; en otros motores devuelve None.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class SolicitudDataTables:
+    """
+    Parámetros de una petición de DataTables.
+
+    `columnas` es la lista de campos ordenables en el orden de las columnas de la
+    tabla; `extra` permite incluir en la firma del cursor filtros propios de la
+    vista (por ejemplo, el estado en la lista de usuarios).
+    """
+
+    def __init__(self, request, columnas, extra=''):
+        params = request.GET
+        self.draw = _entero(params.get('draw'), 0)
+        self.start = max(_entero(params.get('start'), 0), 0)
+        self.length = _entero(params.get('length'), 10)
+        self.busqueda = params.get('search[value]', '').strip()
+
+        indice = _entero(params.get('order[0][column]'), 0)
+        self.columna = columnas[indice] if 0 <= indice < len(columnas) else columnas[0]
+        self.descendente = params.get('order[0][dir]', 'asc') == 'desc'
+
+        # El cursor solo es válido para el mismo orden, búsqueda y filtros que lo generaron
+        firma = f"{self.columna}|{self.descendente}|{self.busqueda}|{extra}"
+        self.firma = hashlib.md5(firma.encode('utf-8')).hexdigest()[:16]
+        self.cursor = self._leer_cursor(params.get('cursor'))
+        self.siguiente_cursor = None
+        # Último conteo que `contar` calculó con COUNT(*) en esta petición (None si salió de caché o se estimó)
+        self.conteo_exacto = None
+
+    def _leer_cursor(self, token):
+        if not token:
+            return None
+        try:
+            cursor = signing.loads(token, salt=SAL_CURSOR)
+        except signing.BadSignature:
+            return None
+        if cursor.get('f') != self.firma:
+            return None
+        return cursor
+
+    def _orden(self, descendente):
+        if descendente:
+            return [F(self.columna).desc(nulls_last=True), '-pk']
+        return [F(self.columna).asc(nulls_first=True), 'pk']
+
+    def _a_partir_de(self, valor, pk, descendente, inclusivo=False):
+        """Q de las filas que siguen a (valor, pk) en el orden indicado."""
+        columna = self.columna
+        comparacion = 'lt' if descendente else 'gt'
+        mismo_valor = Q(**{f'pk__{comparacion}{"e" if inclusivo else ""}': pk})
+
+        # Los nulos van al inicio en orden ascendente y al final en descendente
+        if valor is None:
+            condicion = Q(**{f'{columna}__isnull': True}) & mismo_valor
+            if not descendente:
+                condicion |= Q(**{f'{columna}__isnull': False})
+            return condicion
+
+        condicion = Q(**{f'{columna}__{comparacion}': valor}) | (Q(**{columna: valor}) & mismo_valor)
+        if descendente:
+            condicion |= Q(**{f'{columna}__isnull': True})
+        return condicion
+
+    def paginar(self, queryset, records_filtered, exacto=False):
+        """
+        Devuelve la lista de objetos de la página solicitada. `exacto` indica que
+        records_filtered es un COUNT(*) de esta petición (los de `contar` se detectan solos).
+        """
+        exacto = exacto or (self.conteo_exacto is not None and records_filtered == self.conteo_exacto)
+        queryset = queryset.annotate(**{CAMPO_ORDEN: F(self.columna)})
+        desc = self.descendente
+
+        if self.length < 0:
+            # "Mostrar todos"
+            return list(queryset.order_by(*self._orden(desc)))
+
+        cursor = self.cursor
+        if cursor and self.start == cursor['i'] + cursor['n'] and cursor['n']:
+            # Página siguiente: filas posteriores a la última vista
+            filas = list(queryset.filter(self._a_partir_de(*cursor['z'], desc))
+                         .order_by(*self._orden(desc))[:self.length])
+        elif cursor and self.start == cursor['i'] and cursor['n']:
+            # Misma página (recarga): a partir de la primera fila vista
+            filas = list(queryset.filter(self._a_partir_de(*cursor['a'], desc, inclusivo=True))
+                         .order_by(*self._orden(desc))[:self.length])
+        elif cursor and self.start + self.length == cursor['i'] and cursor['n']:
+            # Página anterior: filas previas a la primera vista, en orden inverso
+            filas = list(queryset.filter(self._a_partir_de(*cursor['a'], not desc))
+                         .order_by(*self._orden(not desc))[:self.length])
+            filas.reverse()
+        elif exacto and self.start > records_filtered // 2:
+            # Salto a una página cercana al final: OFFSET desde el extremo opuesto. Requiere el
+            # conteo exacto: con uno desactualizado la página tendría otras filas
+            restantes = max(records_filtered - self.start, 0)
+            desplazamiento = max(restantes - self.length, 0)
+            filas = list(queryset.order_by(*self._orden(not desc))
+                         [desplazamiento:desplazamiento + min(self.length, restantes)])
+            filas.reverse()
+        else:
+            filas = list(queryset.order_by(*self._orden(desc))[self.start:self.start + self.length])
+
+        if filas:
+            self.siguiente_cursor = signing.dumps({
+                'f': self.firma,
+                'i': self.start,
+                'n': len(filas),
+                'a': [_serializar(getattr(filas[0], CAMPO_ORDEN)), filas[0].pk],
+                'z': [_serializar(getattr(filas[-1], CAMPO_ORDEN)), filas[-1].pk],
+            }, salt=SAL_CURSOR)
+        return filas
+
+    def contar(self, queryset, vista, modelos, alcance='', filtrado=False):
+        """
+        COUNT(*) del queryset guardado en caché por (vista, alcance, búsqueda).
+        `modelos` son los modelos cuyos cambios invalidan el conteo; `alcance` distingue
+        los conjuntos visibles por rol (por ejemplo, la escuela de un director).
+        Con `filtrado`, el conteo depende del término de búsqueda y puede estimarse.
+        """
+        busqueda = self.busqueda if filtrado else ''
+        versiones = cache.get_many([_clave_version(m) for m in modelos])
+        firma_versiones = '.'.join(str(versiones.get(_clave_version(m), 0)) for m in modelos)
+        firma_busqueda = hashlib.md5(busqueda.encode('utf-8')).hexdigest()[:16]
+        clave = f"{PREFIJO_CACHE}:conteo:{vista}:{alcance}:{firma_busqueda}:{firma_versiones}"
+
+        self.conteo_exacto = None
+        conteo = cache.get(clave)
+        if conteo is None:
+            minimo_estimado = getattr(settings, 'DATATABLES_CONTEO_ESTIMADO_MINIMO', None)
+            if filtrado and minimo_estimado:
+                estimado = estimar_conteo(queryset)
+                if estimado is not None and estimado > minimo_estimado:
+                    conteo = estimado
+            if conteo is None:
+                conteo = self.conteo_exacto = queryset.count()
+            cache.set(clave, conteo, getattr(settings, 'DATATABLES_CONTEO_TTL', 300))
+        return conteo
+
+    def respuesta(self, data, records_total, records_filtered):
+        return JsonResponse({
+            'draw': self.draw,
+            'recordsTotal': records_total,
+            'recordsFiltered': records_filtered,
+            'data': data,
+            'cursor': self.siguiente_cursor,
+        })
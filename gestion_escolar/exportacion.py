@@ -0,0 +1,242 @@
+"""
+Motor de exportación a Excel por streaming.
+
+Cada reporte se describe con una lista de `Columna` (encabezado, campo(s) del ORM y
+formato). El queryset se recorre con `.values_list(...).iterator()`, sin instanciar
+modelos, y las filas se escriben con openpyxl en modo write-only, que las vuelca a
+disco conforme se agregan en lugar de conservar el libro completo en memoria. El
+archivo resultante se envía en bloques mediante un StreamingHttpResponse, o se guarda
+en disco con `guardar_tabla` cuando lo genera un trabajo en segundo plano.
+"""
+import tempfile
+from datetime import date
+
+from django.http import StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+from openpyxl.utils import get_column_letter
+
+from .models import Maestro
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+TAMANO_LOTE = 2000
+TAMANO_BLOQUE = 64 * 1024
+
+
+def fecha_iso(valor):
+    return valor.strftime("%Y-%m-%d") if isinstance(valor, date) else (valor or '')
+
+
+def fecha_dmy(valor):
+    return valor.strftime("%d/%m/%Y") if isinstance(valor, date) else valor
+
+
+def opciones(choices):
+    """Formato que muestra la etiqueta de un campo con choices (como get_FOO_display)."""
+    etiquetas = dict(choices)
+    return lambda valor: etiquetas.get(valor, valor)
+
+
+def unir(*valores):
+    return ' '.join(str(v) for v in valores if v)
+
+
+class Columna:
+    """
+    Columna de un reporte. `campos` es uno o varios lookups del ORM; `formato`
+    recibe sus valores (en ese orden) y devuelve el valor de la celda.
+    """
+
+    def __init__(self, encabezado, campos, formato=None, ancho=None):
+        self.encabezado = encabezado
+        self.campos = (campos,) if isinstance(campos, str) else tuple(campos)
+        self.formato = formato
+        self.ancho = ancho
+
+    def renombrada(self, encabezado):
+        return Columna(encabezado, self.campos, self.formato, self.ancho)
+
+    def valor(self, valores):
+        if self.formato:
+            return self.formato(*valores)
+        return valores[0]
+
+
+# --- Especificaciones de columnas ---
+
+COLUMNAS_MAESTRO = [
+    Columna("ID Maestro", 'id_maestro'),
+    Columna("Nombre(s)", 'nombres'),
+    Columna("Apellido Paterno", 'a_paterno'),
+    Columna("Apellido Materno", 'a_materno'),
+    Columna("RFC", 'rfc'),
+    Columna("CURP", 'curp'),
+    Columna("Sexo", 'sexo', opciones(Maestro.SEXO_OPCIONES)),
+    Columna("Estado Civil", 'est_civil', opciones(Maestro.ESTADO_CIVIL_OPCIONES)),
+    Columna("Fecha Nacimiento", 'fecha_nacimiento', fecha_iso),
+    Columna("Techo Financiero", 'techo_f'),
+    Columna("CCT", 'id_escuela__id_escuela', lambda v: v or ''),
+    Columna("Nombre del CT", 'id_escuela__nombre_ct', lambda v: v or ''),
+    Columna("Zona Escolar", 'id_escuela__zona_esc__numero', lambda v: v or ''),
+    Columna("Función", 'funcion', opciones(Maestro.FUNCION_OPCIONES)),
+    Columna("Categoría", 'categog__descripcion', lambda v: v or ''),
+    Columna("Clave Presupuestal", 'clave_presupuestal'),
+    Columna("Código", 'codigo'),
+    Columna("Fecha Ingreso", 'fecha_ingreso', fecha_iso),
+    Columna("Fecha Promoción", 'fecha_promocion', fecha_iso),
+    Columna("Formación Académica", 'form_academica'),
+    Columna("Horario", 'horario'),
+    Columna("Nivel de Estudio", 'nivel_estudio', opciones(Maestro.NIVEL_ESTUDIO_OPCIONES)),
+    Columna("Domicilio Particular", 'domicilio_part'),
+    Columna("Población", 'poblacion'),
+    Columna("Código Postal", 'codigo_postal'),
+    Columna("Teléfono", 'telefono'),
+    Columna("Email", 'email'),
+    Columna("Status", 'status', opciones(Maestro.STATUS_OPCIONES)),
+    Columna("Observaciones", 'observaciones'),
+]
+
+# Ficha de un solo maestro (una fila por dato: encabezado y valor)
+FICHA_MAESTRO = [
+    Columna("ID Maestro", 'id_maestro'),
+    Columna("Nombre Completo", ('nombres', 'a_paterno', 'a_materno'), lambda n, p, m: f'{n} {p} {m}'),
+    Columna("CURP", 'curp'),
+    Columna("RFC", 'rfc'),
+    Columna("Sexo", 'sexo', opciones(Maestro.SEXO_OPCIONES)),
+    Columna("Estado Civil", 'est_civil', opciones(Maestro.ESTADO_CIVIL_OPCIONES)),
+    Columna("Fecha de Nacimiento", 'fecha_nacimiento', fecha_dmy),
+    Columna("Techo Financiero", 'techo_f'),
+    Columna("C.C.T.", 'id_escuela__id_escuela', lambda v: v or 'N/A'),
+    Columna("Nombre del Centro de Trabajo", 'id_escuela__nombre_ct', lambda v: v or 'N/A'),
+    Columna("Zona Escolar", 'id_escuela__zona_esc__numero', lambda v: v or 'N/A'),
+    Columna("Clave Presupuestal", 'clave_presupuestal'),
+    Columna("Categoría", ('categog__id_categoria', 'categog__descripcion'),
+            lambda clave, descripcion: f"{clave} - {descripcion}" if clave else ''),
+    Columna("Código", 'codigo'),
+    Columna("Fecha de Ingreso", 'fecha_ingreso', fecha_dmy),
+    Columna("Fecha de Promoción", 'fecha_promocion', fecha_dmy),
+    Columna("Formación Académica", 'form_academica'),
+    Columna("Horario", 'horario'),
+    Columna("Función", 'funcion', opciones(Maestro.FUNCION_OPCIONES)),
+    Columna("Nivel de Estudio", 'nivel_estudio', opciones(Maestro.NIVEL_ESTUDIO_OPCIONES)),
+    Columna("Domicilio Particular", 'domicilio_part'),
+    Columna("Población", 'poblacion'),
+    Columna("Código Postal", 'codigo_postal'),
+    Columna("Teléfono", 'telefono'),
+    Columna("Email", 'email'),
+    Columna("Status", 'status', opciones(Maestro.STATUS_OPCIONES)),
+    Columna("Observaciones", 'observaciones'),
+]
+
+COLUMNAS_FUP = [
+    Columna("Folio", 'folio', ancho=15),
+    Columna("Fecha", 'fecha', fecha_iso, ancho=12),
+    Columna("Nombre Completo", 'nombre_completo', ancho=40),
+    Columna("RFC", 'rfc', ancho=18),
+    Columna("Clave Presupuestal", 'clave_presupuestal', ancho=30),
+    Columna("Techo Financiero", 'techo_financiero', ancho=20),
+    Columna("Efectos", 'efectos', ancho=30),
+    Columna("Sostenimiento", 'sostenimiento', ancho=15),
+    Columna("Observaciones", 'observaciones', ancho=50),
+]
+
+
+# --- Motor ---
+
+def _campos(columnas):
+    """Lista única de lookups a consultar y, por columna, la posición de sus valores."""
+    campos = []
+    for columna in columnas:
+        for campo in columna.campos:
+            if campo not in campos:
+                campos.append(campo)
+    posiciones = [[campos.index(c) for c in columna.campos] for columna in columnas]
+    return campos, posiciones
+
+
+def _filas(queryset, columnas):
+    campos, posiciones = _campos(columnas)
+    for valores in queryset.values_list(*campos).iterator(chunk_size=TAMANO_LOTE):
+        yield [
+            columna.valor([valores[i] for i in indices])
+            for columna, indices in zip(columnas, posiciones)
+        ]
+
+
+def _generar_xlsx(escribir_hoja, titulo_hoja):
+    """Construye el libro en modo write-only sobre un archivo temporal y lo emite en bloques."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=titulo_hoja[:31])
+    escribir_hoja(ws)
+
+    with tempfile.TemporaryFile() as archivo:
+        wb.save(archivo)
+        archivo.seek(0)
+        while True:
+            bloque = archivo.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            yield bloque
+
+
+def _respuesta(contenido, nombre_archivo):
+    response = StreamingHttpResponse(contenido, content_type=CONTENT_TYPE_XLSX)
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return response
+
+
+def _escritor_tabla(queryset, columnas, encabezado_resaltado=False, al_avanzar=None):
+    """Función que escribe en una hoja los encabezados más una fila por registro del queryset."""
+    def escribir_hoja(ws):
+        for indice, columna in enumerate(columnas, start=1):
+            if columna.ancho:
+                ws.column_dimensions[get_column_letter(indice)].width = columna.ancho
+
+        if encabezado_resaltado:
+            encabezados = []
+            for columna in columnas:
+                celda = WriteOnlyCell(ws, value=columna.encabezado)
+                celda.font = Font(bold=True)
+                celda.alignment = Alignment(horizontal='center', vertical='center')
+                encabezados.append(celda)
+            ws.append(encabezados)
+        else:
+            ws.append([columna.encabezado for columna in columnas])
+
+        for escritas, fila in enumerate(_filas(queryset, columnas), start=1):
+            ws.append(fila)
+            if al_avanzar and escritas % TAMANO_LOTE == 0:
+                al_avanzar(escritas)
+
+    return escribir_hoja
+
+
+def exportar_tabla(queryset, columnas, nombre_archivo, titulo_hoja, encabezado_resaltado=False):
+    """Respuesta con una hoja de encabezados más una fila por registro del queryset."""
+    escribir_hoja = _escritor_tabla(queryset, columnas, encabezado_resaltado)
+    return _respuesta(_generar_xlsx(escribir_hoja, titulo_hoja), nombre_archivo)
+
+
+def guardar_tabla(queryset, columnas, ruta, titulo_hoja, encabezado_resaltado=False, al_avanzar=None):
+    """
+    Igual que exportar_tabla pero guarda el libro en `ruta` (para los trabajos en segundo
+    plano). `al_avanzar(filas_escritas)` se llama cada TAMANO_LOTE filas.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=titulo_hoja[:31])
+    _escritor_tabla(queryset, columnas, encabezado_resaltado, al_avanzar)(ws)
+    wb.save(ruta)
+    return ruta
+
+
+def exportar_ficha(queryset, columnas, nombre_archivo, titulo_hoja):
+    """Respuesta con los datos de un solo registro, una fila por columna (encabezado, valor)."""
+    def escribir_hoja(ws):
+        ws.column_dimensions['A'].width = 30
+        ws.column_dimensions['B'].width = 50
+        for fila in _filas(queryset[:1], columnas):
+            for columna, valor in zip(columnas, fila):
+                ws.append([columna.encabezado, valor])
+
+    return _respuesta(_generar_xlsx(escribir_hoja, titulo_hoja), nombre_archivo)
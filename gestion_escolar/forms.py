@@ -1,4 +1,6 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
 from .models import (
     Zona, Escuela, Maestro, Categoria, MotivoTramite, Tema,
     PlantillaTramite, Prelacion, TipoApreciacion, Vacancia, 
@@ -83,7 +85,67 @@ class CorrespondenciaForm(UppercaseFormMixin, forms.ModelForm):
             'cuerpo': 'Mensaje',
         }
 
+class SeleccionAjax(forms.Select):
+    """
+    Select que solo renderiza la opción seleccionada. static/gestion_escolar/js/select2_ajax.js
+    lo convierte en un Select2 que busca las demás en la URL `data-ajax-url`.
+    """
+
+    def __init__(self, url, placeholder='', minimo_caracteres=2, attrs=None):
+        super().__init__({'class': 'form-control', **(attrs or {})})
+        self.url = url
+        self.placeholder = placeholder
+        self.minimo_caracteres = minimo_caracteres
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-ajax-url'] = reverse(self.url)
+        attrs['data-placeholder'] = self.placeholder
+        attrs['data-minimum-input-length'] = self.minimo_caracteres
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        opciones = [self.create_option(name, '', '', False, 0)]
+        seleccionados = [v for v in value if v]
+        if seleccionados:
+            campo = self.choices.field.to_field_name or 'pk'
+            try:
+                instancias = list(self.choices.queryset.filter(**{f'{campo}__in': seleccionados}))
+            except (ValueError, TypeError, ValidationError):
+                # Valor enviado inválido: el campo ya reporta el error
+                instancias = []
+            for indice, instancia in enumerate(instancias, start=1):
+                valor, etiqueta = self.choices.choice(instancia)
+                opciones.append(self.create_option(name, valor, etiqueta, True, indice))
+        return [(None, opciones, 0)]
+
+
+class BusquedaAjaxChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField para catálogos grandes. No lista el queryset: el widget solo
+    muestra el valor seleccionado, las opciones se buscan en `url` (una vista que
+    responde {'results': [{'id': ..., 'text': ...}]}) y al validar solo se consulta
+    la llave enviada.
+    """
+
+    def __init__(self, queryset, url, placeholder='', minimo_caracteres=2, **kwargs):
+        kwargs.setdefault('widget', SeleccionAjax(url, placeholder, minimo_caracteres))
+        super().__init__(queryset, **kwargs)
+
+
+class MaestroChoiceField(BusquedaAjaxChoiceField):
+    def __init__(self, placeholder='', **kwargs):
+        super().__init__(Maestro.objects.all(), 'buscar_maestros_ajax', placeholder, **kwargs)
+
+    def label_from_instance(self, obj):
+        # Mismo texto que devuelve buscar_maestros_ajax
+        return f"{obj.nombres or ''} {obj.a_paterno or ''} {obj.a_materno or ''}".strip()
+
+
 class VacanciaForm(UppercaseFormMixin, forms.ModelForm):
+    maestro_titular = MaestroChoiceField(label="Maestro Titular", placeholder='Busca y selecciona un maestro titular')
+    maestro_interino = MaestroChoiceField(label="Maestro Interino", required=False,
+                                          placeholder='Busca y selecciona un maestro interino')
     clave_presupuestal_display = forms.CharField(label="Clave Presupuestal", required=False, 
                                                  widget=forms.TextInput(attrs={'class': 'form-control', 'readonly': 'readonly'}))
     curp_interino_display = forms.CharField(label="CURP Interino", required=False, 
@@ -100,8 +162,6 @@ class VacanciaForm(UppercaseFormMixin, forms.ModelForm):
             'fecha_inicio', 'fecha_final', 'observaciones', 'pseudoplaza'
         ]
         widgets = {
-            'maestro_titular': forms.Select(attrs={'class': 'form-control select2'}),
-            'maestro_interino': forms.Select(attrs={'class': 'form-control select2'}),
             'apreciacion': forms.Select(attrs={'class': 'form-control select2'}),
             'tipo_vacante': forms.Select(attrs={'class': 'form-control'}),
             'tipo_movimiento_original': forms.Select(attrs={'class': 'form-control'}),
@@ -113,9 +173,6 @@ class VacanciaForm(UppercaseFormMixin, forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['maestro_titular'].queryset = Maestro.objects.all().order_by('a_paterno', 'a_materno', 'nombres')
-        self.fields['maestro_interino'].queryset = Maestro.objects.all().order_by('a_paterno', 'a_materno', 'nombres')
-        self.fields['maestro_interino'].required = False # Make interino optional
         self.fields['fecha_final'].required = False
         self.fields['tipo_movimiento_original'].required = False
 
@@ -180,13 +237,20 @@ class VacanciaForm(UppercaseFormMixin, forms.ModelForm):
         return cleaned_data
 
 
-class CategoriaChoiceField(forms.ModelChoiceField):
+class CategoriaChoiceField(BusquedaAjaxChoiceField):
+    def __init__(self, **kwargs):
+        super().__init__(Categoria.objects.all(), 'buscar_categorias_ajax', 'Busca una categoría', 0, **kwargs)
+
     def label_from_instance(self, obj):
         return obj.id_categoria
 
-class EscuelaChoiceField(forms.ModelChoiceField):
+class EscuelaChoiceField(BusquedaAjaxChoiceField):
+    def __init__(self, **kwargs):
+        super().__init__(Escuela.objects.all(), 'buscar_escuelas_ajax', 'Busca una escuela (CCT o nombre)', 0, **kwargs)
+
     def label_from_instance(self, obj):
-        return obj.id_escuela
+        # Mismo texto que devuelve buscar_escuelas_ajax
+        return f"{obj.id_escuela} - {obj.nombre_ct}"
 
 class ZonaForm(UppercaseFormMixin, forms.ModelForm):
     class Meta:
@@ -230,17 +294,8 @@ class CategoriaForm(UppercaseFormMixin, forms.ModelForm):
         }
 
 class MaestroForm(UppercaseFormMixin, forms.ModelForm):
-    categog = CategoriaChoiceField(
-        queryset=Categoria.objects.all().order_by('id_categoria'),
-        required=False,
-        label="Categoría",
-        widget=forms.Select(attrs={'class': 'form-control'})
-    )
-    id_escuela = EscuelaChoiceField(
-        queryset=Escuela.objects.all().order_by('id_escuela'),
-        label="Escuela (CCT)",
-        widget=forms.Select(attrs={'class': 'form-control select2'})
-    )
+    categog = CategoriaChoiceField(required=False, label="Categoría")
+    id_escuela = EscuelaChoiceField(label="Escuela (CCT)")
 
     class Meta:
         model = Maestro
@@ -360,17 +415,9 @@ class TramiteForm(UppercaseFormMixin, forms.Form):
         label="Motivo del Movimiento",
         widget=forms.Select(attrs={'class': 'form-control'})
     )
-    maestro_titular = forms.ModelChoiceField(
-        queryset=Maestro.objects.all().order_by('a_paterno', 'a_materno', 'nombres'),
-        label="Maestro Titular",
-        widget=forms.Select(attrs={'class': 'form-control select2'})
-    )
-    maestro_interino = forms.ModelChoiceField(
-        queryset=Maestro.objects.all().order_by('a_paterno', 'a_materno', 'nombres'),
-        label="Maestro Interino (Opcional)",
-        required=False,
-        widget=forms.Select(attrs={'class': 'form-control select2'})
-    )
+    maestro_titular = MaestroChoiceField(label="Maestro Titular", placeholder='Busca y selecciona un maestro titular')
+    maestro_interino = MaestroChoiceField(label="Maestro Interino (Opcional)", required=False,
+                                          placeholder='Busca y selecciona un maestro interino')
     curp_titular_display = forms.CharField(label="CURP Titular", required=False,
                                            widget=forms.TextInput(attrs={'class': 'form-control', 'readonly': 'readonly'}))
     rfc_titular_display = forms.CharField(label="RFC Titular", required=False,
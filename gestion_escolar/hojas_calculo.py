@@ -0,0 +1,239 @@
+"""
+Envío de filas a la hoja de Google Sheets de vacancias.
+
+Cada proceso conserva un solo cliente autenticado y la hoja ya abierta, de modo que
+las credenciales y la búsqueda de la hoja se resuelven una vez y no por fila.
+`EscritorHoja` acumula las filas de un lote y las envía en una sola llamada a
+`append_rows`; los errores de cuota (429) y los errores temporales del servidor se
+reintentan con espera exponencial.
+
+`append_rows` no es idempotente: si falla después de que la petición salió (5xx,
+tiempo de espera de la respuesta, conexión cortada), Google pudo haber agregado las
+filas de todos modos. Solo la cuota (429) y los errores al conectar se reintentan
+directamente; en los demás casos primero se revisa si las últimas filas de la hoja ya
+son las enviadas, para no duplicar el lote.
+
+Con GOOGLE_SHEETS_DESTINO = 'csv' las filas se agregan a un archivo CSV local en
+lugar de a Google Sheets, para trabajar y probar sin conexión ni credenciales.
+"""
+import csv
+import logging
+import os
+import random
+import threading
+import time
+from datetime import date, datetime
+
+import gspread
+import requests
+import urllib3
+from django.conf import settings
+from google.oauth2 import service_account
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+# Cuota excedida y errores temporales del servidor: vale la pena reintentar
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+# Rechazos que garantizan que la escritura no se aplicó
+CODIGOS_SIN_ESCRITURA = {429}
+
+
+class ErrorHojaCalculo(Exception):
+    pass
+
+
+def limpiar_fila(fila):
+    """Convierte los valores de una fila a texto (fechas en formato ISO, None como vacío)."""
+    limpia = []
+    for valor in fila:
+        if valor is None:
+            limpia.append('')
+        elif isinstance(valor, (date, datetime)):
+            limpia.append(valor.strftime('%Y-%m-%d'))
+        else:
+            limpia.append(str(valor))
+    return limpia
+
+
+# --- Destinos ---
+
+class DestinoGoogleSheets:
+    def __init__(self, hoja_id, nombre_hoja):
+        self.hoja_id = hoja_id
+        self.nombre_hoja = nombre_hoja
+        self._worksheet = None
+
+    def _abrir(self):
+        creds_json = getattr(settings, 'GOOGLE_SHEETS_CREDENTIALS', None)
+        if creds_json is None:
+            raise ErrorHojaCalculo("Configuración de credenciales no encontrada")
+        if not creds_json.get('private_key') or not creds_json.get('client_email'):
+            raise ErrorHojaCalculo("Credenciales incompletas - falta private_key o client_email")
+
+        # Reemplazar los '\n' escapados de la clave privada por saltos de línea reales
+        creds_for_auth = dict(creds_json, private_key=creds_json['private_key'].replace('\\n', '\n'))
+        credentials = service_account.Credentials.from_service_account_info(creds_for_auth, scopes=SCOPES)
+        try:
+            return gspread.Client(auth=credentials).open_by_key(self.hoja_id).worksheet(self.nombre_hoja)
+        except gspread.exceptions.SpreadsheetNotFound:
+            raise ErrorHojaCalculo("Google Sheet no encontrado. Verifica el GOOGLE_SHEET_ID.")
+        except gspread.exceptions.WorksheetNotFound:
+            raise ErrorHojaCalculo(f"Hoja '{self.nombre_hoja}' no encontrada.")
+
+    def agregar_filas(self, filas):
+        if self._worksheet is None:
+            self._worksheet = self._abrir()
+        try:
+            self._worksheet.append_rows(filas)
+        except gspread.exceptions.APIError as e:
+            if e.code in (401, 404):
+                # Credenciales revocadas o hoja eliminada: se vuelve a abrir en el próximo envío
+                self._worksheet = None
+            raise
+
+    def termina_con(self, filas):
+        """True si las últimas filas con datos de la hoja son `filas` (un envío fallido que sí se aplicó)."""
+        if self._worksheet is None:
+            self._worksheet = self._abrir()
+        ocupadas = len(self._worksheet.col_values(1))
+        if ocupadas < len(filas):
+            return False
+        ultimas = self._worksheet.get(f"{ocupadas - len(filas) + 1}:{ocupadas}")
+        return [_sin_vacios_finales(f) for f in ultimas] == [_sin_vacios_finales(f) for f in filas]
+
+
+def _sin_vacios_finales(fila):
+    # La API omite las celdas vacías al final de cada fila
+    fila = list(fila)
+    while fila and fila[-1] == '':
+        fila.pop()
+    return fila
+
+
+class DestinoCSV:
+    """Destino local: agrega las filas a un archivo CSV (UTF-8 con BOM para abrirlo en Excel)."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def agregar_filas(self, filas):
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        with open(self.ruta, 'a', newline='', encoding='utf-8-sig') as archivo:
+            csv.writer(archivo).writerows(filas)
+
+
+_destinos = {}
+_candado = threading.Lock()
+
+
+def obtener_destino():
+    """Destino configurado, creado una sola vez por proceso (y por hoja)."""
+    tipo = getattr(settings, 'GOOGLE_SHEETS_DESTINO', 'google')
+    if tipo == 'csv':
+        clave = (os.getpid(), tipo, settings.GOOGLE_SHEETS_ARCHIVO_LOCAL)
+    else:
+        clave = (os.getpid(), tipo, settings.GOOGLE_SHEET_ID, settings.GOOGLE_SHEET_WORKSHEET_NAME)
+
+    destino = _destinos.get(clave)
+    if destino is None:
+        with _candado:
+            destino = _destinos.get(clave)
+            if destino is None:
+                if tipo == 'csv':
+                    destino = DestinoCSV(settings.GOOGLE_SHEETS_ARCHIVO_LOCAL)
+                else:
+                    destino = DestinoGoogleSheets(settings.GOOGLE_SHEET_ID, settings.GOOGLE_SHEET_WORKSHEET_NAME)
+                _destinos[clave] = destino
+    return destino
+
+
+# --- Envío ---
+
+def _reintentable(error):
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.code in CODIGOS_REINTENTABLES
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def _sin_escritura(error):
+    """True si el error ocurrió antes de que la petición llegara a Google (o la rechazó la cuota)."""
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.code in CODIGOS_SIN_ESCRITURA
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        causa = error.args[0] if error.args else None
+        if isinstance(causa, urllib3.exceptions.MaxRetryError):
+            causa = causa.reason
+        return isinstance(causa, urllib3.exceptions.NewConnectionError)
+    return False
+
+
+def agregar_filas(filas, destino=None):
+    """
+    Agrega las filas a la hoja en una sola llamada, reintentando con espera exponencial
+    (más un margen aleatorio) ante errores de cuota o temporales.
+    Lanza ErrorHojaCalculo si no se pudieron enviar.
+    """
+    filas = [limpiar_fila(fila) for fila in filas]
+    if not filas:
+        return 0
+    destino = destino or obtener_destino()
+    reintentos = getattr(settings, 'GOOGLE_SHEETS_REINTENTOS', 5)
+    espera_base = getattr(settings, 'GOOGLE_SHEETS_ESPERA_BASE', 1.0)
+
+    intento = 0
+    while True:
+        try:
+            destino.agregar_filas(filas)
+            return len(filas)
+        except ErrorHojaCalculo:
+            raise
+        except Exception as e:
+            if not _reintentable(e) or intento >= reintentos:
+                raise ErrorHojaCalculo(f"Error: {e}") from e
+            espera = espera_base * (2 ** intento) + random.uniform(0, espera_base)
+            logger.warning("Google Sheets respondió %s; reintento %d de %d en %.1f s", e, intento + 1, reintentos, espera)
+            time.sleep(espera)
+            if not _sin_escritura(e) and _ya_agregadas(destino, filas, e):
+                logger.warning("Las %d filas sí se agregaron a pesar del error; no se reenvían", len(filas))
+                return len(filas)
+            intento += 1
+
+
+def _ya_agregadas(destino, filas, error):
+    """Revisa si un append fallido se aplicó; si no se puede saber, no se arriesga a duplicar."""
+    try:
+        return destino.termina_con(filas)
+    except Exception as verificacion:
+        raise ErrorHojaCalculo(
+            f"Error: {error}. No se pudo comprobar si las filas se agregaron ({verificacion}); revise la hoja antes de reenviar."
+        ) from error
+
+
+class EscritorHoja:
+    """
+    Acumula filas y las envía juntas con `enviar()`:
+
+        escritor = EscritorHoja()
+        for vacancia in vacancias:
+            escritor.agregar(fila_de(vacancia))
+        enviadas = escritor.enviar()
+    """
+
+    def __init__(self, destino=None):
+        self.destino = destino
+        self.filas = []
+
+    def agregar(self, fila):
+        self.filas.append(fila)
+
+    def enviar(self):
+        """
+        Envía las filas pendientes y devuelve cuántas fueron. Si falla lanza
+        ErrorHojaCalculo y las filas se conservan para un nuevo intento.
+        """
+        enviadas = agregar_filas(self.filas, self.destino)
+        self.filas = []
+        return enviadas
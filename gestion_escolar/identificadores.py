@@ -0,0 +1,130 @@
+"""
+Búsqueda por CURP y RFC.
+
+Maestro y Prelacion guardan, además de la CURP/RFC tal como se capturó, una copia
+normalizada (mayúsculas y sin espacios extremos, ver `normalizar_clave`) con índice,
+de modo que una búsqueda exacta es una consulta por índice sin importar cómo se
+escribió el dato.
+
+Las prelaciones se consultan varias veces por trámite (formularios de vacancia,
+AJAX del interino, documentos Word del lote), así que `buscar_prelacion` guarda las
+más recientes en una caché LRU del proceso, incluidas las CURP sin prelación. Las
+señales de Prelacion llaman a `invalidar_prelaciones`, que vacía la caché local y
+sube un número de versión en la caché de Django para que los demás procesos
+descarten la suya en la siguiente consulta. Ese aviso solo llega a otros procesos
+si CACHES usa un backend compartido; con LocMemCache (el predeterminado) cada
+entrada vence a los PRELACIONES_CACHE_TTL segundos, lo que acota cuánto tarda otro
+proceso (otro worker del servidor, run_workers) en ver una importación o edición.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAVE_VERSION_PRELACIONES = 'identificadores:version:prelacion'
+
+_prelaciones = OrderedDict()  # curp normalizada -> (Prelacion o None, vencimiento)
+_version = None
+_candado = threading.Lock()
+
+
+def normalizar_clave(valor):
+    """CURP o RFC en mayúsculas y sin espacios extremos; '' si está vacío."""
+    return (valor or '').strip().upper()
+
+
+def _tamano_maximo():
+    return getattr(settings, 'PRELACIONES_CACHE_TAMANO', 2048)
+
+
+def _ttl():
+    return getattr(settings, 'PRELACIONES_CACHE_TTL', 300)
+
+
+def _version_actual():
+    """Vacía la caché local si otro proceso invalidó las prelaciones desde la última consulta."""
+    global _version
+    version = cache.get(CLAVE_VERSION_PRELACIONES, 0)
+    if version != _version:
+        with _candado:
+            _prelaciones.clear()
+            _version = version
+
+
+def _guardar(curp, prelacion):
+    with _candado:
+        _prelaciones[curp] = (prelacion, time.monotonic() + _ttl())
+        _prelaciones.move_to_end(curp)
+        while len(_prelaciones) > _tamano_maximo():
+            _prelaciones.popitem(last=False)
+
+
+def _vigente(curp):
+    """(True, prelacion) si la CURP está en caché y no ha vencido; se llama con el candado tomado."""
+    entrada = _prelaciones.get(curp)
+    if entrada is None:
+        return False, None
+    prelacion, vencimiento = entrada
+    if vencimiento <= time.monotonic():
+        del _prelaciones[curp]
+        return False, None
+    _prelaciones.move_to_end(curp)
+    return True, prelacion
+
+
+def buscar_prelacion(curp):
+    """La prelación de una CURP (la de menor posición si hay varias, como `.first()`), o None."""
+    from .models import Prelacion
+
+    curp = normalizar_clave(curp)
+    if not curp:
+        return None
+    _version_actual()
+    with _candado:
+        vigente, prelacion = _vigente(curp)
+        if vigente:
+            return prelacion
+
+    prelacion = Prelacion.objects.filter(curp_normalizada=curp).first()
+    _guardar(curp, prelacion)
+    return prelacion
+
+
+def prelaciones_por_curp(curps):
+    """{curp normalizada: Prelacion} para varias CURP: las que no están en caché se traen en una sola consulta."""
+    from .models import Prelacion
+
+    _version_actual()
+    resultado, faltantes = {}, set()
+    with _candado:
+        for curp in filter(None, map(normalizar_clave, curps)):
+            vigente, prelacion = _vigente(curp)
+            if vigente:
+                resultado[curp] = prelacion
+            else:
+                faltantes.add(curp)
+
+    if faltantes:
+        encontradas = {}
+        # Meta.ordering es pos_orden: la primera de cada CURP es la que devolvería `.first()`
+        for prelacion in Prelacion.objects.filter(curp_normalizada__in=faltantes):
+            encontradas.setdefault(prelacion.curp_normalizada, prelacion)
+        for curp in faltantes:
+            resultado[curp] = encontradas.get(curp)
+            _guardar(curp, resultado[curp])
+    return {curp: prelacion for curp, prelacion in resultado.items() if prelacion is not None}
+
+
+def invalidar_prelaciones():
+    """Descarta las prelaciones en caché de todos los procesos (llamado desde signals.py y las importaciones)."""
+    global _version
+    try:
+        version = cache.incr(CLAVE_VERSION_PRELACIONES)
+    except ValueError:
+        version = 1
+        cache.set(CLAVE_VERSION_PRELACIONES, version, None)
+    with _candado:
+        _prelaciones.clear()
+        _version = version
@@ -0,0 +1,151 @@
+"""
+Utilidades comunes de los comandos de importación masiva (importar_personal, importar_fups).
+
+- `leer_filas` recorre un CSV o un XLSX (openpyxl en modo read_only) fila por fila, sin
+  cargar el archivo completo, y entrega cada fila como {encabezado: valor}.
+- `texto` y `convertir_fecha` normalizan los valores tal como llegan de uno u otro
+  formato (números de Excel, fechas como datetime o como texto con meses en español).
+- `en_bloques` agrupa las filas para validarlas y escribirlas con bulk_create/bulk_update.
+- `ArchivoErrores` guarda en un CSV las filas rechazadas (y las advertencias) con su
+  número de fila, para corregirlas y volver a importarlas.
+"""
+import csv
+import os
+from datetime import date, datetime
+from itertools import islice
+
+FORMATOS_FECHA = ('%d-%b-%y', '%d-%b-%Y', '%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y', '%d-%m-%Y')
+
+# strptime usa los meses del locale (en inglés por defecto); los archivos traen "ene", "ago", "dic"...
+MESES_ES = {
+    'ene': 'jan', 'feb': 'feb', 'mar': 'mar', 'abr': 'apr', 'may': 'may', 'jun': 'jun',
+    'jul': 'jul', 'ago': 'aug', 'sep': 'sep', 'set': 'sep', 'oct': 'oct', 'nov': 'nov', 'dic': 'dec',
+}
+
+
+class ErrorFila(Exception):
+    """Error de validación de una fila; el mensaje se escribe en el archivo de errores."""
+
+
+def mensaje_validacion(error):
+    """Texto de una ValidationError de Django en una sola línea ("campo: mensaje; ...")."""
+    if hasattr(error, 'message_dict'):
+        return '; '.join(
+            f"{campo}: {' '.join(mensajes)}" if campo != '__all__' else ' '.join(mensajes)
+            for campo, mensajes in error.message_dict.items()
+        )
+    return ' '.join(error.messages)
+
+
+def texto(valor):
+    """Valor de una celda como texto sin espacios extremos (los enteros de Excel sin '.0')."""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    return str(valor).strip()
+
+
+def convertir_fecha(valor):
+    """date a partir de una celda (date, datetime o texto); None si está vacía. Lanza ErrorFila si no se reconoce."""
+    if valor in (None, ''):
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+
+    cadena = str(valor).strip()
+    if not cadena:
+        return None
+    partes = cadena.split('-')
+    if len(partes) == 3 and partes[1].lower() in MESES_ES:
+        partes[1] = MESES_ES[partes[1].lower()]
+    normalizada = '-'.join(partes)
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(normalizada, formato).date()
+        except ValueError:
+            continue
+    raise ErrorFila(f"Fecha no reconocida: '{cadena}'")
+
+
+def leer_filas(ruta):
+    """
+    Genera (número de fila, {encabezado: valor}) de un archivo .csv o .xlsx.
+    Los encabezados se conservan tal cual; el número de fila es el del archivo
+    (la fila 1 es la de encabezados).
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        from openpyxl import load_workbook
+
+        libro = load_workbook(ruta, read_only=True, data_only=True)
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            encabezados = [texto(celda) for celda in next(filas, ())]
+            for numero, fila in enumerate(filas, start=2):
+                if not any(celda not in (None, '') for celda in fila):
+                    continue
+                yield numero, dict(zip(encabezados, fila))
+        finally:
+            libro.close()
+    else:
+        with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+            lector = csv.DictReader(archivo)
+            # line_num es la última línea física de la fila (cuenta los saltos dentro de comillas)
+            for fila in lector:
+                if not any((valor or '').strip() for valor in fila.values() if isinstance(valor, str)):
+                    continue
+                yield lector.line_num, fila
+
+
+def en_bloques(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        bloque = list(islice(iterador, tamano))
+        if not bloque:
+            return
+        yield bloque
+
+
+class ArchivoErrores:
+    """CSV de filas rechazadas; solo se crea el archivo si hay algo que escribir."""
+
+    ENCABEZADOS = ['fila', 'tipo', 'identificador', 'nombre', 'mensaje']
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.errores = 0
+        self.advertencias = 0
+        self._archivo = None
+        self._escritor = None
+
+    def _escribir(self, fila):
+        if self._escritor is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+            self._archivo = open(self.ruta, 'w', newline='', encoding='utf-8-sig')
+            self._escritor = csv.writer(self._archivo)
+            self._escritor.writerow(self.ENCABEZADOS)
+        self._escritor.writerow(fila)
+
+    def error(self, numero, identificador, nombre, mensaje):
+        self.errores += 1
+        self._escribir([numero, 'ERROR', identificador, nombre, mensaje])
+
+    def advertencia(self, numero, identificador, nombre, mensaje):
+        self.advertencias += 1
+        self._escribir([numero, 'ADVERTENCIA', identificador, nombre, mensaje])
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
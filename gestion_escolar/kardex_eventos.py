@@ -0,0 +1,196 @@
+"""
+Línea de tiempo del kardex de cada maestro.
+
+Los trámites (Historial), la correspondencia recibida, los movimientos manuales y los
+FUP de un maestro se copian a KardexEvento, una fila por evento y maestro, indexada
+por (maestro, fecha). La página del kardex pagina y filtra esa tabla en lugar de
+consultar las cuatro fuentes y ordenarlas en memoria. Las señales de signals.py la
+mantienen al día; las escrituras masivas (bulk_create/bulk_update) llaman a
+`sincronizar_eventos` a mano.
+
+Un registro de Historial aparece también en el kardex de su maestro interino o
+secundario (Historial.maestro_secundario). Los registros anteriores a ese campo solo
+guardaban el nombre; `vincular_maestros_secundarios` los resuelve con el índice de
+nombres normalizados (ver el comando vincular_maestros_secundarios).
+"""
+from datetime import datetime
+
+from django.utils import timezone
+from unidecode import unidecode
+
+from .importacion import en_bloques
+
+TIPO_TRAMITE = 'TRAMITE'
+TIPO_CORRESPONDENCIA = 'CORRESPONDENCIA'
+TIPO_MOVIMIENTO = 'MOVIMIENTO'
+TIPO_FUP = 'FUP'
+
+TAMANO_LOTE = 1000
+
+
+def _inicio_del_dia(dia):
+    if dia is None:
+        return None
+    return timezone.make_aware(datetime.combine(dia, datetime.min.time()), timezone.get_current_timezone())
+
+
+def _usuario(usuario, defecto='Sistema'):
+    return usuario.username if usuario else defecto
+
+
+def clave_nombre(nombre):
+    """Nombre en la forma de Maestro.nombre_completo_unaccented, para comparar nombres capturados a mano."""
+    return unidecode((nombre or '').strip().upper())
+
+
+# Los constructores solo usan campos simples para que también funcionen con los
+# modelos históricos dentro de las migraciones. Devuelven los datos comunes del
+# evento y los ids de los maestros en cuyo kardex aparece.
+def datos_historial(item):
+    # La migración que crea KardexEvento es anterior a maestro_secundario
+    return {item.maestro_id, getattr(item, 'maestro_secundario_id', None)}, {
+        'fecha': item.fecha_creacion,
+        'descripcion': item.tipo_documento[:255],
+        'detalle': item.motivo or 'Ver documento',
+        'usuario': _usuario(item.usuario),
+    }
+
+
+def datos_correspondencia(item):
+    return {item.maestro_id}, {
+        'fecha': _inicio_del_dia(item.fecha_recibido),
+        'descripcion': f"Recibido: {item.get_tipo_documento_display()} de {item.remitente}"[:255],
+        'detalle': item.contenido or '',
+        'usuario': item.quien_recibio or 'N/A',
+    }
+
+
+def datos_movimiento(item):
+    return {item.maestro_id}, {
+        'fecha': item.fecha,
+        'descripcion': 'Anotación en Kardex',
+        'detalle': item.descripcion or '',
+        'usuario': _usuario(item.usuario),
+    }
+
+
+def datos_fup(item):
+    return {item.maestro_id}, {
+        'fecha': _inicio_del_dia(item.fecha),
+        'descripcion': 'Captura de FUP',
+        'detalle': f"Folio: {item.folio}",
+        'usuario': 'Sistema',
+    }
+
+
+FUENTES = {
+    TIPO_TRAMITE: ('Historial', datos_historial),
+    TIPO_CORRESPONDENCIA: ('RegistroCorrespondencia', datos_correspondencia),
+    TIPO_MOVIMIENTO: ('KardexMovimiento', datos_movimiento),
+    TIPO_FUP: ('FUP', datos_fup),
+}
+
+TIPO_POR_MODELO = {nombre_modelo: tipo for tipo, (nombre_modelo, _) in FUENTES.items()}
+
+
+def vincular_maestros_secundarios(Historial, Maestro, tamano_lote=TAMANO_LOTE, guardar=True):
+    """
+    Llena Historial.maestro_secundario de los registros que solo tienen el nombre,
+    comparándolo con Maestro.nombre_completo_unaccented (indexado). Los nombres que
+    corresponden a más de un maestro no se vinculan.
+    Devuelve (registros vinculados, nombres sin maestro, nombres ambiguos).
+    Recibe las clases como argumento para poder usarse desde una migración.
+    """
+    pendientes = (
+        Historial.objects.filter(maestro_secundario__isnull=True)
+        .exclude(maestro_secundario_nombre__isnull=True).exclude(maestro_secundario_nombre='')
+        .order_by('pk').values_list('pk', 'maestro_secundario_nombre')
+    )
+    pks_por_nombre = {}
+    for pk, nombre in pendientes.iterator(chunk_size=tamano_lote):
+        clave = clave_nombre(nombre)
+        if clave:
+            pks_por_nombre.setdefault(clave, []).append(pk)
+
+    maestros_por_nombre = {}
+    for bloque in en_bloques(pks_por_nombre, tamano_lote):
+        coincidencias = Maestro.objects.filter(nombre_completo_unaccented__in=bloque)
+        for maestro_id, nombre in coincidencias.values_list('pk', 'nombre_completo_unaccented'):
+            maestros_por_nombre.setdefault(nombre, []).append(maestro_id)
+
+    vinculados, sin_maestro, ambiguos = [], 0, 0
+    for clave, pks in pks_por_nombre.items():
+        maestros = maestros_por_nombre.get(clave, [])
+        if len(maestros) != 1:
+            sin_maestro += not maestros
+            ambiguos += len(maestros) > 1
+            continue
+        if guardar:
+            # Un UPDATE por nombre: los registros de un mismo interino se vinculan juntos
+            for bloque in en_bloques(pks, tamano_lote):
+                Historial.objects.filter(pk__in=bloque).update(maestro_secundario_id=maestros[0])
+        vinculados.extend(pks)
+    return vinculados, sin_maestro, ambiguos
+
+
+def construir_eventos(KardexEvento, tipo, instancias):
+    """Eventos (sin guardar) de `instancias`, todas del modelo fuente de `tipo`."""
+    constructor = FUENTES[tipo][1]
+    eventos = []
+    for instancia in instancias:
+        maestros, datos = constructor(instancia)
+        if datos['fecha'] is None:
+            continue
+        for maestro_id in maestros - {None}:
+            eventos.append(KardexEvento(tipo=tipo, objeto_id=instancia.pk, maestro_id=maestro_id, **datos))
+    return eventos
+
+
+def sincronizar_eventos(instancias):
+    """
+    Reemplaza los eventos de registros de un mismo modelo. Lo llama la señal post_save
+    con un solo registro y las escrituras masivas con todos los creados o modificados.
+    """
+    from .models import KardexEvento
+
+    instancias = list(instancias)
+    if not instancias:
+        return
+    tipo = TIPO_POR_MODELO[type(instancias[0]).__name__]
+    KardexEvento.objects.filter(tipo=tipo, objeto_id__in=[i.pk for i in instancias]).delete()
+    KardexEvento.objects.bulk_create(construir_eventos(KardexEvento, tipo, instancias), batch_size=TAMANO_LOTE)
+
+
+def eliminar_eventos(instancia):
+    from .models import KardexEvento
+
+    tipo = TIPO_POR_MODELO[type(instancia).__name__]
+    KardexEvento.objects.filter(tipo=tipo, objeto_id=instancia.pk).delete()
+
+
+def poblar_eventos(KardexEvento, modelos):
+    """
+    Llena KardexEvento a partir de `modelos` ({tipo: clase del modelo}).
+    Recibe las clases como argumento para poder usarse desde una migración.
+    """
+    total = 0
+    for tipo, modelo in modelos.items():
+        queryset = modelo.objects.order_by('pk')
+        if tipo in (TIPO_TRAMITE, TIPO_MOVIMIENTO):
+            queryset = queryset.select_related('usuario')
+        lote = []
+        for instancia in queryset.iterator(chunk_size=TAMANO_LOTE):
+            lote.append(instancia)
+            if len(lote) >= TAMANO_LOTE:
+                total += len(KardexEvento.objects.bulk_create(construir_eventos(KardexEvento, tipo, lote)))
+                lote = []
+        total += len(KardexEvento.objects.bulk_create(construir_eventos(KardexEvento, tipo, lote)))
+    return total
+
+
+def reconstruir_eventos():
+    from . import models
+
+    models.KardexEvento.objects.all().delete()
+    modelos = {tipo: getattr(models, nombre) for tipo, (nombre, _) in FUENTES.items()}
+    return poblar_eventos(models.KardexEvento, modelos)
@@ -0,0 +1,183 @@
+"""
+Índice materializado de directivos: director de cada escuela y supervisor de cada zona.
+
+LiderazgoZona guarda el supervisor de cada zona y LiderazgoEscuela el director de
+cada escuela junto con el supervisor de su zona, de modo que los documentos, las
+fichas de escuela y zona y los reportes los obtienen con un select_related en lugar
+de recorrer Maestro.funcion en cada consulta.
+
+Orden de prioridad:
+- Director: el registro vigente de Director (fecha_inicio <= hoy y sin fecha_fin o
+  con fecha_fin >= hoy); si no hay, el primer maestro de la escuela con función de
+  director, en el orden de Maestro.
+- Supervisor: Zona.supervisor; si no está asignado, el primer maestro de la zona con
+  función de supervisor.
+
+Las señales de signals.py actualizan las escuelas y zonas afectadas al guardar o
+borrar un Maestro, Director, Zona o Escuela. Las actualizaciones masivas
+(queryset.update, bulk_create) deben llamar a actualizar_escuelas/actualizar_zonas o
+a reconstruir_liderazgo; como los nombramientos de Director vencen por fecha,
+conviene ejecutar diariamente `manage.py reconstruir_liderazgo`.
+
+Las funciones aceptan un registro de apps (`apps`) para poder usarse desde migraciones.
+"""
+from datetime import date
+
+from django.db.models import Q
+
+# Todas las grafías de la función que se han usado en los datos
+FUNCIONES_DIRECTOR = ['DIRECTOR', 'DIRECTOR (A)', 'DIRECTOR(A)']
+FUNCIONES_SUPERVISOR = ['SUPERVISOR', 'SUPERVISOR (A)', 'SUPERVISOR(A)']
+
+TAMANO_BLOQUE = 500
+
+
+def _modelo(nombre, apps=None):
+    if apps is None:
+        from django.apps import apps
+    return apps.get_model('gestion_escolar', nombre)
+
+
+def _bloques(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), TAMANO_BLOQUE):
+        yield ids[i:i + TAMANO_BLOQUE]
+
+
+def _primero_por(maestros, campo):
+    """{valor de `campo`: pk del primer maestro}, en el orden de Maestro (como .first())."""
+    primeros = {}
+    for clave, pk in maestros.order_by('a_paterno', 'a_materno', 'nombres', 'pk').values_list(campo, 'pk'):
+        primeros.setdefault(clave, pk)
+    return primeros
+
+
+def calcular_directores(escuela_ids, apps=None):
+    """{escuela_id: maestro_id del director} de las escuelas indicadas."""
+    Director = _modelo('Director', apps)
+    Maestro = _modelo('Maestro', apps)
+    hoy = date.today()
+
+    directores = dict(
+        Director.objects.filter(escuela_id__in=escuela_ids, fecha_inicio__lte=hoy)
+        .filter(Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=hoy))
+        .values_list('escuela_id', 'maestro_id')
+    )
+    faltantes = [pk for pk in escuela_ids if pk not in directores]
+    if faltantes:
+        directores.update(_primero_por(
+            Maestro.objects.filter(id_escuela_id__in=faltantes, funcion__in=FUNCIONES_DIRECTOR), 'id_escuela_id'
+        ))
+    return directores
+
+
+def calcular_supervisores(zona_ids, apps=None):
+    """{zona_id: maestro_id del supervisor} de las zonas indicadas."""
+    Zona = _modelo('Zona', apps)
+    Maestro = _modelo('Maestro', apps)
+
+    supervisores = dict(
+        Zona.objects.filter(pk__in=zona_ids, supervisor__isnull=False).values_list('pk', 'supervisor_id')
+    )
+    faltantes = [pk for pk in zona_ids if pk not in supervisores]
+    if faltantes:
+        supervisores.update(_primero_por(
+            Maestro.objects.filter(id_escuela__zona_esc_id__in=faltantes, funcion__in=FUNCIONES_SUPERVISOR),
+            'id_escuela__zona_esc_id'
+        ))
+    return supervisores
+
+
+def actualizar_zonas(zona_ids, apps=None):
+    """Recalcula el supervisor de las zonas y lo propaga a sus escuelas."""
+    LiderazgoZona = _modelo('LiderazgoZona', apps)
+    LiderazgoEscuela = _modelo('LiderazgoEscuela', apps)
+
+    for bloque in _bloques(set(zona_ids) - {None}):
+        supervisores = calcular_supervisores(bloque, apps)
+        LiderazgoZona.objects.filter(zona_id__in=bloque).delete()
+        LiderazgoZona.objects.bulk_create(
+            [LiderazgoZona(zona_id=pk, supervisor_id=supervisores.get(pk)) for pk in bloque]
+        )
+        for pk in bloque:
+            LiderazgoEscuela.objects.filter(escuela__zona_esc_id=pk).update(supervisor_id=supervisores.get(pk))
+
+
+def actualizar_escuelas(escuela_ids, apps=None):
+    """Recalcula el director de las escuelas y toma el supervisor de su zona."""
+    Escuela = _modelo('Escuela', apps)
+    LiderazgoZona = _modelo('LiderazgoZona', apps)
+    LiderazgoEscuela = _modelo('LiderazgoEscuela', apps)
+
+    for bloque in _bloques(set(escuela_ids) - {None}):
+        zonas = dict(Escuela.objects.filter(pk__in=bloque).values_list('pk', 'zona_esc_id'))
+        sin_indice = set(zonas.values()) - set(
+            LiderazgoZona.objects.filter(zona_id__in=set(zonas.values())).values_list('zona_id', flat=True)
+        )
+        if sin_indice:
+            actualizar_zonas(sin_indice, apps)
+        supervisores = dict(
+            LiderazgoZona.objects.filter(zona_id__in=set(zonas.values())).values_list('zona_id', 'supervisor_id')
+        )
+        directores = calcular_directores(list(zonas), apps)
+
+        LiderazgoEscuela.objects.filter(escuela_id__in=bloque).delete()
+        LiderazgoEscuela.objects.bulk_create([
+            LiderazgoEscuela(escuela_id=pk, director_id=directores.get(pk), supervisor_id=supervisores.get(zona_id))
+            for pk, zona_id in zonas.items()
+        ])
+
+
+def reconstruir_liderazgo(apps=None):
+    """Reconstruye todo el índice. Devuelve (zonas, escuelas) indexadas."""
+    Zona = _modelo('Zona', apps)
+    Escuela = _modelo('Escuela', apps)
+    LiderazgoZona = _modelo('LiderazgoZona', apps)
+    LiderazgoEscuela = _modelo('LiderazgoEscuela', apps)
+
+    LiderazgoEscuela.objects.all().delete()
+    LiderazgoZona.objects.all().delete()
+    zona_ids = list(Zona.objects.values_list('pk', flat=True))
+    escuela_ids = list(Escuela.objects.values_list('pk', flat=True))
+    actualizar_zonas(zona_ids, apps)
+    actualizar_escuelas(escuela_ids, apps)
+    return len(zona_ids), len(escuela_ids)
+
+
+def afectados_por_maestro(maestro):
+    """
+    (escuela_ids, zona_ids) cuyo director o supervisor puede cambiar con este maestro:
+    donde figura actualmente en el índice y, si tiene función directiva, su escuela o zona.
+    """
+    from .models import Escuela, LiderazgoEscuela, LiderazgoZona
+
+    escuelas = set(LiderazgoEscuela.objects.filter(director=maestro).values_list('escuela_id', flat=True))
+    zonas = set(LiderazgoZona.objects.filter(supervisor=maestro).values_list('zona_id', flat=True))
+    if maestro.id_escuela_id:
+        if maestro.funcion in FUNCIONES_DIRECTOR:
+            escuelas.add(maestro.id_escuela_id)
+        elif maestro.funcion in FUNCIONES_SUPERVISOR:
+            zonas.update(Escuela.objects.filter(pk=maestro.id_escuela_id).values_list('zona_esc_id', flat=True))
+    return escuelas, zonas
+
+
+def director_de_escuela(escuela):
+    """Director de la escuela según el índice (la indexa si aún no lo está)."""
+    from .models import LiderazgoEscuela
+
+    liderazgo = LiderazgoEscuela.objects.select_related('director').filter(escuela=escuela).first()
+    if liderazgo is None:
+        actualizar_escuelas([escuela.pk])
+        liderazgo = LiderazgoEscuela.objects.select_related('director').get(escuela=escuela)
+    return liderazgo.director
+
+
+def supervisor_de_zona(zona):
+    """Supervisor de la zona según el índice (lo calcula si aún no está indexada)."""
+    from .models import LiderazgoZona
+
+    liderazgo = LiderazgoZona.objects.select_related('supervisor').filter(zona=zona).first()
+    if liderazgo is None:
+        actualizar_zonas([zona.pk])
+        liderazgo = LiderazgoZona.objects.select_related('supervisor').get(zona=zona)
+    return liderazgo.supervisor
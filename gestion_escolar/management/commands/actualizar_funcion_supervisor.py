@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from gestion_escolar.models import Maestro
 from django.db.models import Value
 from django.db.models.functions import Replace
+from gestion_escolar.liderazgo import reconstruir_liderazgo
 
 class Command(BaseCommand):
     help = 'Actualiza el campo funcion de "SUPERVISOR (A)" a "SUPERVISOR(A)" en el modelo Maestro'
@@ -25,4 +26,7 @@ class Command(BaseCommand):
         final_count = Maestro.objects.filter(funcion__iexact='SUPERVISOR(A)').update(funcion='SUPERVISOR(A)')
         
         self.stdout.write(self.style.SUCCESS(f'Se normalizaron a mayúsculas {final_count} registros.'))
+
+        # update() no dispara señales: el índice de directivos se reconstruye completo
+        reconstruir_liderazgo()
         self.stdout.write(self.style.SUCCESS('Actualización completada.'))
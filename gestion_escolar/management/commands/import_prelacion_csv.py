@@ -1,61 +1,114 @@
-import csv
+import time
+
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from gestion_escolar.identificadores import invalidar_prelaciones, normalizar_clave
+from gestion_escolar.importacion import en_bloques, leer_filas, texto
 from gestion_escolar.models import Prelacion
 
+COLUMNAS = ['pos_orden', 'FOLIO', 'CURP', 'NOMBRE', 'tipo_val']
+# Campos que se comparan con el registro existente y se escriben al crear/actualizar
+CAMPOS = ['pos_orden', 'curp', 'curp_normalizada', 'nombre', 'tipo_val']
+
+
 class Command(BaseCommand):
     help = 'Importa datos de prelación desde un archivo CSV'
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='La ruta al archivo CSV a importar')
+        parser.add_argument('--tamano-lote', type=int, default=1000, help='Registros por consulta de lectura/escritura (por defecto 1000).')
+        parser.add_argument('--dry-run', action='store_true', help='Calcula los cambios sin guardarlos.')
 
     def handle(self, *args, **options):
         csv_file_path = options['csv_file']
+        tamano_lote = max(options['tamano_lote'], 1)
+        inicio = time.monotonic()
 
         try:
-            with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                if not all(field in reader.fieldnames for field in ['pos_orden', 'FOLIO', 'CURP', 'NOMBRE', 'tipo_val']):
-                    raise CommandError("El archivo CSV debe contener las columnas: pos_orden, FOLIO, CURP, NOMBRE, tipo_val")
-                
-                imported_count = 0
-                updated_count = 0
-                errors = []
-
-                for row in reader:
-                    try:
-                        # Convertir pos_orden a entero
-                        pos_orden = int(row['pos_orden'])
-
-                        # Intentar obtener o crear el objeto Prelacion
-                        # Usamos 'folio' como identificador único para actualizar o crear
-                        prelacion, created = Prelacion.objects.update_or_create(
-                            folio=row['FOLIO'],
-                            defaults={
-                                'pos_orden': pos_orden,
-                                'curp': row['CURP'],
-                                'nombre': row['NOMBRE'],
-                                'tipo_val': row['tipo_val'],
-                            }
-                        )
-                        if created:
-                            imported_count += 1
-                        else:
-                            updated_count += 1
-                    except ValueError as e:
-                        errors.append(f"Error de valor en la fila {reader.line_num}: {e} - Datos: {row}")
-                    except Exception as e:
-                        errors.append(f"Error al procesar la fila {reader.line_num}: {e} - Datos: {row}")
-
-            self.stdout.write(self.style.SUCCESS(f'Importación finalizada.'))
-            self.stdout.write(self.style.SUCCESS(f'Registros creados: {imported_count}'))
-            self.stdout.write(self.style.SUCCESS(f'Registros actualizados: {updated_count}'))
-            
-            if errors:
-                self.stdout.write(self.style.WARNING('Se encontraron errores durante la importación:'))
-                for error in errors:
-                    self.stdout.write(self.style.ERROR(f'- {error}'))
-
+            filas, errors = self._leer(csv_file_path)
         except FileNotFoundError:
             raise CommandError(f'El archivo CSV "{csv_file_path}" no fue encontrado')
+
+        nuevos, modificados, sin_cambios = self._comparar(filas, tamano_lote)
+
+        try:
+            with transaction.atomic():
+                self._guardar(nuevos, modificados, tamano_lote)
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+                elif nuevos or modificados:
+                    # bulk_create/bulk_update no disparan las señales que vacían la caché de prelaciones
+                    transaction.on_commit(invalidar_prelaciones)
         except Exception as e:
-            raise CommandError(f'Ocurrió un error inesperado: {e}')
\ No newline at end of file
+            raise CommandError(f'Ocurrió un error inesperado: {e}')
+
+        duracion = time.monotonic() - inicio
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Modo --dry-run: no se guardó ningún cambio.'))
+        self.stdout.write(self.style.SUCCESS(f'Importación finalizada en {duracion:.2f} s.'))
+        self.stdout.write(self.style.SUCCESS(f'Registros creados: {len(nuevos)}'))
+        self.stdout.write(self.style.SUCCESS(f'Registros actualizados: {len(modificados)}'))
+        self.stdout.write(self.style.SUCCESS(f'Registros sin cambios: {sin_cambios}'))
+
+        if errors:
+            self.stdout.write(self.style.WARNING('Se encontraron errores durante la importación:'))
+            for error in errors:
+                self.stdout.write(self.style.ERROR(f'- {error}'))
+
+    def _leer(self, ruta):
+        """{folio: {campo: valor}} del archivo; si un folio se repite, gana la última fila."""
+        filas, errors = {}, []
+        for line_num, row in leer_filas(ruta):
+            if not filas and not errors and not all(campo in row for campo in COLUMNAS):
+                raise CommandError("El archivo CSV debe contener las columnas: pos_orden, FOLIO, CURP, NOMBRE, tipo_val")
+            try:
+                # Convertir pos_orden a entero
+                pos_orden = int(texto(row['pos_orden']))
+            except ValueError as e:
+                errors.append(f"Error de valor en la fila {line_num}: {e} - Datos: {row}")
+                continue
+
+            folio = texto(row['FOLIO'])
+            if not folio:
+                errors.append(f"Error al procesar la fila {line_num}: falta el folio - Datos: {row}")
+                continue
+            filas[folio] = {
+                'pos_orden': pos_orden,
+                'curp': texto(row['CURP']),
+                'curp_normalizada': normalizar_clave(texto(row['CURP'])),
+                'nombre': texto(row['NOMBRE']),
+                'tipo_val': texto(row['tipo_val']),
+            }
+        return filas, errors
+
+    def _comparar(self, filas, tamano_lote):
+        """Separa las filas en registros nuevos, registros modificados y el conteo de los que no cambian."""
+        nuevos, modificados, sin_cambios = [], [], 0
+        for bloque in en_bloques(filas, tamano_lote):
+            existentes = Prelacion.objects.in_bulk(bloque, field_name='folio')
+            for folio in bloque:
+                datos = filas[folio]
+                prelacion = existentes.get(folio)
+                if prelacion is None:
+                    nuevos.append(Prelacion(folio=folio, **datos))
+                elif any(getattr(prelacion, campo) != valor for campo, valor in datos.items()):
+                    for campo, valor in datos.items():
+                        setattr(prelacion, campo, valor)
+                    modificados.append(prelacion)
+                else:
+                    sin_cambios += 1
+        return nuevos, modificados, sin_cambios
+
+    def _guardar(self, nuevos, modificados, tamano_lote):
+        if connection.features.supports_update_conflicts_with_target:
+            # Un solo INSERT ... ON CONFLICT (folio) DO UPDATE por lote para nuevos y modificados.
+            # Los modificados van sin pk para que el conflicto sea por folio y no por id.
+            sin_pk = [Prelacion(folio=p.folio, **{campo: getattr(p, campo) for campo in CAMPOS}) for p in modificados]
+            Prelacion.objects.bulk_create(
+                nuevos + sin_pk, batch_size=tamano_lote,
+                update_conflicts=True, unique_fields=['folio'], update_fields=CAMPOS,
+            )
+            return
+        Prelacion.objects.bulk_create(nuevos, batch_size=tamano_lote)
+        Prelacion.objects.bulk_update(modificados, CAMPOS, batch_size=tamano_lote)
@@ -2,7 +2,7 @@
 Comando para importar FUPs desde un archivo Excel.
 
 Uso:
-    python manage.py importar_fups ruta/al/archivo.xlsx
+    python manage.py importar_fups ruta/al/archivo.xlsx [--dry-run] [--tamano-lote 1000]
 
 El archivo Excel debe tener las siguientes columnas:
 - FECHA
@@ -15,13 +15,29 @@ El archivo Excel debe tener las siguientes columnas:
 - OBSERVACIONES
 - SOSTENIMIENTO
 - TECHO FINANCIERO
+
+La hoja se lee en modo read_only (fila por fila) y los maestros se buscan en
+diccionarios por CURP y RFC normalizadas armados con una sola consulta. Los FUPs se insertan
+con bulk_create por bloques y el techo financiero de los maestros se actualiza
+con un solo bulk_update al final, todo dentro de una transacción.
 """
 
-from django.core.management.base import BaseCommand, CommandError
-from gestion_escolar.models import FUP, Maestro
-import openpyxl
-from datetime import datetime
 import os
+import time
+from collections import defaultdict
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from gestion_escolar.busqueda_texto import TIPO_FUP, indexar_objetos
+from gestion_escolar.datatables import invalidar_conteos
+from gestion_escolar.identificadores import normalizar_clave
+from gestion_escolar.importacion import ErrorFila, convertir_fecha, en_bloques, leer_filas, texto
+from gestion_escolar.kardex_eventos import sincronizar_eventos
+from gestion_escolar.models import FUP, EntradaBusqueda, Maestro
+
+CAMPOS_ACTUALIZABLES = ['maestro', 'techo_financiero', 'efectos', 'sostenimiento', 'observaciones', 'fecha']
 
 
 class Command(BaseCommand):
@@ -29,180 +45,195 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('archivo_excel', type=str, help='Ruta al archivo Excel con los datos de FUPs')
+        parser.add_argument('--tamano-lote', type=int, default=1000, help='FUPs que se insertan juntos (por defecto 1000).')
+        parser.add_argument('--dry-run', action='store_true', help='Procesa el archivo e informa los tiempos sin guardar cambios.')
 
     def handle(self, *args, **options):
         archivo_path = options['archivo_excel']
-        
+
         # Verificar que el archivo existe
         if not os.path.exists(archivo_path):
             raise CommandError(f'El archivo "{archivo_path}" no existe')
-        
+
         self.stdout.write(self.style.SUCCESS(f'Leyendo archivo: {archivo_path}'))
-        
+        self.tamano_lote = max(options['tamano_lote'], 1)
+        inicio = time.monotonic()
+
+        self._cargar_maestros()
+        duracion_carga = time.monotonic() - inicio
+
+        self.creados = self.actualizados = self.errores = self.filas = 0
+        self.por_folio = {}  # folio -> FUP (existente o creado en esta importación)
+        self.maestros_techo = {}  # pk -> Maestro cuyo techo_f cambió
+
         try:
-            # Cargar el archivo Excel
-            wb = openpyxl.load_workbook(archivo_path)
-            ws = wb.active
-            
-            # Obtener los encabezados (primera fila)
-            headers = [cell.value.strip() if cell.value else '' for cell in ws[1]]
-            self.stdout.write(f'Columnas encontradas: {headers}')
-            
-            # Contadores
-            creados = 0
-            errores = 0
-            actualizados = 0
-            
-            # Procesar cada fila (empezando desde la fila 2)
-            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                try:
-                    # Crear un diccionario con los datos de la fila
-                    datos = {}
-                    for header, value in zip(headers, row):
-                        if header:
-                            datos[header.strip()] = value
-                    
-                    # Saltar filas vacías
-                    if not datos.get('CURP') and not datos.get('RFC'):
-                        continue
-                    
-                    # Buscar el maestro por CURP o RFC
-                    maestro = None
-                    if datos.get('CURP'):
-                        curp = str(datos['CURP']).strip().upper()
-                        try:
-                            maestro = Maestro.objects.get(curp=curp)
-                        except Maestro.DoesNotExist:
-                            self.stdout.write(self.style.ERROR(
-                                f'Fila {row_num}: Maestro con CURP {curp} no encontrado'
-                            ))
-                            errores += 1
-                            continue
-                    elif datos.get('RFC'):
-                        rfc = str(datos['RFC']).strip().upper()
-                        try:
-                            maestro = Maestro.objects.get(rfc=rfc)
-                        except Maestro.DoesNotExist:
-                            self.stdout.write(self.style.ERROR(
-                                f'Fila {row_num}: Maestro con RFC {rfc} no encontrado'
-                            ))
-                            errores += 1
-                            continue
-                    else:
-                        self.stdout.write(self.style.ERROR(
-                            f'Fila {row_num}: No se proporcionó CURP ni RFC'
-                        ))
-                        errores += 1
-                        continue
-                    
-                    # Procesar la fecha
-                    fecha = None
-                    if datos.get('FECHA'):
-                        if isinstance(datos['FECHA'], datetime):
-                            fecha = datos['FECHA'].date()
-                        else:
-                            # Intentar parsear la fecha si es string
-                            try:
-                                fecha = datetime.strptime(str(datos['FECHA']), '%d/%m/%Y').date()
-                            except ValueError:
-                                try:
-                                    fecha = datetime.strptime(str(datos['FECHA']), '%Y-%m-%d').date()
-                                except ValueError:
-                                    try:
-                                        # Formato DD-MM-YYYY
-                                        fecha = datetime.strptime(str(datos['FECHA']), '%d-%m-%Y').date()
-                                    except ValueError:
-                                        self.stdout.write(self.style.WARNING(
-                                            f'Fila {row_num}: Formato de fecha inválido "{datos["FECHA"]}", usando fecha actual'
-                                        ))
-                                        fecha = datetime.now().date()
-                    else:
-                        fecha = datetime.now().date()
-                    
-                    # Obtener folio
-                    folio = str(datos.get('FOLIO', '')).strip() if datos.get('FOLIO') else ''
-                    
-                    # Verificar si ya existe un FUP con el mismo folio
-                    fup_existente = None
-                    if folio:
-                        try:
-                            fup_existente = FUP.objects.get(folio=folio)
-                            self.stdout.write(self.style.WARNING(
-                                f'Fila {row_num}: Ya existe un FUP con folio {folio}, se actualizará'
-                            ))
-                        except FUP.DoesNotExist:
-                            pass
-                    
-                    # Preparar datos del FUP
-                    # Si el techo financiero está vacío en el Excel, usar el del maestro
-                    techo_financiero = str(datos.get('TECHO FINANCIERO', '')).strip() if datos.get('TECHO FINANCIERO') else ''
-                    if not techo_financiero and maestro.techo_financiero:
-                        techo_financiero = maestro.techo_financiero
-                        self.stdout.write(self.style.WARNING(
-                            f'Fila {row_num}: Techo financiero vacío, usando el del maestro: {techo_financiero}'
-                        ))
-                    
-                    efectos = str(datos.get('EFECTOS', '')).strip() if datos.get('EFECTOS') else ''
-                    sostenimiento = str(datos.get('SOSTENIMIENTO', '')).strip().upper() if datos.get('SOSTENIMIENTO') else ''
-                    observaciones = str(datos.get('OBSERVACIONES', '')).strip() if datos.get('OBSERVACIONES') else ''
-                    
-                    # Validar sostenimiento
-                    if sostenimiento and sostenimiento not in ['FEDERAL', 'ESTATAL']:
-                        self.stdout.write(self.style.WARNING(
-                            f'Fila {row_num}: Sostenimiento "{sostenimiento}" no válido, se dejará vacío'
-                        ))
-                        sostenimiento = ''
-                    
-                    if fup_existente:
-                        # Actualizar FUP existente
-                        fup_existente.maestro = maestro
-                        fup_existente.techo_financiero = techo_financiero
-                        fup_existente.efectos = efectos
-                        fup_existente.sostenimiento = sostenimiento
-                        fup_existente.observaciones = observaciones
-                        fup_existente.save()
-                        
-                        if fecha:
-                            FUP.objects.filter(pk=fup_existente.pk).update(fecha=fecha)
-                        
-                        actualizados += 1
-                        self.stdout.write(self.style.SUCCESS(
-                            f'Fila {row_num}: FUP actualizado - Folio: {folio} - {maestro.nombres} {maestro.a_paterno}'
-                        ))
-                    else:
-                        # Crear nuevo FUP
-                        fup = FUP(
-                            maestro=maestro,
-                            folio=folio,
-                            techo_financiero=techo_financiero,
-                            efectos=efectos,
-                            sostenimiento=sostenimiento,
-                            observaciones=observaciones,
-                        )
-                        
-                        fup.save()
-                        
-                        if fecha:
-                            FUP.objects.filter(pk=fup.pk).update(fecha=fecha)
-                        
-                        creados += 1
-                        self.stdout.write(self.style.SUCCESS(
-                            f'Fila {row_num}: FUP creado - Folio: {folio} - {maestro.nombres} {maestro.a_paterno}'
-                        ))
-                    
-                except Exception as e:
-                    errores += 1
-                    self.stdout.write(self.style.ERROR(
-                        f'Fila {row_num}: Error al procesar - {str(e)}'
-                    ))
-            
-            # Resumen
-            self.stdout.write(self.style.SUCCESS(f'\n=== RESUMEN ==='))
-            self.stdout.write(self.style.SUCCESS(f'FUPs creados: {creados}'))
-            if actualizados > 0:
-                self.stdout.write(self.style.SUCCESS(f'FUPs actualizados: {actualizados}'))
-            if errores > 0:
-                self.stdout.write(self.style.ERROR(f'Errores: {errores}'))
-            
+            with transaction.atomic():
+                for bloque in en_bloques(leer_filas(archivo_path), self.tamano_lote):
+                    self._procesar_bloque(bloque)
+                self._actualizar_techos()
+                if options['dry_run']:
+                    transaction.set_rollback(True)
         except Exception as e:
             raise CommandError(f'Error al procesar el archivo: {str(e)}')
+
+        duracion = time.monotonic() - inicio
+        velocidad = self.filas / duracion if duracion else 0
+
+        # Resumen
+        self.stdout.write(self.style.SUCCESS(f'\n=== RESUMEN ==='))
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Modo --dry-run: no se guardó ningún cambio.'))
+        self.stdout.write(self.style.SUCCESS(f'FUPs creados: {self.creados}'))
+        if self.actualizados > 0:
+            self.stdout.write(self.style.SUCCESS(f'FUPs actualizados: {self.actualizados}'))
+        if self.maestros_techo:
+            self.stdout.write(self.style.SUCCESS(f'Maestros con techo financiero actualizado: {len(self.maestros_techo)}'))
+        if self.errores > 0:
+            self.stdout.write(self.style.ERROR(f'Errores: {self.errores}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.filas} fila(s) en {duracion:.2f} s ({velocidad:.0f} filas/s; '
+            f'carga de maestros {duracion_carga:.2f} s).'
+        ))
+
+    def _cargar_maestros(self):
+        """Diccionarios CURP -> Maestro y RFC -> Maestro; las claves repetidas quedan como ambiguas."""
+        self.por_curp, self.por_rfc = {}, {}
+        self.curps_repetidas, self.rfcs_repetidos = set(), set()
+        maestros = Maestro.objects.only(
+            'id_maestro', 'curp', 'rfc', 'curp_normalizada', 'rfc_normalizado',
+            'techo_f', 'a_paterno', 'a_materno', 'nombres', 'clave_presupuestal',
+        )
+        for maestro in maestros.iterator(chunk_size=2000):
+            for clave, indice, repetidos in (
+                (maestro.curp_normalizada, self.por_curp, self.curps_repetidas),
+                (maestro.rfc_normalizado, self.por_rfc, self.rfcs_repetidos),
+            ):
+                if not clave:
+                    continue
+                if clave in indice:
+                    repetidos.add(clave)
+                indice[clave] = maestro
+
+    def _buscar_maestro(self, datos):
+        if datos.get('CURP'):
+            clave, indice, repetidos, nombre = normalizar_clave(texto(datos['CURP'])), self.por_curp, self.curps_repetidas, 'CURP'
+        else:
+            clave, indice, repetidos, nombre = normalizar_clave(texto(datos['RFC'])), self.por_rfc, self.rfcs_repetidos, 'RFC'
+        if clave in repetidos:
+            raise ErrorFila(f'Hay más de un maestro con {nombre} {clave}')
+        if clave not in indice:
+            raise ErrorFila(f'Maestro con {nombre} {clave} no encontrado')
+        return indice[clave]
+
+    def _fecha(self, row_num, valor):
+        try:
+            fecha = convertir_fecha(valor)
+        except ErrorFila:
+            self.stdout.write(self.style.WARNING(
+                f'Fila {row_num}: Formato de fecha inválido "{valor}", usando fecha actual'
+            ))
+            return date.today()
+        return fecha or date.today()
+
+    def _procesar_bloque(self, bloque):
+        folios = {texto(datos.get('FOLIO')) for _, datos in bloque} - {''} - set(self.por_folio)
+        existentes = defaultdict(list)
+        for fup in FUP.objects.filter(folio__in=folios).select_related('maestro'):
+            existentes[fup.folio].append(fup)
+        for folio, fups in existentes.items():
+            # Con varios FUPs del mismo folio no se sabe cuál actualizar: se marca como ambiguo
+            self.por_folio[folio] = fups[0] if len(fups) == 1 else None
+
+        nuevos, modificados = [], {}
+        for row_num, datos in bloque:
+            # Saltar filas vacías
+            if not datos.get('CURP') and not datos.get('RFC'):
+                continue
+            self.filas += 1
+            try:
+                fup, es_nuevo = self._preparar(row_num, datos)
+            except ErrorFila as e:
+                self.errores += 1
+                self.stdout.write(self.style.ERROR(f'Fila {row_num}: {e}'))
+                continue
+
+            if es_nuevo:
+                nuevos.append(fup)
+            elif fup.pk is not None:  # un folio repetido dentro del bloque ya está en `nuevos`
+                modificados[fup.pk] = fup
+
+        if nuevos:
+            fechas = [fup.fecha for fup in nuevos]
+            FUP.objects.bulk_create(nuevos, batch_size=self.tamano_lote)
+            # `fecha` es auto_now_add: bulk_create pone la de hoy, se corrige con un UPDATE por fecha distinta
+            pks_por_fecha = defaultdict(list)
+            for fup, fecha in zip(nuevos, fechas):
+                fup.fecha = fecha
+                pks_por_fecha[fecha].append(fup.pk)
+            for fecha, pks in pks_por_fecha.items():
+                FUP.objects.filter(pk__in=pks).update(fecha=fecha)
+            self.creados += len(nuevos)
+        if modificados:
+            FUP.objects.bulk_update(modificados.values(), CAMPOS_ACTUALIZABLES, batch_size=self.tamano_lote)
+            self.actualizados += len(modificados)
+            EntradaBusqueda.objects.filter(tipo=TIPO_FUP, objeto_id__in=list(modificados)).delete()
+
+        # bulk_create/bulk_update no disparan post_save: índice de búsqueda, kardex y conteos a mano
+        indexar_objetos(nuevos + list(modificados.values()))
+        sincronizar_eventos(nuevos + list(modificados.values()))
+        invalidar_conteos(FUP)
+
+    def _preparar(self, row_num, datos):
+        """Devuelve (fup, es_nuevo) con los datos de la fila aplicados, o lanza ErrorFila."""
+        maestro = self._buscar_maestro(datos)
+        fecha = self._fecha(row_num, datos.get('FECHA')) if datos.get('FECHA') else date.today()
+
+        # Verificar si ya existe un FUP con el mismo folio (en la base o más arriba en el archivo)
+        folio = texto(datos.get('FOLIO'))
+        if folio and folio in self.por_folio and self.por_folio[folio] is None:
+            raise ErrorFila(f'Hay más de un FUP con folio {folio}')
+        fup = self.por_folio.get(folio) if folio else None
+
+        # Si el techo financiero está vacío en el Excel, usar el del maestro
+        techo_financiero = texto(datos.get('TECHO FINANCIERO'))
+        if not techo_financiero and maestro.techo_f:
+            techo_financiero = maestro.techo_f
+            self.stdout.write(self.style.WARNING(
+                f'Fila {row_num}: Techo financiero vacío, usando el del maestro: {techo_financiero}'
+            ))
+
+        sostenimiento = texto(datos.get('SOSTENIMIENTO')).upper()
+        # Validar sostenimiento
+        if sostenimiento and sostenimiento not in ['FEDERAL', 'ESTATAL']:
+            self.stdout.write(self.style.WARNING(
+                f'Fila {row_num}: Sostenimiento "{sostenimiento}" no válido, se dejará vacío'
+            ))
+            sostenimiento = ''
+
+        es_nuevo = fup is None
+        if es_nuevo:
+            fup = FUP(maestro=maestro, folio=folio)
+        fup.maestro = maestro
+        fup.techo_financiero = techo_financiero
+        fup.efectos = texto(datos.get('EFECTOS'))
+        fup.sostenimiento = sostenimiento
+        fup.observaciones = texto(datos.get('OBSERVACIONES'))
+        fup.fecha = fecha
+        if es_nuevo:
+            fup.tomar_datos_maestro()
+            if folio:
+                self.por_folio[folio] = fup
+
+        # Actualizar techo_f del maestro si cambió (lo que hace FUP.save()), en un solo bulk_update al final
+        if fup.techo_financiero and fup.techo_financiero != maestro.techo_f:
+            maestro.techo_f = fup.techo_financiero
+            self.maestros_techo[maestro.pk] = maestro
+        return fup, es_nuevo
+
+    def _actualizar_techos(self):
+        if not self.maestros_techo:
+            return
+        Maestro.objects.bulk_update(self.maestros_techo.values(), ['techo_f'], batch_size=self.tamano_lote)
+        # `desubicado` depende del techo financiero
+        Maestro.recalcular_desubicados(Maestro.objects.filter(pk__in=list(self.maestros_techo)))
+        invalidar_conteos(Maestro)
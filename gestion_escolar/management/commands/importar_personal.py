@@ -0,0 +1,286 @@
+import os
+import re
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+from unidecode import unidecode
+
+from gestion_escolar.busqueda import indexar_maestros
+from gestion_escolar.datatables import invalidar_conteos
+from gestion_escolar.importacion import (
+    ArchivoErrores, ErrorFila, convertir_fecha, en_bloques, leer_filas, mensaje_validacion, texto,
+)
+from gestion_escolar.liderazgo import actualizar_escuelas, actualizar_zonas
+from gestion_escolar.models import Categoria, Escuela, Maestro, Secuencia, SECUENCIA_ID_MAESTRO
+
+# Campos de Maestro que se pueden importar. Los encabezados se comparan sin distinguir
+# mayúsculas, así que sirven tanto el formato de maestros_ejemplo.csv (nombres de campo)
+# como el de la plantilla (ID_Maestro, A_Paterno, ...), más los alias de ALIAS.
+CAMPOS = [
+    'id_maestro', 'a_paterno', 'a_materno', 'nombres', 'curp', 'rfc', 'sexo', 'est_civil',
+    'fecha_nacimiento', 'id_escuela', 'techo_f', 'dep', 'unid', 'sub_unid', 'categog', 'hrs',
+    'num_plaza', 'codigo', 'fecha_ingreso', 'fecha_promocion', 'form_academica', 'horario',
+    'funcion', 'nivel_estudio', 'domicilio_part', 'poblacion', 'codigo_postal', 'telefono',
+    'email', 'status', 'observaciones',
+]
+ALIAS = {'id_escuelas': 'id_escuela', 'categ': 'categog', 'tel': 'telefono'}
+
+CAMPOS_FECHA = {'fecha_nacimiento', 'fecha_ingreso', 'fecha_promocion'}
+# Números que Excel guarda sin ceros a la izquierda
+RELLENO_CEROS = {'dep': 2, 'unid': 2, 'sub_unid': 2, 'num_plaza': 6}
+OPCIONES = {
+    'sexo': Maestro.SEXO_OPCIONES,
+    'est_civil': Maestro.ESTADO_CIVIL_OPCIONES,
+    'funcion': Maestro.FUNCION_OPCIONES,
+    'nivel_estudio': Maestro.NIVEL_ESTUDIO_OPCIONES,
+    'status': Maestro.STATUS_OPCIONES,
+}
+# Se validan aparte, con los mapas precargados, para no consultar la base por fila
+EXCLUIR_VALIDACION = ['id_maestro', 'id_escuela', 'categog', 'user']
+
+
+def _clave_opcion(valor):
+    return re.sub(r'\s+\(', '(', unidecode(str(valor)).upper().strip())
+
+
+def _indice_opciones(opciones):
+    """{clave normalizada: valor} por valor y por etiqueta ('Dra.' -> 'DRA.', 'MAESTRO (A) ...' -> 'MAESTRO(A) ...')."""
+    indice = {}
+    for valor, etiqueta in opciones:
+        indice.setdefault(_clave_opcion(valor), valor)
+        indice.setdefault(_clave_opcion(etiqueta), valor)
+    return indice
+
+
+class Command(BaseCommand):
+    help = 'Importa o actualiza personal (Maestro) desde un CSV o XLSX con inserciones y actualizaciones masivas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--tamano-lote', type=int, default=1000, help='Filas que se validan y escriben juntas (por defecto 1000).')
+        parser.add_argument('--errores', help='CSV donde se escriben las filas rechazadas (por defecto <archivo>_errores.csv).')
+        parser.add_argument('--escuela-obligatoria', action='store_true', help='Rechaza las filas sin escuela o con un CCT inexistente (en lugar de importarlas sin escuela).')
+        parser.add_argument('--nivel-estudio-defecto', default='', help='Nivel de estudio para las filas que no lo traen (ej. PROF.).')
+        parser.add_argument('--dry-run', action='store_true', help='Valida e informa sin guardar cambios.')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        if not os.path.exists(ruta):
+            raise CommandError(f"No se encontró el archivo '{ruta}'.")
+        ruta_errores = options['errores'] or f"{os.path.splitext(ruta)[0]}_errores.csv"
+        self.tamano_lote = max(options['tamano_lote'], 1)
+        self.escuela_obligatoria = options['escuela_obligatoria']
+        self.nivel_defecto = options['nivel_estudio_defecto']
+
+        # Catálogos precargados: una consulta cada uno en lugar de una por fila
+        self.escuelas = {e.id_escuela.strip().upper(): e for e in Escuela.objects.all()}
+        self.categorias = {c.id_categoria: c for c in Categoria.objects.all()}
+        self.indices_opciones = {campo: _indice_opciones(opciones) for campo, opciones in OPCIONES.items()}
+
+        self.creados = self.actualizados = self.leidas = 0
+        self.vistos = {}  # id_maestro -> fila, para detectar repetidos en el archivo
+        self.sin_id = []  # maestros nuevos sin ID: se numeran al final (ver _crear_sin_id)
+        self.escuelas_afectadas = set()
+        self.ahora = timezone.now()
+        inicio = time.monotonic()
+
+        with ArchivoErrores(ruta_errores) as errores, transaction.atomic():
+            self.errores = errores
+            for bloque in en_bloques(leer_filas(ruta), self.tamano_lote):
+                self._procesar_bloque(bloque)
+                duracion = time.monotonic() - inicio
+                self.stdout.write(f'{self.leidas} filas procesadas ({self.leidas / duracion:.0f} filas/s)')
+            self._crear_sin_id()
+            self._actualizar_indices()
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        duracion = time.monotonic() - inicio
+        velocidad = self.leidas / duracion if duracion else 0
+        if errores.errores or errores.advertencias:
+            self.stdout.write(self.style.WARNING(
+                f'{errores.errores} fila(s) rechazada(s) y {errores.advertencias} advertencia(s); detalle en {ruta_errores}'
+            ))
+        prefijo = '[dry-run, sin guardar] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefijo}Se crearon {self.creados} y se actualizaron {self.actualizados} registro(s) de {self.leidas} fila(s) '
+            f'en {duracion:.2f} s ({velocidad:.0f} filas/s).'
+        ))
+
+    # --- Lectura y validación ---
+
+    def _valores(self, fila):
+        """{campo: valor} con las columnas reconocidas del archivo, ya normalizadas."""
+        valores = {}
+        for encabezado, crudo in fila.items():
+            if encabezado is None:
+                continue
+            campo = encabezado.strip().lower()
+            campo = ALIAS.get(campo, campo)
+            if campo not in CAMPOS or campo in valores:
+                continue
+            if campo in CAMPOS_FECHA:
+                valores[campo] = convertir_fecha(crudo)
+                continue
+
+            if campo == 'hrs' and isinstance(crudo, (int, float)):
+                valor = f"{float(crudo):04.1f}"
+            else:
+                valor = texto(crudo)
+            if campo in RELLENO_CEROS and valor.isdigit():
+                valor = valor.zfill(RELLENO_CEROS[campo])
+            elif campo in OPCIONES and valor:
+                valor = self.indices_opciones[campo].get(_clave_opcion(valor), valor)
+            valores[campo] = valor
+
+        if self.nivel_defecto and not valores.get('nivel_estudio'):
+            valores['nivel_estudio'] = self.nivel_defecto
+        return valores
+
+    def _resolver_relaciones(self, numero, valores, advertencias):
+        """Sustituye el CCT y la categoría por sus objetos de los mapas precargados."""
+        if 'id_escuela' in valores:
+            cct = valores['id_escuela'].upper()
+            escuela = self.escuelas.get(cct)
+            if escuela is None and (cct or self.escuela_obligatoria):
+                if self.escuela_obligatoria:
+                    raise ErrorFila(f"Escuela '{cct}' no encontrada." if cct else "Falta la escuela.")
+                advertencias.append(f"Escuela '{cct}' no encontrada; se importa sin escuela.")
+            valores['id_escuela'] = escuela
+        elif self.escuela_obligatoria:
+            raise ErrorFila("Falta la columna de escuela.")
+
+        if 'categog' in valores:
+            clave = valores['categog']
+            categoria = self.categorias.get(clave) or self.categorias.get(clave.upper())
+            if clave and categoria is None:
+                raise ErrorFila(f"Categoría '{clave}' no encontrada.")
+            valores['categog'] = categoria
+
+        if valores.get('email'):
+            try:
+                validate_email(valores['email'])
+            except ValidationError:
+                advertencias.append(f"Email inválido '{valores['email']}'; se deja vacío.")
+                valores['email'] = ''
+
+    def _preparar(self, numero, fila, existentes):
+        """Devuelve (maestro, es_nuevo, escuela_anterior_id) validado, o lanza ErrorFila."""
+        advertencias = []
+        valores = self._valores(fila)
+        id_maestro = valores.pop('id_maestro', '')
+        if id_maestro:
+            if not id_maestro.isdigit() or len(id_maestro) > 5:
+                raise ErrorFila(f"ID de maestro inválido: '{id_maestro}'.")
+            id_maestro = id_maestro.zfill(5)
+            if id_maestro in self.vistos:
+                raise ErrorFila(f"ID {id_maestro} repetido en el archivo (fila {self.vistos[id_maestro]}).")
+        self._resolver_relaciones(numero, valores, advertencias)
+
+        maestro = existentes.get(id_maestro) if id_maestro else None
+        es_nuevo = maestro is None
+        escuela_anterior = None if es_nuevo else maestro.id_escuela_id
+        if es_nuevo:
+            maestro = Maestro(id_maestro=id_maestro, **valores)
+        else:
+            for campo, valor in valores.items():
+                setattr(maestro, campo, valor)
+
+        try:
+            maestro.clean_fields(exclude=EXCLUIR_VALIDACION)
+            maestro.clean()
+        except ValidationError as e:
+            raise ErrorFila(mensaje_validacion(e))
+
+        if id_maestro:
+            self.vistos[id_maestro] = numero
+        for advertencia in advertencias:
+            self.errores.advertencia(numero, id_maestro, self._nombre(maestro), advertencia)
+        return maestro, es_nuevo, escuela_anterior
+
+    @staticmethod
+    def _nombre(maestro):
+        return ' '.join(filter(None, [maestro.nombres, maestro.a_paterno, maestro.a_materno]))
+
+    # --- Escritura ---
+
+    def _procesar_bloque(self, bloque):
+        ids = set()
+        for _, fila in bloque:
+            for encabezado, valor in fila.items():
+                if encabezado and encabezado.strip().lower() == 'id_maestro' and texto(valor).isdigit():
+                    ids.add(texto(valor).zfill(5))
+        # Los existentes del bloque en una sola consulta (con la escuela para calcular `desubicado`)
+        existentes = Maestro.objects.select_related('id_escuela', 'categog').in_bulk(ids)
+
+        nuevos, modificados, campos_modificados = [], [], set()
+        for numero, fila in bloque:
+            self.leidas += 1
+            try:
+                maestro, es_nuevo, escuela_anterior = self._preparar(numero, fila, existentes)
+            except ErrorFila as e:
+                identificador = next((texto(v) for k, v in fila.items() if k and k.strip().lower() == 'id_maestro'), '')
+                nombre = ' '.join(texto(v) for k, v in fila.items() if k and k.strip().lower() in ('nombres', 'a_paterno', 'a_materno'))
+                self.errores.error(numero, identificador, nombre, str(e))
+                continue
+
+            self.escuelas_afectadas.update(filter(None, [escuela_anterior, maestro.id_escuela_id]))
+            maestro.calcular_campos_derivados()
+            maestro.desubicado = maestro.calcular_desubicado()
+            if not es_nuevo:
+                maestro.fecha_actualizacion = self.ahora
+                modificados.append(maestro)
+                campos_modificados.update(self._campos_de(fila))
+            elif maestro.id_maestro:
+                nuevos.append(maestro)
+            else:
+                self.sin_id.append(maestro)
+
+        if nuevos:
+            Maestro.objects.bulk_create(nuevos, batch_size=self.tamano_lote)
+            self.creados += len(nuevos)
+        if modificados:
+            campos = list(campos_modificados | set(Maestro.CAMPOS_DERIVADOS) | {'desubicado', 'fecha_actualizacion'})
+            Maestro.objects.bulk_update(modificados, campos, batch_size=self.tamano_lote)
+            self.actualizados += len(modificados)
+        # bulk_create/bulk_update no pasan por save(): el índice de trigramas se regenera aquí
+        indexar_maestros(nuevos + modificados)
+
+    @staticmethod
+    def _campos_de(fila):
+        campos = set()
+        for encabezado in fila:
+            if encabezado:
+                campo = ALIAS.get(encabezado.strip().lower(), encabezado.strip().lower())
+                if campo in CAMPOS and campo != 'id_maestro':
+                    campos.add(campo)
+        return campos
+
+    def _crear_sin_id(self):
+        """
+        Numera y guarda los maestros nuevos que no traían ID. Se hace al final, después
+        de llevar la secuencia al mayor ID del archivo, para que un ID reservado no
+        coincida con uno que aparece más abajo en el mismo archivo.
+        """
+        maximo = Maestro.max_id_numerico()
+        secuencia, _ = Secuencia.objects.get_or_create(nombre=SECUENCIA_ID_MAESTRO, defaults={'ultimo_valor': maximo})
+        Secuencia.objects.filter(pk=secuencia.pk, ultimo_valor__lt=maximo).update(ultimo_valor=maximo)
+
+        for bloque in en_bloques(self.sin_id, self.tamano_lote):
+            for maestro, id_maestro in zip(bloque, Maestro.reservar_ids(len(bloque))):
+                maestro.id_maestro = id_maestro
+            Maestro.objects.bulk_create(bloque, batch_size=self.tamano_lote)
+            indexar_maestros(bloque)
+            self.creados += len(bloque)
+
+    def _actualizar_indices(self):
+        """Índice de directivos y conteos en caché, una vez para toda la importación."""
+        if self.escuelas_afectadas:
+            zonas = set(Escuela.objects.filter(pk__in=self.escuelas_afectadas).values_list('zona_esc_id', flat=True))
+            actualizar_zonas(zonas)
+            actualizar_escuelas(self.escuelas_afectadas)
+        invalidar_conteos(Maestro)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from gestion_escolar.models import Maestro, Secuencia, SECUENCIA_ID_MAESTRO
+
+class Command(BaseCommand):
+    help = 'Inicializa la secuencia de IDs de Maestro a partir del mayor ID numérico existente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Sobrescribe el contador aunque ya tenga un valor mayor al de los datos existentes',
+        )
+
+    def handle(self, *args, **options):
+        maximo_existente = Maestro.max_id_numerico()
+        self.stdout.write(f'Mayor ID numérico encontrado en Maestro: {maximo_existente:05d}')
+
+        with transaction.atomic():
+            secuencia, creada = Secuencia.objects.select_for_update().get_or_create(
+                nombre=SECUENCIA_ID_MAESTRO,
+                defaults={'ultimo_valor': maximo_existente}
+            )
+            if creada:
+                self.stdout.write(self.style.SUCCESS(f'Secuencia creada con valor {maximo_existente:05d}.'))
+                return
+
+            if secuencia.ultimo_valor >= maximo_existente and not options['forzar']:
+                self.stdout.write(self.style.WARNING(
+                    f'La secuencia ya está en {secuencia.ultimo_valor:05d}; no se modificó. Usa --forzar para sobrescribirla.'
+                ))
+                return
+
+            valor_anterior = secuencia.ultimo_valor
+            secuencia.ultimo_valor = maximo_existente
+            secuencia.save(update_fields=['ultimo_valor'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Secuencia actualizada de {valor_anterior:05d} a {maximo_existente:05d}.'
+        ))
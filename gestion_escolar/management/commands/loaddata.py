@@ -0,0 +1,26 @@
+from django.core.management.commands.loaddata import Command as LoaddataCommand
+from django.db import transaction
+
+from gestion_escolar import busqueda_texto, kardex_eventos
+
+class Command(LoaddataCommand):
+    help = (
+        LoaddataCommand.help + ' Si se cargan Historial, RegistroCorrespondencia, KardexMovimiento o FUP, '
+        'al terminar reconstruye el índice de texto completo y el kardex (las señales no los '
+        'actualizan durante la carga).'
+    )
+
+    def handle(self, *fixture_labels, **options):
+        super().handle(*fixture_labels, **options)
+
+        cargados = {modelo.__name__ for modelo in self.models if modelo._meta.app_label == 'gestion_escolar'}
+        if cargados & set(busqueda_texto.TIPO_POR_MODELO):
+            with transaction.atomic():
+                total = busqueda_texto.reconstruir_indice_texto()
+            if self.verbosity >= 1:
+                self.stdout.write(f'Índice de texto completo reconstruido ({total} registros).')
+        if cargados & set(kardex_eventos.TIPO_POR_MODELO):
+            with transaction.atomic():
+                total = kardex_eventos.reconstruir_eventos()
+            if self.verbosity >= 1:
+                self.stdout.write(f'Kardex reconstruido ({total} eventos).')
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from gestion_escolar import plantillas_excel
+from gestion_escolar.models import Maestro, TipoApreciacion, Vacancia
+
+class Command(BaseCommand):
+    help = 'Mide el llenado del formato de vacancias de USICAMM con vacancias de prueba (no escribe en la base de datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=1000, help='Vacancias por reporte (por defecto 1000)')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Reportes a generar (por defecto 3)')
+
+    def vacancias_de_prueba(self, cantidad):
+        # Instancias sin guardar con las relaciones ya asignadas, como las deja _instantanea_lote
+        apreciacion = TipoApreciacion(descripcion='Definitiva')
+        interino = Maestro(nombres='Nombre', a_paterno='Paterno', a_materno='Materno', curp='XAXX010101HDGXXX01')
+        zonas = ['Zona II', 'Zona III']
+        vacancias = []
+        for i in range(cantidad):
+            vacancias.append(Vacancia(
+                nivel='Primaria', entidad='Durango', municipio='Durango', direccion=f'CCT {i}',
+                region='Región 1', zona_economica=zonas[i % 2], destino='Servicio', apreciacion=apreciacion,
+                tipo_vacante=Vacancia.TIPO_VACANTE_CHOICES[i % len(Vacancia.TIPO_VACANTE_CHOICES)][0],
+                tipo_plaza='Jornada', horas='20', sostenimiento='Estatal',
+                fecha_inicio=date(2026, 1, 1) + timedelta(days=i % 300), fecha_final=date(2026, 12, 31),
+                categoria='E0281', pseudoplaza='0', clave_presupuestal=f'0{i:08d}', techo_financiero='10DPR0001A',
+                clave_ct='10DPR0001A', turno='Matutino', tipo_movimiento_reporte='Licencia', observaciones='',
+                posicion_orden=str(i + 1), folio_prelacion=f'F-{i}',
+                maestro_interino=interino if i % 2 else None,
+                curp_interino='' if i % 2 else 'XEXX010101MDGXXX02',
+                nombre_interino='' if i % 2 else 'Interino capturado',
+            ))
+        return vacancias
+
+    def handle(self, *args, **options):
+        cantidad = options['cantidad']
+        formato = plantillas_excel.FORMATO_VACANCIA_USICAMM
+        vacancias = self.vacancias_de_prueba(cantidad)
+
+        plantillas_excel._cache.clear()
+        inicio = time.monotonic()
+        plantillas_excel.obtener_libro(formato.ruta)
+        primera_carga = time.monotonic() - inicio
+        self.stdout.write(f'Primera carga de la plantilla (lectura del .xlsx): {primera_carga * 1000:.0f} ms')
+
+        tiempos = {'copia': [], 'filas': [], 'escritura': [], 'guardado': []}
+        with tempfile.TemporaryDirectory() as directorio:
+            for repeticion in range(options['repeticiones']):
+                inicio = time.monotonic()
+                libro = plantillas_excel.obtener_libro(formato.ruta)
+                tiempos['copia'].append(time.monotonic() - inicio)
+
+                inicio = time.monotonic()
+                filas = plantillas_excel.filas_de(vacancias, formato.columnas)
+                tiempos['filas'].append(time.monotonic() - inicio)
+
+                inicio = time.monotonic()
+                plantillas_excel.llenar_hoja(libro.active, filas, formato.fila_inicial, formato.ultima_fila)
+                tiempos['escritura'].append(time.monotonic() - inicio)
+
+                inicio = time.monotonic()
+                libro.save(os.path.join(directorio, f'VACANCIA_{repeticion}.xlsx'))
+                tiempos['guardado'].append(time.monotonic() - inicio)
+
+        por_mil = 1000 / cantidad if cantidad else 0
+        total = 0
+        for paso, valores in tiempos.items():
+            promedio = sum(valores) / len(valores)
+            total += promedio
+            self.stdout.write(f'  {paso}: {promedio * 1000:.0f} ms ({promedio * 1000 * por_mil:.0f} ms por 1000 vacancias)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{cantidad} vacancias en {total * 1000:.0f} ms por reporte '
+            f'({total * 1000 * por_mil:.0f} ms por 1000 vacancias, promedio de {options["repeticiones"]}).'
+        ))
@@ -73,6 +73,7 @@ class Command(BaseCommand):
                         tipo_documento="Asignación de Vacancia",
                         maestro=maestro_titular_obj,
                         maestro_secundario_nombre=get_full_name(maestro_interino_obj) if maestro_interino_obj else '',
+                        maestro_secundario=maestro_interino_obj,
                         ruta_archivo="",
                         motivo="Asignación de Vacancia",
                         lote_reporte=lote,
@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from gestion_escolar.busqueda_texto import reconstruir_indice_texto
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de texto completo de la búsqueda global (Historial, Correspondencia y FUP)'
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        with transaction.atomic():
+            total = reconstruir_indice_texto()
+        duracion = time.monotonic() - inicio
+
+        self.stdout.write(self.style.SUCCESS(f'Se indexaron {total} registros en {duracion:.2f} s.'))
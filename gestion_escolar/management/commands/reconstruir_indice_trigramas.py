@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from gestion_escolar.busqueda import reconstruir_indice, usa_pg_trgm
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de trigramas usado en la búsqueda de personal por nombre'
+
+    def handle(self, *args, **options):
+        if usa_pg_trgm():
+            self.stdout.write(self.style.WARNING('La base de datos es PostgreSQL: la búsqueda usa pg_trgm y no requiere reconstrucción.'))
+            return
+
+        inicio = time.monotonic()
+        with transaction.atomic():
+            total = reconstruir_indice()
+        duracion = time.monotonic() - inicio
+
+        self.stdout.write(self.style.SUCCESS(f'Se indexaron {total} maestros en {duracion:.2f} s.'))
@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from gestion_escolar.kardex_eventos import reconstruir_eventos
+
+class Command(BaseCommand):
+    help = 'Reconstruye la línea de tiempo del kardex (trámites, correspondencia, movimientos y FUP de cada maestro)'
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        with transaction.atomic():
+            total = reconstruir_eventos()
+        duracion = time.monotonic() - inicio
+
+        self.stdout.write(self.style.SUCCESS(f'Se generaron {total} eventos de kardex en {duracion:.2f} s.'))
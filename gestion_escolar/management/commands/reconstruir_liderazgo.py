@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from gestion_escolar.liderazgo import reconstruir_liderazgo
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de directivos (director de cada escuela y supervisor de cada zona)'
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        with transaction.atomic():
+            zonas, escuelas = reconstruir_liderazgo()
+        duracion = time.monotonic() - inicio
+
+        self.stdout.write(self.style.SUCCESS(f'Se indexaron {zonas} zonas y {escuelas} escuelas en {duracion:.2f} s.'))
@@ -0,0 +1,71 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+
+
+def _proceso_trabajador(intervalo, una_vez):
+    # Los procesos se crean con "spawn" (como en Windows): hay que inicializar Django de nuevo
+    import django
+    django.setup()
+    from gestion_escolar.trabajos import atender_cola
+
+    try:
+        atender_cola(intervalo=intervalo, una_vez=una_vez)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos en segundo plano encolados (documentos de vacancias y exportaciones grandes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=1, help='Número de trabajadores en paralelo (por defecto 1).')
+        parser.add_argument('--intervalo', type=float, default=None, help='Segundos entre consultas cuando la cola está vacía.')
+        parser.add_argument('--una-vez', action='store_true', help='Ejecuta los trabajos pendientes y termina (para cron o el Programador de tareas).')
+
+    def handle(self, *args, **options):
+        procesos = max(options['procesos'], 1)
+        intervalo = options['intervalo']
+        una_vez = options['una_vez']
+        inicio = time.monotonic()
+
+        if procesos == 1:
+            ejecutados = self._atender(intervalo, una_vez)
+            duracion = time.monotonic() - inicio
+            self.stdout.write(self.style.SUCCESS(f'Se ejecutaron {ejecutados} trabajo(s) en {duracion:.2f} s.'))
+            return
+
+        contexto = multiprocessing.get_context('spawn')
+        hijos = [
+            contexto.Process(target=_proceso_trabajador, args=(intervalo, una_vez), name=f'trabajador-{i + 1}')
+            for i in range(procesos)
+        ]
+        for hijo in hijos:
+            hijo.start()
+        self.stdout.write(f'{procesos} trabajadores atendiendo la cola. Ctrl+C para detener.')
+        try:
+            for hijo in hijos:
+                hijo.join()
+        except KeyboardInterrupt:
+            for hijo in hijos:
+                hijo.join()
+
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(f'Trabajadores detenidos después de {duracion:.2f} s.'))
+
+    def _atender(self, intervalo, una_vez):
+        from gestion_escolar.trabajos import atender_cola
+
+        def al_terminar(trabajo, segundos):
+            estilo = self.style.SUCCESS if trabajo.estado == 'COMPLETADO' else self.style.ERROR
+            detalle = f': {trabajo.mensaje}' if trabajo.estado == 'ERROR' else ''
+            self.stdout.write(estilo(f'Trabajo #{trabajo.pk} ({trabajo.tipo}) {trabajo.get_estado_display().lower()} en {segundos:.2f} s{detalle}'))
+
+        if not una_vez:
+            self.stdout.write('Atendiendo la cola de trabajos. Ctrl+C para detener.')
+        try:
+            return atender_cola(intervalo=intervalo, una_vez=una_vez, al_terminar=al_terminar)
+        except KeyboardInterrupt:
+            # Un trabajo interrumpido vuelve a la cola cuando se considera abandonado
+            return 0
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gestion_escolar.importacion import en_bloques
+from gestion_escolar.kardex_eventos import sincronizar_eventos, vincular_maestros_secundarios
+from gestion_escolar.models import Historial, Maestro
+
+
+class Command(BaseCommand):
+    help = (
+        'Vincula los registros de historial con su maestro interino/secundario a partir del nombre '
+        'capturado (maestro_secundario_nombre) y actualiza su kardex'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano-lote', type=int, default=1000, help='Registros por consulta de lectura/escritura (por defecto 1000).')
+        parser.add_argument('--dry-run', action='store_true', help='Calcula los vínculos sin guardarlos.')
+
+    def handle(self, *args, **options):
+        tamano_lote = max(options['tamano_lote'], 1)
+        inicio = time.monotonic()
+
+        with transaction.atomic():
+            vinculados, sin_maestro, ambiguos = vincular_maestros_secundarios(
+                Historial, Maestro, tamano_lote=tamano_lote, guardar=not options['dry_run'],
+            )
+            if not options['dry_run']:
+                # update() no dispara post_save: el kardex de los registros vinculados se rehace a mano
+                for bloque in en_bloques(vinculados, tamano_lote):
+                    sincronizar_eventos(Historial.objects.filter(pk__in=bloque).select_related('usuario'))
+
+        duracion = time.monotonic() - inicio
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Modo --dry-run: no se guardó ningún cambio.'))
+        self.stdout.write(self.style.SUCCESS(f'Vinculación finalizada en {duracion:.2f} s.'))
+        self.stdout.write(self.style.SUCCESS(f'Registros vinculados: {len(vinculados)}'))
+        if sin_maestro:
+            self.stdout.write(self.style.WARNING(f'Nombres sin maestro que coincida: {sin_maestro}'))
+        if ambiguos:
+            self.stdout.write(self.style.WARNING(f'Nombres que coinciden con más de un maestro (no vinculados): {ambiguos}'))
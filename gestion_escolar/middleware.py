@@ -1,6 +1,15 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
 from django.shortcuts import redirect
 from django.urls import reverse
 
+from .rendimiento import FlujoMedido, Medicion, registrar
+
+logger = logging.getLogger(__name__)
+
 class LoginRequiredMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -20,3 +29,35 @@ class LoginRequiredMiddleware:
 
         response = self.get_response(request)
         return response
+
+
+class RendimientoMiddleware:
+    """
+    Mide tiempo total, número de consultas y tiempo en SQL de cada vista y guarda
+    la muestra (ver gestion_escolar/rendimiento.py). Va primero en MIDDLEWARE para
+    que la medición incluya a los demás middleware.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'RENDIMIENTO_ACTIVO', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with Medicion() as medicion:
+            response = self.get_response(request)
+
+        def _registrar():
+            try:
+                registrar(request, response, medicion)
+            except Exception:
+                # La instrumentación nunca debe romper la respuesta
+                logger.exception("No se pudo registrar la muestra de rendimiento")
+
+        # Las exportaciones por streaming consultan la base de datos mientras se envían; la
+        # muestra se guarda al terminar. Los FileResponse solo leen un archivo y se dejan
+        # intactos para no perder el envío con wsgi.file_wrapper.
+        if response.streaming and not response.is_async and not isinstance(response, FileResponse):
+            response.streaming_content = FlujoMedido(response.streaming_content, medicion, _registrar)
+        else:
+            _registrar()
+        return response
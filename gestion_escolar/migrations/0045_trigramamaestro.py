@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from unidecode import unidecode
+
+# Copia congelada de gestion_escolar.busqueda al momento de esta migración, para que
+# los cambios posteriores en ese módulo no alteren lo que hace.
+TAMANO_LOTE = 2000
+
+
+def generar_trigramas(texto):
+    texto = ' '.join(unidecode(str(texto or '')).upper().split())
+    if not texto:
+        return set()
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def poblar_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    Maestro = apps.get_model('gestion_escolar', 'Maestro')
+    TrigramaMaestro = apps.get_model('gestion_escolar', 'TrigramaMaestro')
+    lote = []
+    for maestro in Maestro.objects.only('pk', 'nombre_completo_unaccented').iterator(chunk_size=TAMANO_LOTE):
+        lote.extend(
+            TrigramaMaestro(maestro_id=maestro.pk, trigrama=trigrama)
+            for trigrama in generar_trigramas(maestro.nombre_completo_unaccented)
+        )
+        if len(lote) >= TAMANO_LOTE:
+            TrigramaMaestro.objects.bulk_create(lote, batch_size=TAMANO_LOTE)
+            lote = []
+    TrigramaMaestro.objects.bulk_create(lote, batch_size=TAMANO_LOTE)
+
+
+def crear_indice_pg_trgm(apps, schema_editor):
+    # En PostgreSQL la búsqueda usa pg_trgm con un índice GIN sobre el nombre normalizado.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS gestion_escolar_maestro_nombre_trgm '
+        'ON gestion_escolar_maestro USING gin (nombre_completo_unaccented gin_trgm_ops)'
+    )
+
+
+def eliminar_indice_pg_trgm(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS gestion_escolar_maestro_nombre_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_escolar', '0044_secuencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrigramaMaestro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3, verbose_name='Trigrama')),
+                ('maestro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='gestion_escolar.maestro', verbose_name='Maestro')),
+            ],
+            options={
+                'verbose_name': 'Trigrama de Maestro',
+                'verbose_name_plural': 'Trigramas de Maestros',
+                'indexes': [models.Index(fields=['trigrama', 'maestro'], name='gestion_esc_trigram_d42108_idx')],
+                'unique_together': {('maestro', 'trigrama')},
+            },
+        ),
+        migrations.RunPython(poblar_trigramas, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice_pg_trgm, eliminar_indice_pg_trgm),
+    ]
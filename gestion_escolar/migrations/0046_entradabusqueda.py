@@ -0,0 +1,164 @@
+# Generated by Django 5.2.6 on 2026-10-17 11:30
+
+from django.db import migrations, models
+from unidecode import unidecode
+
+TABLA_ENTRADAS = 'gestion_escolar_entradabusqueda'
+TABLA_FTS = 'gestion_escolar_entradabusqueda_fts'
+
+# Copia congelada de gestion_escolar.busqueda_texto al momento de esta migración, para
+# que los cambios posteriores en ese módulo no alteren lo que hace.
+TIPO_HISTORIAL = 'HISTORIAL'
+TIPO_CORRESPONDENCIA = 'CORRESPONDENCIA'
+TIPO_FUP = 'FUP'
+
+TAMANO_LOTE = 1000
+
+
+def _normalizar(*partes):
+    return ' '.join(unidecode(str(p)) for p in partes if p not in (None, ''))
+
+
+def _aplanar(valor):
+    if isinstance(valor, dict):
+        return ' '.join(_aplanar(v) for v in valor.values())
+    if isinstance(valor, list):
+        return ' '.join(_aplanar(v) for v in valor)
+    if valor is None or isinstance(valor, bool):
+        return ''
+    return str(valor)
+
+
+def _nombre_maestro(maestro):
+    if not maestro:
+        return ''
+    return f"{maestro.nombres or ''} {maestro.a_paterno or ''} {maestro.a_materno or ''}".strip()
+
+
+def datos_historial(item):
+    nombre = _nombre_maestro(item.maestro)
+    return {
+        'titulo': (f"{item.tipo_documento} - {nombre}" if nombre else item.tipo_documento)[:255],
+        'contenido': _normalizar(
+            item.tipo_documento, nombre, item.maestro_secundario_nombre,
+            item.motivo, item.observaciones, _aplanar(item.datos_tramite),
+        ),
+        'fecha': item.fecha_creacion.date() if item.fecha_creacion else None,
+    }
+
+
+def datos_correspondencia(item):
+    return {
+        'titulo': f"{item.tipo_documento} {item.folio_documento} - {item.remitente}".strip()[:255],
+        'contenido': _normalizar(
+            item.folio_documento, item.remitente, _nombre_maestro(item.maestro),
+            item.contenido, item.observaciones, item.quien_recibio,
+        ),
+        'fecha': item.fecha_recibido,
+    }
+
+
+def datos_fup(item):
+    return {
+        'titulo': f"FUP {item.folio or ''} - {item.nombre_completo}"[:255],
+        'contenido': _normalizar(
+            item.folio, item.nombre_completo, item.rfc, item.curp,
+            item.efectos, item.observaciones,
+        ),
+        'fecha': item.fecha,
+    }
+
+
+CONSTRUCTORES = {
+    TIPO_HISTORIAL: datos_historial,
+    TIPO_CORRESPONDENCIA: datos_correspondencia,
+    TIPO_FUP: datos_fup,
+}
+
+
+def crear_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # Tabla FTS5 de contenido externo; los triggers la sincronizan con la tabla de entradas
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5("
+            f"titulo, contenido, content='{TABLA_ENTRADAS}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON {TABLA_ENTRADAS} BEGIN "
+            f"INSERT INTO {TABLA_FTS}(rowid, titulo, contenido) VALUES (new.id, new.titulo, new.contenido); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON {TABLA_ENTRADAS} BEGIN "
+            f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, titulo, contenido) VALUES ('delete', old.id, old.titulo, old.contenido); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE ON {TABLA_ENTRADAS} BEGIN "
+            f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, titulo, contenido) VALUES ('delete', old.id, old.titulo, old.contenido); "
+            f"INSERT INTO {TABLA_FTS}(rowid, titulo, contenido) VALUES (new.id, new.titulo, new.contenido); END"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TABLA_ENTRADAS}_tsv ON {TABLA_ENTRADAS} USING gin ("
+            f"to_tsvector('simple', coalesce(titulo, '') || ' ' || coalesce(contenido, '')))"
+        )
+
+
+def eliminar_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sufijo in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLA_FTS}_{sufijo}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TABLA_ENTRADAS}_tsv")
+
+
+def poblar_entradas(apps, schema_editor):
+    EntradaBusqueda = apps.get_model('gestion_escolar', 'EntradaBusqueda')
+    modelos = {
+        TIPO_HISTORIAL: apps.get_model('gestion_escolar', 'Historial'),
+        TIPO_CORRESPONDENCIA: apps.get_model('gestion_escolar', 'RegistroCorrespondencia'),
+        TIPO_FUP: apps.get_model('gestion_escolar', 'FUP'),
+    }
+    for tipo, modelo in modelos.items():
+        constructor = CONSTRUCTORES[tipo]
+        queryset = modelo.objects.all()
+        if tipo != TIPO_FUP:
+            queryset = queryset.select_related('maestro')
+        lote = []
+        for instancia in queryset.iterator(chunk_size=TAMANO_LOTE):
+            lote.append(EntradaBusqueda(tipo=tipo, objeto_id=instancia.pk, **constructor(instancia)))
+            if len(lote) >= TAMANO_LOTE:
+                EntradaBusqueda.objects.bulk_create(lote)
+                lote = []
+        EntradaBusqueda.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_escolar', '0045_trigramamaestro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntradaBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('HISTORIAL', 'Historial'), ('CORRESPONDENCIA', 'Registro de Correspondencia'), ('FUP', 'FUP')], max_length=20, verbose_name='Tipo de Registro')),
+                ('objeto_id', models.PositiveBigIntegerField(verbose_name='ID del Registro')),
+                ('titulo', models.CharField(max_length=255, verbose_name='Título')),
+                ('contenido', models.TextField(blank=True, verbose_name='Contenido Normalizado')),
+                ('fecha', models.DateField(blank=True, null=True, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Entrada de Búsqueda',
+                'verbose_name_plural': 'Entradas de Búsqueda',
+                'unique_together': {('tipo', 'objeto_id')},
+            },
+        ),
+        migrations.RunPython(crear_indice_texto, eliminar_indice_texto),
+        migrations.RunPython(poblar_entradas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 11:58
+
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.db.models.functions import Trim, Upper
+
+
+def marcar_desubicados(apps, schema_editor):
+    # Misma lógica que Maestro.recalcular_desubicados, con el modelo histórico
+    Maestro = apps.get_model('gestion_escolar', 'Maestro')
+    fuera = (
+        Maestro.objects.exclude(techo_f__isnull=True).exclude(techo_f='')
+        .annotate(techo_f_clean=Trim(Upper('techo_f')), cct_clean=Trim(Upper('id_escuela__id_escuela')))
+        .filter(Q(cct_clean__isnull=True) | ~Q(techo_f_clean=F('cct_clean')))
+        .values('pk')
+    )
+    Maestro.objects.filter(pk__in=fuera).update(desubicado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_escolar', '0046_entradabusqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maestro',
+            name='desubicado',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Fuera de Adscripción'),
+        ),
+        migrations.RunPython(marcar_desubicados, migrations.RunPython.noop),
+    ]
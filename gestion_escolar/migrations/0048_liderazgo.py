@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_liderazgo(apps, schema_editor):
+    from gestion_escolar.liderazgo import reconstruir_liderazgo
+    reconstruir_liderazgo(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_escolar', '0047_maestro_desubicado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiderazgoEscuela',
+            fields=[
+                ('escuela', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='liderazgo', serialize=False, to='gestion_escolar.escuela', verbose_name='Escuela')),
+                ('director', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion_escolar.maestro', verbose_name='Director')),
+                ('supervisor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion_escolar.maestro', verbose_name='Supervisor')),
+            ],
+            options={
+                'verbose_name': 'Directivos de Escuela (índice)',
+                'verbose_name_plural': 'Directivos de Escuela (índice)',
+            },
+        ),
+        migrations.CreateModel(
+            name='LiderazgoZona',
+            fields=[
+                ('zona', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='liderazgo', serialize=False, to='gestion_escolar.zona', verbose_name='Zona')),
+                ('supervisor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion_escolar.maestro', verbose_name='Supervisor')),
+            ],
+            options={
+                'verbose_name': 'Supervisor de Zona (índice)',
+                'verbose_name_plural': 'Supervisores de Zona (índice)',
+            },
+        ),
+        migrations.RunPython(poblar_liderazgo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:23
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import NullIf, Trim, Upper
+
+
+def normalizar_claves(apps, schema_editor):
+    # Misma normalización que identificadores.normalizar_clave, en SQL
+    Maestro = apps.get_model('gestion_escolar', 'Maestro')
+    Prelacion = apps.get_model('gestion_escolar', 'Prelacion')
+    Maestro.objects.update(
+        curp_normalizada=NullIf(Trim(Upper('curp')), Value('')),
+        rfc_normalizado=NullIf(Trim(Upper('rfc')), Value('')),
+    )
+    Prelacion.objects.update(curp_normalizada=Trim(Upper('curp')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_escolar', '0049_jobejecucion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maestro',
+            name='curp_normalizada',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='maestro',
+            name='rfc_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=13, null=True),
+        ),
+        migrations.AddField(
+            model_name='prelacion',
+            name='curp_normalizada',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=18),
+        ),
+        migrations.AlterField(
+            model_name='maestro',
+            name='curp',
+            field=models.CharField(blank=True, db_index=True, max_length=18, null=True, verbose_name='CURP'),
+        ),
+        migrations.AlterField(
+            model_name='maestro',
+            name='rfc',
+            field=models.CharField(blank=True, db_index=True, max_length=13, null=True, verbose_name='RFC'),
+        ),
+        migrations.AlterField(
+            model_name='prelacion',
+            name='curp',
+            field=models.CharField(db_index=True, max_length=18, verbose_name='CURP del Aspirante'),
+        ),
+        migrations.RunPython(normalizar_claves, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_escolar', '0050_curp_rfc_normalizados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MuestraRendimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre_url', models.CharField(max_length=150, verbose_name='Nombre de URL')),
+                ('ruta', models.CharField(max_length=255, verbose_name='Ruta')),
+                ('metodo', models.CharField(max_length=10, verbose_name='Método')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Código de Respuesta')),
+                ('duracion_ms', models.FloatField(verbose_name='Duración (ms)')),
+                ('consultas', models.PositiveIntegerField(verbose_name='Consultas SQL')),
+                ('duracion_sql_ms', models.FloatField(verbose_name='Tiempo en SQL (ms)')),
+                ('repeticiones_sql', models.PositiveIntegerField(default=0, verbose_name='Repeticiones de una Consulta')),
+                ('sql_repetido', models.TextField(blank=True, default='', verbose_name='Consulta más Repetida')),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Muestra de Rendimiento',
+                'verbose_name_plural': 'Muestras de Rendimiento',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['nombre_url', 'fecha'], name='gestion_esc_nombre__22f491_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_escolar', '0051_muestrarendimiento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historial',
+            index=models.Index(fields=['fecha_creacion'], name='gestion_esc_fecha_c_866358_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historial',
+            index=models.Index(fields=['usuario', 'fecha_creacion'], name='gestion_esc_usuario_e1e2d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historial',
+            index=models.Index(fields=['maestro', 'fecha_creacion'], name='gestion_esc_maestro_dcaeaf_idx'),
+        ),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:05
+
+import django.db.models.deletion
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Copia congelada de gestion_escolar.kardex_eventos al momento de esta migración, para
+# que los cambios posteriores en ese módulo no alteren lo que hace.
+TIPO_TRAMITE = 'TRAMITE'
+TIPO_CORRESPONDENCIA = 'CORRESPONDENCIA'
+TIPO_MOVIMIENTO = 'MOVIMIENTO'
+TIPO_FUP = 'FUP'
+
+TAMANO_LOTE = 1000
+
+
+def _inicio_del_dia(dia):
+    if dia is None:
+        return None
+    return timezone.make_aware(datetime.combine(dia, datetime.min.time()), timezone.get_current_timezone())
+
+
+def _usuario(usuario, defecto='Sistema'):
+    return usuario.username if usuario else defecto
+
+
+def datos_historial(item):
+    return {item.maestro_id}, {
+        'fecha': item.fecha_creacion,
+        'descripcion': item.tipo_documento[:255],
+        'detalle': item.motivo or 'Ver documento',
+        'usuario': _usuario(item.usuario),
+    }
+
+
+def datos_correspondencia(item):
+    return {item.maestro_id}, {
+        'fecha': _inicio_del_dia(item.fecha_recibido),
+        'descripcion': f"Recibido: {item.get_tipo_documento_display()} de {item.remitente}"[:255],
+        'detalle': item.contenido or '',
+        'usuario': item.quien_recibio or 'N/A',
+    }
+
+
+def datos_movimiento(item):
+    return {item.maestro_id}, {
+        'fecha': item.fecha,
+        'descripcion': 'Anotación en Kardex',
+        'detalle': item.descripcion or '',
+        'usuario': _usuario(item.usuario),
+    }
+
+
+def datos_fup(item):
+    return {item.maestro_id}, {
+        'fecha': _inicio_del_dia(item.fecha),
+        'descripcion': 'Captura de FUP',
+        'detalle': f"Folio: {item.folio}",
+        'usuario': 'Sistema',
+    }
+
+
+CONSTRUCTORES = {
+    TIPO_TRAMITE: datos_historial,
+    TIPO_CORRESPONDENCIA: datos_correspondencia,
+    TIPO_MOVIMIENTO: datos_movimiento,
+    TIPO_FUP: datos_fup,
+}
+
+
+def construir_eventos(KardexEvento, tipo, instancias):
+    eventos = []
+    for instancia in instancias:
+        maestros, datos = CONSTRUCTORES[tipo](instancia)
+        if datos['fecha'] is None:
+            continue
+        for maestro_id in maestros - {None}:
+            eventos.append(KardexEvento(tipo=tipo, objeto_id=instancia.pk, maestro_id=maestro_id, **datos))
+    return eventos
+
+
+def poblar_kardex(apps, schema_editor):
+    KardexEvento = apps.get_model('gestion_escolar', 'KardexEvento')
+    modelos = {
+        TIPO_TRAMITE: apps.get_model('gestion_escolar', 'Historial'),
+        TIPO_CORRESPONDENCIA: apps.get_model('gestion_escolar', 'RegistroCorrespondencia'),
+        TIPO_MOVIMIENTO: apps.get_model('gestion_escolar', 'KardexMovimiento'),
+        TIPO_FUP: apps.get_model('gestion_escolar', 'FUP'),
+    }
+    for tipo, modelo in modelos.items():
+        queryset = modelo.objects.order_by('pk')
+        if tipo in (TIPO_TRAMITE, TIPO_MOVIMIENTO):
+            queryset = queryset.select_related('usuario')
+        lote = []
+        for instancia in queryset.iterator(chunk_size=TAMANO_LOTE):
+            lote.append(instancia)
+            if len(lote) >= TAMANO_LOTE:
+                KardexEvento.objects.bulk_create(construir_eventos(KardexEvento, tipo, lote))
+                lote = []
+        KardexEvento.objects.bulk_create(construir_eventos(KardexEvento, tipo, lote))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_escolar', '0052_historial_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KardexEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('TRAMITE', 'Trámite'), ('CORRESPONDENCIA', 'Correspondencia'), ('MOVIMIENTO', 'Movimiento Manual'), ('FUP', 'FUP')], max_length=20, verbose_name='Tipo de Evento')),
+                ('objeto_id', models.PositiveBigIntegerField(verbose_name='ID del Registro')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha')),
+                ('descripcion', models.CharField(max_length=255, verbose_name='Descripción')),
+                ('detalle', models.TextField(blank=True, verbose_name='Detalle')),
+                ('usuario', models.CharField(blank=True, max_length=255, verbose_name='Usuario')),
+                ('maestro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_kardex', to='gestion_escolar.maestro', verbose_name='Maestro')),
+            ],
+            options={
+                'verbose_name': 'Evento de Kardex',
+                'verbose_name_plural': 'Eventos de Kardex',
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['maestro', 'fecha'], name='gestion_esc_maestro_b404db_idx'), models.Index(fields=['maestro', 'tipo', 'fecha'], name='gestion_esc_maestro_d9f58a_idx')],
+                'unique_together': {('tipo', 'objeto_id', 'maestro')},
+            },
+        ),
+        migrations.RunPython(poblar_kardex, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:40
+
+import django.db.models.deletion
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations, models
+from unidecode import unidecode
+
+# Copia congelada de gestion_escolar.kardex_eventos al momento de esta migración, para
+# que los cambios posteriores en ese módulo no alteren lo que hace.
+TIPO_TRAMITE = 'TRAMITE'
+
+TAMANO_LOTE = 1000
+
+
+def en_bloques(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        bloque = list(islice(iterador, tamano))
+        if not bloque:
+            return
+        yield bloque
+
+
+def clave_nombre(nombre):
+    return unidecode((nombre or '').strip().upper())
+
+
+def vincular_maestros_secundarios(Historial, Maestro):
+    pendientes = (
+        Historial.objects.filter(maestro_secundario__isnull=True)
+        .exclude(maestro_secundario_nombre__isnull=True).exclude(maestro_secundario_nombre='')
+        .order_by('pk').values_list('pk', 'maestro_secundario_nombre')
+    )
+    pks_por_nombre = {}
+    for pk, nombre in pendientes.iterator(chunk_size=TAMANO_LOTE):
+        clave = clave_nombre(nombre)
+        if clave:
+            pks_por_nombre.setdefault(clave, []).append(pk)
+
+    maestros_por_nombre = {}
+    for bloque in en_bloques(pks_por_nombre, TAMANO_LOTE):
+        coincidencias = Maestro.objects.filter(nombre_completo_unaccented__in=bloque)
+        for maestro_id, nombre in coincidencias.values_list('pk', 'nombre_completo_unaccented'):
+            maestros_por_nombre.setdefault(nombre, []).append(maestro_id)
+
+    for clave, pks in pks_por_nombre.items():
+        maestros = maestros_por_nombre.get(clave, [])
+        # Los nombres que corresponden a más de un maestro no se vinculan
+        if len(maestros) != 1:
+            continue
+        for bloque in en_bloques(pks, TAMANO_LOTE):
+            Historial.objects.filter(pk__in=bloque).update(maestro_secundario_id=maestros[0])
+
+
+def eventos_tramite(KardexEvento, historiales):
+    eventos = []
+    for item in historiales:
+        if item.fecha_creacion is None:
+            continue
+        datos = {
+            'fecha': item.fecha_creacion,
+            'descripcion': item.tipo_documento[:255],
+            'detalle': item.motivo or 'Ver documento',
+            'usuario': item.usuario.username if item.usuario else 'Sistema',
+        }
+        for maestro_id in {item.maestro_id, item.maestro_secundario_id} - {None}:
+            eventos.append(KardexEvento(tipo=TIPO_TRAMITE, objeto_id=item.pk, maestro_id=maestro_id, **datos))
+    return eventos
+
+
+def vincular_secundarios(apps, schema_editor):
+    Historial = apps.get_model('gestion_escolar', 'Historial')
+    KardexEvento = apps.get_model('gestion_escolar', 'KardexEvento')
+    vincular_maestros_secundarios(Historial, apps.get_model('gestion_escolar', 'Maestro'))
+    # Los eventos de trámite se rehacen con el maestro secundario vinculado
+    KardexEvento.objects.filter(tipo=TIPO_TRAMITE).delete()
+    lote = []
+    for item in Historial.objects.order_by('pk').select_related('usuario').iterator(chunk_size=TAMANO_LOTE):
+        lote.append(item)
+        if len(lote) >= TAMANO_LOTE:
+            KardexEvento.objects.bulk_create(eventos_tramite(KardexEvento, lote))
+            lote = []
+    KardexEvento.objects.bulk_create(eventos_tramite(KardexEvento, lote))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_escolar', '0053_kardexevento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historial',
+            name='maestro_secundario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='historial_secundario', to='gestion_escolar.maestro', verbose_name='Maestro Interino/Secundario (vinculado)'),
+        ),
+        migrations.AddIndex(
+            model_name='historial',
+            index=models.Index(fields=['maestro_secundario', 'fecha_creacion'], name='gestion_esc_maestro_2420b8_idx'),
+        ),
+        migrations.RunPython(vincular_secundarios, migrations.RunPython.noop),
+    ]
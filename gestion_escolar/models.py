@@ -1,9 +1,13 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Max, Q
+from django.db.models.functions import Cast, Trim, Upper
 from django.contrib.auth.models import User
 from .validators import validate_cct_format
 import re
 from colorfield.fields import ColorField
 from unidecode import unidecode
+from .busqueda import CAMPOS_NOMBRE, indexar_maestros
+from .identificadores import normalizar_clave
 
 class Zona(models.Model):
     numero = models.IntegerField(unique=True, verbose_name="Número de Zona")
@@ -136,6 +140,51 @@ class Categoria(models.Model):
     def __str__(self):
         return f"{self.id_categoria} - {self.descripcion}"
 
+class Secuencia(models.Model):
+    """Contador persistente para asignar identificadores consecutivos sin recorrer la tabla destino."""
+    nombre = models.CharField(max_length=50, unique=True, verbose_name="Nombre de la Secuencia")
+    ultimo_valor = models.PositiveIntegerField(default=0, verbose_name="Último Valor Asignado")
+
+    class Meta:
+        verbose_name = "Secuencia"
+        verbose_name_plural = "Secuencias"
+        ordering = ['nombre']
+
+    def __str__(self):
+        return f"{self.nombre}: {self.ultimo_valor}"
+
+    @classmethod
+    def reservar(cls, nombre, cantidad=1, valor_inicial=None):
+        """
+        Reserva `cantidad` valores consecutivos de la secuencia y devuelve el primero.
+        El incremento se hace con un UPDATE atómico dentro de una transacción, por lo que
+        dos procesos concurrentes nunca reciben el mismo bloque. `valor_inicial` es un
+        callable que solo se evalúa si la secuencia aún no existe.
+        """
+        if cantidad < 1:
+            raise ValueError("La cantidad a reservar debe ser mayor que cero.")
+
+        with transaction.atomic():
+            secuencia, _ = cls.objects.select_for_update().get_or_create(
+                nombre=nombre,
+                defaults={'ultimo_valor': valor_inicial() if valor_inicial else 0}
+            )
+            cls.objects.filter(pk=secuencia.pk).update(ultimo_valor=F('ultimo_valor') + cantidad)
+            secuencia.refresh_from_db(fields=['ultimo_valor'])
+
+        return secuencia.ultimo_valor - cantidad + 1
+
+    @classmethod
+    def ajustar_minimo(cls, nombre, minimo):
+        """Lleva la secuencia al menos hasta `minimo` (para saltar valores asignados por fuera de ella)."""
+        with transaction.atomic():
+            cls.objects.select_for_update().get_or_create(nombre=nombre)
+            cls.objects.filter(nombre=nombre, ultimo_valor__lt=minimo).update(ultimo_valor=minimo)
+
+SECUENCIA_ID_MAESTRO = 'maestro'
+MAX_ID_MAESTRO = 99999
+INTENTOS_ID_MAESTRO = 3
+
 class Maestro(models.Model):
     SEXO_OPCIONES = [
         ('H', 'Hombre'),
@@ -219,8 +268,8 @@ class Maestro(models.Model):
     a_paterno = models.CharField(max_length=50, verbose_name="Apellido Paterno", blank=True, null=True)
     a_materno = models.CharField(max_length=50, verbose_name="Apellido Materno", blank=True, null=True)
     nombres = models.CharField(max_length=100, verbose_name="Nombres", blank=True, null=True)
-    curp = models.CharField(max_length=18, verbose_name="CURP", blank=True, null=True)
-    rfc = models.CharField(max_length=13, verbose_name="RFC", blank=True, null=True)
+    curp = models.CharField(max_length=18, verbose_name="CURP", blank=True, null=True, db_index=True)
+    rfc = models.CharField(max_length=13, verbose_name="RFC", blank=True, null=True, db_index=True)
     sexo = models.CharField(max_length=1, choices=SEXO_OPCIONES, verbose_name="Sexo", blank=True, null=True)
     est_civil = models.CharField(max_length=20, choices=ESTADO_CIVIL_OPCIONES, verbose_name="Estado Civil", blank=True, null=True)
     fecha_nacimiento = models.DateField(verbose_name="Fecha de Nacimiento", null=True, blank=True)
@@ -257,6 +306,13 @@ class Maestro(models.Model):
     nombre_completo_normalized = models.CharField(max_length=202, editable=False, db_index=True, blank=True, null=True)
     nombre_completo_unaccented = models.CharField(max_length=511, blank=True, null=True, db_index=True, editable=False)
 
+    # CURP y RFC en mayúsculas y sin espacios, para búsquedas exactas por índice (ver identificadores.py)
+    curp_normalizada = models.CharField(max_length=18, editable=False, db_index=True, blank=True, null=True)
+    rfc_normalizado = models.CharField(max_length=13, editable=False, db_index=True, blank=True, null=True)
+
+    # Techo financiero distinto al CCT de la escuela asignada (ver calcular_desubicado)
+    desubicado = models.BooleanField(default=False, db_index=True, editable=False, verbose_name="Fuera de Adscripción")
+
     class Meta:
         verbose_name = "Personal"
         verbose_name_plural = "Todo el personal"  # Cambia el nombre del menú lateral
@@ -277,36 +333,72 @@ class Maestro(models.Model):
         
         return f"{dep}{unid}{sub_unid}{categog}{hrs}{num_plaza}"
 
+    @classmethod
+    def max_id_numerico(cls):
+        """Devuelve el mayor ID numérico registrado (0 si no hay ninguno), calculado en la base de datos."""
+        resultado = cls.objects.filter(id_maestro__regex=r'^[0-9]+$').aggregate(
+            maximo=Max(Cast('id_maestro', models.IntegerField()))
+        )
+        return resultado['maximo'] or 0
+
+    @classmethod
+    def reservar_ids(cls, cantidad):
+        """
+        Reserva un bloque de `cantidad` IDs consecutivos de 5 dígitos.
+        Pensado para importaciones masivas: una sola operación sobre la secuencia
+        sin importar el tamaño del bloque.
+        """
+        primero = Secuencia.reservar(SECUENCIA_ID_MAESTRO, cantidad, valor_inicial=cls.max_id_numerico)
+        ultimo = primero + cantidad - 1
+        if ultimo > MAX_ID_MAESTRO:
+            raise ValueError(f"Se agotaron los IDs de 5 dígitos (se solicitó hasta el {ultimo}).")
+        return [f"{numero:05d}" for numero in range(primero, ultimo + 1)]
+
+    def calcular_desubicado(self):
+        """True si el techo financiero no coincide con el CCT de la escuela asignada."""
+        if not self.techo_f:
+            return False
+        cct = self.id_escuela.id_escuela if self.id_escuela_id else ''
+        return self.techo_f.strip().upper() != cct.strip().upper()
+
+    @classmethod
+    def recalcular_desubicados(cls, queryset=None):
+        """
+        Recalcula el campo `desubicado` en la base de datos (sin recorrer los registros en Python).
+        Necesario tras cambios que no pasan por save(): update(), bulk_update o cambios de CCT.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        fuera = (
+            cls.objects.exclude(techo_f__isnull=True).exclude(techo_f='')
+            .annotate(techo_f_clean=Trim(Upper('techo_f')), cct_clean=Trim(Upper('id_escuela__id_escuela')))
+            .filter(Q(cct_clean__isnull=True) | ~Q(techo_f_clean=F('cct_clean')))
+            .values('pk')
+        )
+        marcados = queryset.filter(pk__in=fuera).exclude(desubicado=True).update(desubicado=True)
+        desmarcados = queryset.exclude(pk__in=fuera).exclude(desubicado=False).update(desubicado=False)
+        return marcados + desmarcados
+
     def generar_id_maestro(self):
-        """Genera un ID autoincremental de 5 dígitos"""
-        # Obtener todos los IDs existentes que sean numéricos
-        ids_numericos = []
-        for maestro in Maestro.objects.all():
-            try:
-                ids_numericos.append(int(maestro.id_maestro))
-            except (ValueError, TypeError):
-                continue  # Saltar IDs no numéricos
-        
-        if ids_numericos:
-            # Encontrar el máximo ID numérico y aumentar en 1
-            nuevo_numero = max(ids_numericos) + 1
-        else:
-            # Si no hay maestros con IDs numéricos, comenzar desde 1
-            nuevo_numero = 1
-        
-        # Formatear a 5 dígitos con ceros a la izquierda
-        return f"{nuevo_numero:05d}"
+        """Genera un ID autoincremental de 5 dígitos a partir de la secuencia de maestros"""
+        return Maestro.reservar_ids(1)[0]
     
-    def save(self, *args, **kwargs):
-        # Generar ID automáticamente si no existe o está vacío
-        if not self.id_maestro or self.id_maestro.strip() == '':
-            self.id_maestro = self.generar_id_maestro()
-        
+    # Campos que calcula calcular_campos_derivados (para bulk_update en importaciones)
+    CAMPOS_DERIVADOS = [
+        'clave_presupuestal', 'nombre_completo_unaccented', 'a_paterno_normalized',
+        'a_materno_normalized', 'nombres_normalized', 'nombre_completo_normalized',
+        'curp_normalizada', 'rfc_normalizado',
+    ]
+
+    def calcular_campos_derivados(self):
+        """
+        Clave presupuestal y nombres normalizados. Lo usan save() y las importaciones
+        masivas (bulk_create/bulk_update no llaman a save()).
+        """
         # Generar la clave presupuestal antes de guardar
         self.clave_presupuestal = self.generar_clave_presupuestal()
 
         # Lógica solicitada por el usuario para el nuevo campo
-        from unidecode import unidecode
         full_name = f"{self.nombres or ''} {self.a_paterno or ''} {self.a_materno or ''}".strip().upper()
         self.nombre_completo_unaccented = unidecode(full_name)
 
@@ -321,8 +413,57 @@ class Maestro(models.Model):
         ]
         self.nombre_completo_normalized = ' '.join(filter(None, parts))
 
-        super().save(*args, **kwargs)
+        self.curp_normalizada = normalizar_clave(self.curp) or None
+        self.rfc_normalizado = normalizar_clave(self.rfc) or None
+
+    def save(self, *args, **kwargs):
+        # Generar ID automáticamente si no existe o está vacío
+        id_generado = not self.id_maestro or self.id_maestro.strip() == ''
+        if id_generado:
+            self.id_maestro = self.generar_id_maestro()
+        
+        self.calcular_campos_derivados()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.desubicado = self.calcular_desubicado()
+        elif {'techo_f', 'id_escuela'}.intersection(update_fields):
+            self.desubicado = self.calcular_desubicado()
+            kwargs['update_fields'] = set(update_fields) | {'desubicado'}
+        if update_fields is not None:
+            normalizados = {'curp': 'curp_normalizada', 'rfc': 'rfc_normalizado'}
+            extra = {normalizados[campo] for campo in normalizados if campo in update_fields}
+            if extra:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | extra
+
+        if id_generado:
+            self._insertar_con_id_generado(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+
+        # Mantener el índice de trigramas solo si el nombre pudo haber cambiado
+        if update_fields is None or CAMPOS_NOMBRE.intersection(update_fields):
+            indexar_maestros([self])
     
+    def _insertar_con_id_generado(self, *args, **kwargs):
+        """
+        Inserta con el ID recién tomado de la secuencia. Con force_insert, un ID que ya
+        existe (dado de alta por fuera de la secuencia: admin con ID explícito, loaddata,
+        SQL) produce IntegrityError en lugar de un UPDATE que sobrescribiría a otro maestro;
+        en ese caso la secuencia se adelanta al mayor ID registrado y se toma otro.
+        """
+        kwargs['force_insert'] = True
+        for intento in range(1, INTENTOS_ID_MAESTRO + 1):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                if intento == INTENTOS_ID_MAESTRO or not Maestro.objects.filter(pk=self.id_maestro).exists():
+                    raise
+                Secuencia.ajustar_minimo(SECUENCIA_ID_MAESTRO, Maestro.max_id_numerico())
+                self.id_maestro = self.generar_id_maestro()
+
     def clean(self):
         """Valida y genera la clave presupuestal"""
         from django.core.exceptions import ValidationError
@@ -349,6 +490,22 @@ class Maestro(models.Model):
         
         super().clean()
 
+class TrigramaMaestro(models.Model):
+    """Trigramas del nombre normalizado de cada maestro (ver gestion_escolar.busqueda)."""
+    maestro = models.ForeignKey(Maestro, on_delete=models.CASCADE, related_name='trigramas', verbose_name="Maestro")
+    trigrama = models.CharField(max_length=3, verbose_name="Trigrama")
+
+    class Meta:
+        verbose_name = "Trigrama de Maestro"
+        verbose_name_plural = "Trigramas de Maestros"
+        unique_together = ('maestro', 'trigrama')
+        indexes = [
+            models.Index(fields=['trigrama', 'maestro']),
+        ]
+
+    def __str__(self):
+        return f"{self.trigrama} -> {self.maestro_id}"
+
 class Director(models.Model):
     maestro = models.OneToOneField(Maestro, on_delete=models.CASCADE, verbose_name="Maestro")
     escuela = models.OneToOneField(Escuela, on_delete=models.CASCADE, verbose_name="Escuela")
@@ -365,6 +522,34 @@ class Director(models.Model):
     def __str__(self):
         return f"Director: {self.maestro} - Escuela: {self.escuela}"
 
+class LiderazgoZona(models.Model):
+    """Supervisor vigente de cada zona (índice mantenido por gestion_escolar/liderazgo.py)."""
+    zona = models.OneToOneField(Zona, on_delete=models.CASCADE, primary_key=True, related_name='liderazgo', verbose_name="Zona")
+    supervisor = models.ForeignKey(Maestro, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Supervisor")
+
+    class Meta:
+        verbose_name = "Supervisor de Zona (índice)"
+        verbose_name_plural = "Supervisores de Zona (índice)"
+
+    def __str__(self):
+        return f"Zona {self.zona_id}: {self.supervisor_id or 'sin supervisor'}"
+
+class LiderazgoEscuela(models.Model):
+    """
+    Director vigente de cada escuela y supervisor de su zona (índice mantenido por
+    gestion_escolar/liderazgo.py), para obtenerlos con un solo select_related.
+    """
+    escuela = models.OneToOneField(Escuela, on_delete=models.CASCADE, primary_key=True, related_name='liderazgo', verbose_name="Escuela")
+    director = models.ForeignKey(Maestro, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Director")
+    supervisor = models.ForeignKey(Maestro, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Supervisor")
+
+    class Meta:
+        verbose_name = "Directivos de Escuela (índice)"
+        verbose_name_plural = "Directivos de Escuela (índice)"
+
+    def __str__(self):
+        return f"Escuela {self.escuela_id}: director {self.director_id}, supervisor {self.supervisor_id}"
+
 class MotivoTramite(models.Model):
     id = models.IntegerField(primary_key=True)
     motivo_tramite = models.CharField(max_length=255)
@@ -404,7 +589,8 @@ class PlantillaTramite(models.Model):
 class Prelacion(models.Model):
     pos_orden = models.IntegerField(verbose_name="Posición de Orden")
     folio = models.CharField(max_length=50, unique=True, verbose_name="Folio de Prelación")
-    curp = models.CharField(max_length=18, verbose_name="CURP del Aspirante")
+    curp = models.CharField(max_length=18, verbose_name="CURP del Aspirante", db_index=True)
+    curp_normalizada = models.CharField(max_length=18, editable=False, db_index=True, blank=True, default='')
     nombre = models.CharField(max_length=255, verbose_name="Nombre del Aspirante")
     tipo_val = models.CharField(max_length=255, verbose_name="Tipo de Valoración")
 
@@ -416,6 +602,11 @@ class Prelacion(models.Model):
     def __str__(self):
         return f"{self.folio} - {self.nombre} ({self.tipo_val})"
 
+    def save(self, *args, **kwargs):
+        # bulk_create/bulk_update (import_prelacion_csv) asignan curp_normalizada por su cuenta
+        self.curp_normalizada = normalizar_clave(self.curp)
+        super().save(*args, **kwargs)
+
 class TipoApreciacion(models.Model):
     descripcion = models.TextField(unique=True, verbose_name="Descripción de Apreciación")
 
@@ -511,6 +702,8 @@ class Historial(models.Model):
     tipo_documento = models.CharField(max_length=100, verbose_name="Tipo de Documento")
     maestro = models.ForeignKey(Maestro, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Maestro")
     maestro_secundario_nombre = models.CharField(max_length=255, blank=True, null=True, verbose_name="Maestro Interino/Secundario")
+    # Maestro interino/secundario; el nombre de arriba queda como se capturó en el documento
+    maestro_secundario = models.ForeignKey(Maestro, on_delete=models.SET_NULL, null=True, blank=True, related_name='historial_secundario', verbose_name="Maestro Interino/Secundario (vinculado)")
     ruta_archivo = models.CharField(max_length=255, verbose_name="Ruta del Archivo")
     observaciones = models.TextField(blank=True, null=True, verbose_name="Observaciones")
     motivo = models.CharField(max_length=255, blank=True, null=True, verbose_name="Motivo")
@@ -521,6 +714,13 @@ class Historial(models.Model):
         verbose_name = "Historial"
         verbose_name_plural = "Historial"
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Paginación por keyset de la tabla de historial, sin filtro o por usuario/maestro
+            models.Index(fields=['fecha_creacion']),
+            models.Index(fields=['usuario', 'fecha_creacion']),
+            models.Index(fields=['maestro', 'fecha_creacion']),
+            models.Index(fields=['maestro_secundario', 'fecha_creacion']),
+        ]
 
     def __str__(self):
         maestro_str = self.maestro.__str__() if self.maestro else "N/A"
@@ -628,6 +828,93 @@ class RegistroCorrespondencia(models.Model):
     def __str__(self):
         return f"Oficio {self.folio_documento} de {self.remitente} ({self.fecha_recibido})"
 
+class EntradaBusqueda(models.Model):
+    """Texto indexado de un registro para la búsqueda global (ver gestion_escolar.busqueda_texto)."""
+    TIPO_CHOICES = [
+        ('HISTORIAL', 'Historial'),
+        ('CORRESPONDENCIA', 'Registro de Correspondencia'),
+        ('FUP', 'FUP'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo de Registro")
+    objeto_id = models.PositiveBigIntegerField(verbose_name="ID del Registro")
+    titulo = models.CharField(max_length=255, verbose_name="Título")
+    contenido = models.TextField(blank=True, verbose_name="Contenido Normalizado")
+    fecha = models.DateField(null=True, blank=True, verbose_name="Fecha")
+
+    class Meta:
+        verbose_name = "Entrada de Búsqueda"
+        verbose_name_plural = "Entradas de Búsqueda"
+        unique_together = ('tipo', 'objeto_id')
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.titulo}"
+
+class JobEjecucion(models.Model):
+    """Trabajo en segundo plano encolado por una vista y ejecutado por `manage.py run_workers` (ver gestion_escolar.trabajos)."""
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EJECUTANDO', 'Ejecutando'),
+        ('COMPLETADO', 'Completado'),
+        ('ERROR', 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=100, verbose_name="Tipo de Trabajo")
+    parametros = models.JSONField(default=dict, blank=True, verbose_name="Parámetros")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='PENDIENTE', verbose_name="Estado")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='trabajos', verbose_name="Usuario")
+    completados = models.PositiveIntegerField(default=0, verbose_name="Elementos Completados")
+    total = models.PositiveIntegerField(default=0, verbose_name="Total de Elementos")
+    mensaje = models.CharField(max_length=255, blank=True, default='', verbose_name="Mensaje")
+    resultado = models.JSONField(blank=True, null=True, verbose_name="Resultado")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    trabajador = models.CharField(max_length=100, blank=True, default='', verbose_name="Trabajador")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Inicio")
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Fin")
+    fecha_latido = models.DateTimeField(null=True, blank=True, verbose_name="Última Señal del Trabajador")
+
+    class Meta:
+        verbose_name = "Trabajo en Segundo Plano"
+        verbose_name_plural = "Trabajos en Segundo Plano"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion']),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.get_estado_display()})"
+
+    @property
+    def terminado(self):
+        return self.estado in ('COMPLETADO', 'ERROR')
+
+class MuestraRendimiento(models.Model):
+    """Tiempo y consultas de una petición, registrados por RendimientoMiddleware (tabla acotada, ver gestion_escolar.rendimiento)."""
+    nombre_url = models.CharField(max_length=150, verbose_name="Nombre de URL")
+    ruta = models.CharField(max_length=255, verbose_name="Ruta")
+    metodo = models.CharField(max_length=10, verbose_name="Método")
+    status = models.PositiveSmallIntegerField(verbose_name="Código de Respuesta")
+    duracion_ms = models.FloatField(verbose_name="Duración (ms)")
+    consultas = models.PositiveIntegerField(verbose_name="Consultas SQL")
+    duracion_sql_ms = models.FloatField(verbose_name="Tiempo en SQL (ms)")
+    # Mayor número de veces que se ejecutó una misma sentencia (patrón N+1)
+    repeticiones_sql = models.PositiveIntegerField(default=0, verbose_name="Repeticiones de una Consulta")
+    sql_repetido = models.TextField(blank=True, default='', verbose_name="Consulta más Repetida")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Usuario")
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Fecha")
+
+    class Meta:
+        verbose_name = "Muestra de Rendimiento"
+        verbose_name_plural = "Muestras de Rendimiento"
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['nombre_url', 'fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre_url} {self.duracion_ms:.0f} ms ({self.consultas} consultas)"
+
 # --- MODELOS ANCLA PARA PERMISOS PERSONALIZADOS ---
 # Estos modelos no crean tablas en la BD (managed=False)
 # Su único propósito es servir como ancla para permisos
@@ -749,6 +1036,36 @@ class KardexMovimiento(models.Model):
     def __str__(self):
         return f"Movimiento {self.id} - {self.maestro}"
 
+class KardexEvento(models.Model):
+    """Evento de la línea de tiempo del kardex de un maestro (ver gestion_escolar.kardex_eventos)."""
+    TIPO_CHOICES = [
+        ('TRAMITE', 'Trámite'),
+        ('CORRESPONDENCIA', 'Correspondencia'),
+        ('MOVIMIENTO', 'Movimiento Manual'),
+        ('FUP', 'FUP'),
+    ]
+
+    maestro = models.ForeignKey(Maestro, on_delete=models.CASCADE, related_name='eventos_kardex', verbose_name="Maestro")
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo de Evento")
+    objeto_id = models.PositiveBigIntegerField(verbose_name="ID del Registro")
+    fecha = models.DateTimeField(verbose_name="Fecha")
+    descripcion = models.CharField(max_length=255, verbose_name="Descripción")
+    detalle = models.TextField(blank=True, verbose_name="Detalle")
+    usuario = models.CharField(max_length=255, blank=True, verbose_name="Usuario")
+
+    class Meta:
+        verbose_name = "Evento de Kardex"
+        verbose_name_plural = "Eventos de Kardex"
+        ordering = ['-fecha', '-id']
+        unique_together = ('tipo', 'objeto_id', 'maestro')
+        indexes = [
+            models.Index(fields=['maestro', 'fecha']),
+            models.Index(fields=['maestro', 'tipo', 'fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.descripcion} ({self.maestro_id})"
+
 class Tema(models.Model):
     nombre = models.CharField(max_length=100, unique=True, verbose_name="Nombre del Tema")
     fecha_inicio = models.DateField(verbose_name="Fecha de Inicio")
@@ -810,17 +1127,24 @@ class FUP(models.Model):
     def __str__(self):
         return f"FUP {self.folio} - {self.nombre_completo}"
     
+    def tomar_datos_maestro(self):
+        """
+        Snapshot de datos del maestro. Lo usan save() (solo en creación) e importar_fups,
+        que crea los FUPs con bulk_create.
+        """
+        self.nombre_completo = f"{self.maestro.a_paterno or ''} {self.maestro.a_materno or ''} {self.maestro.nombres or ''}".strip()
+        self.rfc = self.maestro.rfc
+        self.curp = self.maestro.curp
+        self.clave_presupuestal = self.maestro.clave_presupuestal
+
+        # Si no se especifica techo_financiero, usar el del maestro
+        if not self.techo_financiero:
+            self.techo_financiero = self.maestro.techo_f
+
     def save(self, *args, **kwargs):
         # Snapshot de datos del maestro
         if not self.pk:  # Solo en creación
-            self.nombre_completo = f"{self.maestro.a_paterno or ''} {self.maestro.a_materno or ''} {self.maestro.nombres or ''}".strip()
-            self.rfc = self.maestro.rfc
-            self.curp = self.maestro.curp
-            self.clave_presupuestal = self.maestro.clave_presupuestal
-            
-            # Si no se especifica techo_financiero, usar el del maestro
-            if not self.techo_financiero:
-                self.techo_financiero = self.maestro.techo_f
+            self.tomar_datos_maestro()
         
         # Actualizar techo_f del maestro si cambió
         if self.techo_financiero and self.techo_financiero != self.maestro.techo_f:
@@ -0,0 +1,216 @@
+"""
+Llenado de plantillas Excel (openpyxl) con una especificación declarativa de columnas.
+
+Cada plantilla se lee una sola vez por proceso: se conserva el libro ya parseado,
+serializado con pickle, y cada uso parte de una copia (`pickle.loads` cuesta una
+fracción de volver a leer el .xlsx). La entrada se invalida sola cuando cambia la
+fecha de modificación del archivo, igual que en plantillas_word.
+
+Las columnas son `exportacion.Columna`; aquí sus campos se resuelven como rutas de
+atributos sobre instancias ya cargadas ('apreciacion__descripcion' es
+vacancia.apreciacion.descripcion), así que los registros deben venir con
+select_related. Las filas se calculan en una pasada y se escriben sobre las celdas
+de la plantilla, que conservan su formato. Si los registros no caben en el área de
+datos, lo que está debajo (por ejemplo, el bloque de firmas) se recorre hacia abajo.
+"""
+import os
+import pickle
+import threading
+
+import openpyxl
+from django.conf import settings
+from openpyxl.utils import get_column_letter
+
+from .exportacion import Columna, fecha_iso, opciones
+from .models import Vacancia
+
+DIRECTORIO_PLANTILLAS_EXCEL = os.path.join(settings.BASE_DIR, 'tramites', 'Plantillas', 'Excel')
+
+
+class FormatoPlantilla:
+    """
+    Plantilla .xlsx con su especificación: columnas a partir de la A, fila donde
+    empiezan los datos y última fila del área de datos (None si no hay nada debajo).
+    """
+
+    def __init__(self, archivo, columnas, fila_inicial=2, ultima_fila=None):
+        self.archivo = archivo
+        self.columnas = columnas
+        self.fila_inicial = fila_inicial
+        self.ultima_fila = ultima_fila
+
+    @property
+    def ruta(self):
+        return os.path.join(DIRECTORIO_PLANTILLAS_EXCEL, self.archivo)
+
+
+# --- Especificaciones ---
+
+def _texto(valor):
+    return valor or ''
+
+
+def _zona_economica(valor):
+    # El formato de USICAMM espera el número arábigo
+    return {'Zona II': 'Zona 2', 'Zona III': 'Zona 3'}.get(valor, valor) or ''
+
+
+_tipo_vacante = opciones(Vacancia.TIPO_VACANTE_CHOICES)
+
+
+def _curp_interino(interino, curp, curp_manual):
+    return curp if interino else curp_manual or ''
+
+
+def _nombre_interino(interino, nombres, a_paterno, a_materno, nombre_manual):
+    if interino:
+        return f"{nombres or ''} {a_paterno or ''} {a_materno or ''}".strip()
+    return nombre_manual or ''
+
+
+COLUMNAS_VACANCIA_USICAMM = [
+    Columna("nivel educativo", 'nivel', _texto),
+    Columna("entidad", 'entidad', _texto),
+    Columna("municipio", 'municipio', _texto),
+    Columna("nombre, clave, domicilio y zona económica del CCT donde trabaja", 'direccion', _texto),
+    Columna("región", 'region', _texto),
+    Columna("zona económica CCT donde cobra", 'zona_economica', _zona_economica),
+    Columna("destino", 'destino', _texto),
+    Columna("tipo_apreciación", 'apreciacion__descripcion', _texto),
+    Columna("tipo_vacante", 'tipo_vacante', lambda v: _tipo_vacante(v).capitalize() if v else ''),
+    Columna("tipo_plaza", 'tipo_plaza', _texto),
+    Columna("numero_horas", 'horas', _texto),
+    Columna("tipo_sostenimiento", 'sostenimiento', _texto),
+    Columna("fecha_inicio_vacancia", 'fecha_inicio', fecha_iso),
+    Columna("fecha_fin_vacancia", 'fecha_final', fecha_iso),
+    Columna("Clv_Categoria", 'categoria', _texto),
+    Columna("Pseudoplaza", 'pseudoplaza', _texto),
+    Columna("Clave_plaza", 'clave_presupuestal', _texto),
+    Columna("cctPlazaDondeCobra", 'techo_financiero', _texto),
+    Columna("cctPlazaDondeTrabaja", 'clave_ct', _texto),
+    Columna("turno donde cobra", 'turno', _texto),
+    Columna("Tipo de Licencia", 'tipo_movimiento_reporte', _texto),
+    Columna("Observaciones", 'observaciones', _texto),
+    Columna("No Ord", 'posicion_orden', _texto),
+    Columna("Folio", 'folio_prelacion', _texto),
+    Columna("CURP", ('maestro_interino', 'maestro_interino__curp', 'curp_interino'), _curp_interino),
+    Columna("Nombre", (
+        'maestro_interino', 'maestro_interino__nombres', 'maestro_interino__a_paterno',
+        'maestro_interino__a_materno', 'nombre_interino',
+    ), _nombre_interino),
+]
+
+# Filas 2 a 37 para las vacancias; debajo está el bloque de firmas
+FORMATO_VACANCIA_USICAMM = FormatoPlantilla(
+    'FORMATOVACANCIAUSICAMM.xlsx', COLUMNAS_VACANCIA_USICAMM, fila_inicial=2, ultima_fila=37,
+)
+
+
+# --- Caché de plantillas ---
+
+class _PlantillaCacheada:
+    def __init__(self, ruta, mtime):
+        self.ruta = ruta
+        self.mtime = mtime
+        self.serializada = pickle.dumps(openpyxl.load_workbook(ruta), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+_cache = {}
+_candado = threading.Lock()
+
+
+def _cacheada(ruta):
+    ruta = os.path.abspath(ruta)
+    mtime = os.stat(ruta).st_mtime_ns
+    cacheada = _cache.get(ruta)
+    if cacheada is None or cacheada.mtime != mtime:
+        with _candado:
+            cacheada = _cache.get(ruta)
+            if cacheada is None or cacheada.mtime != mtime:
+                cacheada = _cache[ruta] = _PlantillaCacheada(ruta, mtime)
+    return cacheada
+
+
+def obtener_libro(ruta):
+    """Copia del libro de la plantilla en caché (recarga si el archivo cambió)."""
+    libro = pickle.loads(_cacheada(ruta).serializada)
+    for hoja in libro.worksheets:
+        # pickle no conserva el default_factory de las dimensiones (métodos de la hoja)
+        hoja.row_dimensions.default_factory = hoja._add_row
+        hoja.column_dimensions.default_factory = hoja._add_column
+    return libro
+
+
+# --- Llenado ---
+
+def _rutas(columnas):
+    return [[campo.split('__') for campo in columna.campos] for columna in columnas]
+
+
+def _resolver(instancia, ruta):
+    valor = instancia
+    for atributo in ruta:
+        if valor is None:
+            return None
+        valor = getattr(valor, atributo)
+    return valor
+
+
+def filas_de(registros, columnas):
+    """Valores de cada fila (una por registro) según la especificación de columnas."""
+    rutas = _rutas(columnas)
+    return [
+        [
+            columna.valor([_resolver(registro, ruta) for ruta in rutas_columna])
+            for columna, rutas_columna in zip(columnas, rutas)
+        ]
+        for registro in registros
+    ]
+
+
+def _recorrer_filas(hoja, desde_fila, cantidad):
+    """Baja `cantidad` filas todo lo que hay desde `desde_fila`, con sus celdas combinadas y alturas."""
+    combinadas = [rango for rango in hoja.merged_cells.ranges if rango.min_row >= desde_fila]
+    for rango in combinadas:
+        hoja.unmerge_cells(rango.coord)
+
+    ultima_fila = hoja.max_row
+    hoja.move_range(
+        f"A{desde_fila}:{get_column_letter(hoja.max_column)}{ultima_fila}", rows=cantidad,
+    )
+    for fila in range(ultima_fila, desde_fila - 1, -1):
+        if fila in hoja.row_dimensions and hoja.row_dimensions[fila].height is not None:
+            hoja.row_dimensions[fila + cantidad].height = hoja.row_dimensions[fila].height
+            hoja.row_dimensions[fila].height = None
+
+    for rango in combinadas:
+        rango.shift(row_shift=cantidad)
+        hoja.merge_cells(rango.coord)
+
+
+def llenar_hoja(hoja, filas, fila_inicial=2, ultima_fila=None):
+    """Escribe `filas` sobre las celdas de la hoja a partir de `fila_inicial`, conservando su formato."""
+    if not filas:
+        return
+    if ultima_fila is not None:
+        sobrantes = fila_inicial + len(filas) - 1 - ultima_fila
+        if sobrantes > 0:
+            _recorrer_filas(hoja, ultima_fila + 1, sobrantes)
+
+    celdas = hoja.iter_rows(
+        min_row=fila_inicial, max_row=fila_inicial + len(filas) - 1, max_col=max(len(f) for f in filas),
+    )
+    for fila_celdas, valores in zip(celdas, filas):
+        for celda, valor in zip(fila_celdas, valores):
+            celda.value = valor
+
+
+def guardar_desde_plantilla(formato, registros, ruta_salida):
+    """Llena una copia de la plantilla de `formato` con `registros` y la guarda en `ruta_salida`."""
+    if not os.path.exists(formato.ruta):
+        raise FileNotFoundError(f"No se encontró el template en la ruta: {formato.ruta}")
+
+    libro = obtener_libro(formato.ruta)
+    llenar_hoja(libro.active, filas_de(registros, formato.columnas), formato.fila_inicial, formato.ultima_fila)
+    libro.save(ruta_salida)
+    return ruta_salida
@@ -0,0 +1,213 @@
+"""
+Caché de plantillas Word (docxtpl) a nivel de proceso.
+
+Cada plantilla se lee y procesa una sola vez por proceso: se conserva el documento
+ya parseado, el XML preprocesado por docxtpl (patch_xml) y las plantillas Jinja
+compiladas. Cada generación trabaja sobre una copia del documento, de modo que el
+costo por trámite se reduce al renderizado. La entrada se invalida sola cuando
+cambia la fecha de modificación del archivo.
+
+Para lotes grandes, `renderizar_lote` reparte el renderizado entre varios procesos.
+"""
+import copy
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from docx import Document
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_PLANTILLAS_WORD = os.path.join(settings.BASE_DIR, 'tramites', 'Plantillas', 'Word')
+
+
+class _EntornoCacheado(Environment):
+    """Entorno Jinja que reutiliza la plantilla compilada para un mismo XML fuente."""
+
+    def __init__(self):
+        super().__init__()
+        self._compiladas = {}
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals or template_class:
+            return super().from_string(source, globals, template_class)
+        plantilla = self._compiladas.get(source)
+        if plantilla is None:
+            plantilla = self._compiladas[source] = super().from_string(source)
+        return plantilla
+
+
+class _PlantillaCompilada:
+    def __init__(self, ruta, mtime):
+        self.ruta = ruta
+        self.mtime = mtime
+        with open(ruta, 'rb') as archivo:
+            self.documento = Document(archivo)
+        self.entorno = _EntornoCacheado()
+        self.xml_parchado = {}
+
+
+class DocxTemplateCacheada(DocxTemplate):
+    """DocxTemplate que parte de una copia del documento en caché y reutiliza su preprocesamiento."""
+
+    def __init__(self, compilada):
+        super().__init__(compilada.ruta)
+        self._compilada = compilada
+
+    def init_docx(self, reload=True):
+        if not self.docx or (self.is_rendered and reload):
+            self.docx = copy.deepcopy(self._compilada.documento)
+            self.is_rendered = False
+
+    def patch_xml(self, src_xml):
+        parchado = self._compilada.xml_parchado.get(src_xml)
+        if parchado is None:
+            parchado = self._compilada.xml_parchado[src_xml] = super().patch_xml(src_xml)
+        return parchado
+
+    def render(self, context, jinja_env=None, autoescape=False):
+        if jinja_env is None and not autoescape:
+            jinja_env = self._compilada.entorno
+        super().render(context, jinja_env, autoescape)
+
+    def precompilar(self):
+        """Prepara el XML y las plantillas Jinja del cuerpo, encabezados y pies sin renderizar."""
+        self.init_docx()
+        partes = [self.get_xml()]
+        for uri in (self.HEADER_URI, self.FOOTER_URI):
+            partes.extend(self.get_part_xml(parte) for _, parte in self.get_headers_footers(uri))
+        for xml in partes:
+            # Mismo preprocesamiento que DocxTemplate.render_xml_part antes de compilar
+            fuente = re.sub(r"<w:p([ >])", r"\n<w:p\1", self.patch_xml(xml))
+            self._compilada.entorno.from_string(fuente)
+
+
+_cache = {}
+_candado = threading.Lock()
+
+
+def _compilada(ruta):
+    ruta = os.path.abspath(ruta)
+    mtime = os.stat(ruta).st_mtime_ns
+    compilada = _cache.get(ruta)
+    if compilada is None or compilada.mtime != mtime:
+        with _candado:
+            compilada = _cache.get(ruta)
+            if compilada is None or compilada.mtime != mtime:
+                compilada = _cache[ruta] = _PlantillaCompilada(ruta, mtime)
+    return compilada
+
+
+def obtener_plantilla(ruta):
+    """Devuelve una DocxTemplate lista para renderizar a partir de la caché (recarga si el archivo cambió)."""
+    return DocxTemplateCacheada(_compilada(ruta))
+
+
+def precargar_plantillas():
+    """Carga en caché las plantillas de PlantillaTramite y las demás .docx del directorio de plantillas."""
+    from .models import PlantillaTramite
+
+    nombres = set(PlantillaTramite.objects.values_list('ruta_archivo', flat=True))
+    if os.path.isdir(DIRECTORIO_PLANTILLAS_WORD):
+        nombres.update(n for n in os.listdir(DIRECTORIO_PLANTILLAS_WORD) if n.lower().endswith('.docx'))
+
+    cargadas = 0
+    for nombre in sorted(nombres):
+        ruta = os.path.join(DIRECTORIO_PLANTILLAS_WORD, nombre)
+        if not os.path.exists(ruta):
+            logger.warning("Plantilla Word no encontrada: %s", ruta)
+            continue
+        try:
+            obtener_plantilla(ruta).precompilar()
+            cargadas += 1
+        except Exception:
+            logger.exception("No se pudo precargar la plantilla Word %s", ruta)
+    return cargadas
+
+
+def precargar_en_segundo_plano():
+    """Precarga las plantillas en un hilo para no retrasar el arranque del servidor."""
+    def _precargar():
+        from django.db import connection, DatabaseError
+        try:
+            precargar_plantillas()
+        except DatabaseError:
+            logger.warning("No se pudieron precargar las plantillas Word (base de datos no disponible).")
+        finally:
+            connection.close()
+
+    threading.Thread(target=_precargar, name='precarga-plantillas-word', daemon=True).start()
+
+
+def renderizar_en_archivo(ruta_plantilla, contexto, ruta_salida):
+    """Renderiza la plantilla con `contexto` y guarda el documento en `ruta_salida`."""
+    documento = obtener_plantilla(ruta_plantilla)
+    documento.render(contexto)
+    documento.save(ruta_salida)
+    return ruta_salida
+
+
+def _renderizar_trabajo(trabajo):
+    clave, ruta_plantilla, contexto, ruta_salida = trabajo
+    try:
+        return clave, renderizar_en_archivo(ruta_plantilla, contexto, ruta_salida), None
+    except Exception as e:
+        logger.exception("Error al renderizar %s", ruta_salida)
+        return clave, None, str(e)
+
+
+def _precalentar(rutas_plantillas):
+    """Inicializador de cada proceso del pool: con 'spawn' la caché empieza vacía."""
+    for ruta in rutas_plantillas:
+        try:
+            obtener_plantilla(ruta).precompilar()
+        except Exception:
+            # El trabajo que use la plantilla reportará el error
+            logger.exception("No se pudo precargar la plantilla Word %s", ruta)
+
+
+def _procesos_render():
+    procesos = getattr(settings, 'WORD_PROCESOS_RENDER', None)
+    if procesos is None:
+        procesos = min(4, os.cpu_count() or 1)
+    return procesos
+
+
+def renderizar_lote(trabajos, procesos=None):
+    """
+    Renderiza una lista de trabajos (clave, ruta_plantilla, contexto, ruta_salida) y
+    genera (clave, ruta_salida, error) conforme cada documento termina, no necesariamente
+    en orden. Con más de un proceso el trabajo se reparte en un ProcessPoolExecutor
+    cuyos procesos precargan las plantillas del lote al arrancar; si el pool no puede
+    crearse o se rompe, lo pendiente se renderiza en este proceso.
+    """
+    trabajos = list(trabajos)
+    procesos = min(procesos or _procesos_render(), len(trabajos))
+    pendientes = {trabajo[0]: trabajo for trabajo in trabajos}
+
+    # Arrancar procesos solo compensa en lotes grandes (ver WORD_MINIMO_LOTE_PARALELO)
+    if procesos > 1 and len(trabajos) >= getattr(settings, 'WORD_MINIMO_LOTE_PARALELO', 100):
+        try:
+            # 'spawn' no hereda hilos ni candados del servidor y es el único modo disponible en Windows
+            contexto_mp = multiprocessing.get_context('spawn')
+            plantillas = sorted({trabajo[1] for trabajo in trabajos})
+            with ProcessPoolExecutor(
+                max_workers=procesos, mp_context=contexto_mp, initializer=_precalentar, initargs=(plantillas,),
+            ) as pool:
+                futuros = [pool.submit(_renderizar_trabajo, trabajo) for trabajo in trabajos]
+                for futuro in as_completed(futuros):
+                    resultado = futuro.result()
+                    del pendientes[resultado[0]]
+                    yield resultado
+        except (BrokenProcessPool, OSError, NotImplementedError):
+            logger.exception("No se pudo renderizar en paralelo; se continúa en el proceso actual.")
+
+    for trabajo in list(pendientes.values()):
+        yield _renderizar_trabajo(trabajo)
@@ -0,0 +1,196 @@
+"""
+Medición de tiempos y consultas por vista.
+
+RendimientoMiddleware (middleware.py) envuelve cada petición en un `Medicion`, que
+cuenta las consultas SQL con `connection.execute_wrapper` (funciona con DEBUG=False)
+y acumula su duración. En las respuestas por streaming la medición sigue mientras se
+genera el contenido (`FlujoMedido`) y la muestra se guarda al terminar de enviarlo. Una misma sentencia (con los parámetros aparte, así que
+"SELECT ... WHERE id = %s" cuenta como una sola) repetida RENDIMIENTO_UMBRAL_N1 veces
+o más se registra en el log como posible N+1.
+
+Las muestras se guardan en MuestraRendimiento, una tabla acotada: cada tanto se
+borran las que pasan de RENDIMIENTO_MAX_MUESTRAS. Las URL de RENDIMIENTO_URLS_EXCLUIDAS
+(las que la interfaz consulta periódicamente, como el estado de un trabajo) no se
+guardan para no escribir una fila por segundo mientras una página está abierta. La página Ajustes > Rendimiento
+las resume por nombre de URL con `resumen_por_url` (p50/p95).
+"""
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Probabilidad de depurar la tabla después de guardar una muestra
+PROBABILIDAD_DEPURAR = 0.01
+
+
+def _ajuste(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+class Medicion:
+    """Contexto que mide el tiempo total, las consultas y el tiempo en SQL de un bloque."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.duracion_sql = 0.0
+        self.sentencias = Counter()
+        self.duracion = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duracion_sql += time.perf_counter() - inicio
+            self.consultas += 1
+            self.sentencias[sql] += 1
+
+    def __enter__(self):
+        self._envoltura = connection.execute_wrapper(self)
+        self._envoltura.__enter__()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # Se acumula: una respuesta por streaming se mide en varios tramos (ver FlujoMedido)
+        self.duracion += time.perf_counter() - self._inicio
+        self._envoltura.__exit__(*exc)
+
+    def mas_repetida(self):
+        """(sentencia, veces) de la consulta que más se repitió, o ('', 0)."""
+        if not self.sentencias:
+            return '', 0
+        return self.sentencias.most_common(1)[0]
+
+
+class FlujoMedido:
+    """
+    Contenido de un StreamingHttpResponse que se sigue midiendo mientras se envía: las
+    exportaciones por streaming hacen sus consultas al generar cada bloque, después de
+    que la vista devolvió la respuesta. `al_terminar` se llama una vez, cuando el
+    contenido se agota o la respuesta se cierra.
+    """
+
+    def __init__(self, contenido, medicion, al_terminar):
+        self._contenido = iter(contenido)
+        self._medicion = medicion
+        self._al_terminar = al_terminar
+        self._terminado = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            with self._medicion:
+                return next(self._contenido)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        if not self._terminado:
+            self._terminado = True
+            self._al_terminar()
+
+
+def registrar(request, response, medicion):
+    """Guarda la muestra de la petición y avisa en el log si parece un N+1."""
+    from .models import MuestraRendimiento
+
+    nombre_url = request.resolver_match.view_name if request.resolver_match else ''
+    if not nombre_url:
+        return
+
+    sql, repeticiones = medicion.mas_repetida()
+    if repeticiones >= _ajuste('RENDIMIENTO_UMBRAL_N1', 10):
+        logger.warning(
+            "Posible N+1 en %s (%s): la misma consulta se ejecutó %d veces: %s",
+            nombre_url, request.path, repeticiones, sql[:300],
+        )
+    else:
+        sql = ''
+
+    if nombre_url in _ajuste('RENDIMIENTO_URLS_EXCLUIDAS', ()):
+        return
+    if random.random() >= _ajuste('RENDIMIENTO_MUESTREO', 1.0):
+        return
+
+    usuario = getattr(request, 'user', None)
+    # La escritura de la muestra queda fuera de la medición
+    MuestraRendimiento.objects.create(
+        nombre_url=nombre_url[:150],
+        ruta=request.path[:255],
+        metodo=request.method,
+        status=response.status_code,
+        duracion_ms=medicion.duracion * 1000,
+        consultas=medicion.consultas,
+        duracion_sql_ms=medicion.duracion_sql * 1000,
+        repeticiones_sql=repeticiones,
+        sql_repetido=sql,
+        usuario_id=usuario.pk if usuario is not None and usuario.is_authenticated else None,
+    )
+    if random.random() < PROBABILIDAD_DEPURAR:
+        depurar()
+
+
+def depurar():
+    """Borra las muestras más antiguas que exceden RENDIMIENTO_MAX_MUESTRAS."""
+    from .models import MuestraRendimiento
+
+    maximo = _ajuste('RENDIMIENTO_MAX_MUESTRAS', 50000)
+    corte = MuestraRendimiento.objects.order_by('-pk').values_list('pk', flat=True)[maximo:maximo + 1].first()
+    if corte is not None:
+        MuestraRendimiento.objects.filter(pk__lte=corte).delete()
+
+
+def percentil(valores_ordenados, p):
+    """Percentil `p` (0-100) por interpolación lineal de una lista ya ordenada."""
+    if not valores_ordenados:
+        return 0
+    posicion = (len(valores_ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(valores_ordenados) - 1)
+    return valores_ordenados[inferior] + (valores_ordenados[superior] - valores_ordenados[inferior]) * (posicion - inferior)
+
+
+def resumen_por_url(muestras):
+    """
+    Estadísticas por nombre de URL de un queryset de MuestraRendimiento, ordenadas
+    por p95 de duración (las vistas más lentas primero).
+    """
+    columnas = ('nombre_url', 'duracion_ms', 'consultas', 'duracion_sql_ms', 'repeticiones_sql')
+    por_url = defaultdict(lambda: {'duraciones': [], 'consultas': [], 'sql': [], 'repeticiones': 0, 'n1': 0})
+    umbral = _ajuste('RENDIMIENTO_UMBRAL_N1', 10)
+    for nombre_url, duracion, consultas, duracion_sql, repeticiones in muestras.values_list(*columnas).iterator():
+        datos = por_url[nombre_url]
+        datos['duraciones'].append(duracion)
+        datos['consultas'].append(consultas)
+        datos['sql'].append(duracion_sql)
+        datos['repeticiones'] = max(datos['repeticiones'], repeticiones)
+        datos['n1'] += repeticiones >= umbral
+
+    filas = []
+    for nombre_url, datos in por_url.items():
+        duraciones = sorted(datos['duraciones'])
+        consultas = sorted(datos['consultas'])
+        sql = sorted(datos['sql'])
+        filas.append({
+            'nombre_url': nombre_url,
+            'muestras': len(duraciones),
+            'p50_ms': percentil(duraciones, 50),
+            'p95_ms': percentil(duraciones, 95),
+            'max_ms': duraciones[-1],
+            'p50_consultas': percentil(consultas, 50),
+            'p95_consultas': percentil(consultas, 95),
+            'p95_sql_ms': percentil(sql, 95),
+            'max_repeticiones': datos['repeticiones'],
+            'muestras_n1': datos['n1'],
+        })
+    filas.sort(key=lambda fila: fila['p95_ms'], reverse=True)
+    return filas
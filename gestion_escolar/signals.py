@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.db.backends.signals import connection_created
 from django.dispatch import receiver
 from django.contrib.auth.models import User
@@ -26,3 +26,132 @@ def crear_notificacion_mensaje(sender, instance, created, **kwargs):
             mensaje=f"Has recibido un nuevo mensaje de {instance.remitente.username}: '{instance.asunto}'",
             correspondencia=instance
         )
+
+# Mantiene el índice de texto completo (EntradaBusqueda) de la búsqueda global
+@receiver(post_save, sender='gestion_escolar.Historial')
+@receiver(post_save, sender='gestion_escolar.RegistroCorrespondencia')
+@receiver(post_save, sender='gestion_escolar.FUP')
+def indexar_busqueda_texto(sender, instance, raw=False, **kwargs):
+    # Con loaddata las relaciones pueden no estar cargadas aún; el comando reconstruye el índice al final
+    if raw:
+        return
+    from .busqueda_texto import indexar_objeto
+    indexar_objeto(instance)
+
+@receiver(post_delete, sender='gestion_escolar.Historial')
+@receiver(post_delete, sender='gestion_escolar.RegistroCorrespondencia')
+@receiver(post_delete, sender='gestion_escolar.FUP')
+def desindexar_busqueda_texto(sender, instance, **kwargs):
+    from .busqueda_texto import desindexar_objeto
+    desindexar_objeto(instance)
+
+# Mantiene la línea de tiempo del kardex (KardexEvento)
+@receiver(post_save, sender='gestion_escolar.Historial')
+@receiver(post_save, sender='gestion_escolar.RegistroCorrespondencia')
+@receiver(post_save, sender='gestion_escolar.KardexMovimiento')
+@receiver(post_save, sender='gestion_escolar.FUP')
+def sincronizar_kardex(sender, instance, raw=False, **kwargs):
+    # Con loaddata las relaciones pueden no estar cargadas aún; el comando reconstruye el kardex al final
+    if raw:
+        return
+    from .kardex_eventos import sincronizar_eventos
+    sincronizar_eventos([instance])
+
+@receiver(post_delete, sender='gestion_escolar.Historial')
+@receiver(post_delete, sender='gestion_escolar.RegistroCorrespondencia')
+@receiver(post_delete, sender='gestion_escolar.KardexMovimiento')
+@receiver(post_delete, sender='gestion_escolar.FUP')
+def eliminar_eventos_kardex(sender, instance, **kwargs):
+    from .kardex_eventos import eliminar_eventos
+    eliminar_eventos(instance)
+
+# Invalida los conteos en caché de las tablas DataTables que dependen del modelo
+@receiver(post_save, sender='gestion_escolar.Maestro')
+@receiver(post_save, sender='gestion_escolar.Escuela')
+@receiver(post_save, sender='gestion_escolar.FUP')
+@receiver(post_save, sender='gestion_escolar.Historial')
+@receiver(post_delete, sender='gestion_escolar.Maestro')
+@receiver(post_delete, sender='gestion_escolar.Escuela')
+@receiver(post_delete, sender='gestion_escolar.FUP')
+@receiver(post_delete, sender='gestion_escolar.Historial')
+def invalidar_conteos_datatables(sender, **kwargs):
+    from .datatables import invalidar_conteos
+    invalidar_conteos(sender)
+
+# Invalida el tema activo y el conteo de alertas en caché (ver context_processors.py)
+@receiver(post_save, sender='gestion_escolar.Tema')
+@receiver(post_delete, sender='gestion_escolar.Tema')
+def invalidar_cache_tema(sender, **kwargs):
+    from .context_processors import invalidar_tema
+    invalidar_tema()
+
+@receiver(post_save, sender='gestion_escolar.Notificacion')
+@receiver(post_save, sender='gestion_escolar.Pendiente')
+@receiver(post_delete, sender='gestion_escolar.Notificacion')
+@receiver(post_delete, sender='gestion_escolar.Pendiente')
+def invalidar_cache_alertas(sender, instance, **kwargs):
+    from .context_processors import invalidar_alertas
+    invalidar_alertas(instance.usuario_id)
+
+# Descarta las prelaciones en caché de buscar_prelacion
+@receiver(post_save, sender='gestion_escolar.Prelacion')
+@receiver(post_delete, sender='gestion_escolar.Prelacion')
+def invalidar_cache_prelaciones(sender, **kwargs):
+    from .identificadores import invalidar_prelaciones
+    invalidar_prelaciones()
+
+@receiver(post_save, sender='gestion_escolar.Escuela')
+def recalcular_desubicados_escuela(sender, instance, created, raw=False, **kwargs):
+    """Un cambio de CCT puede dejar (o sacar) fuera de adscripción a todo el personal de la escuela."""
+    # Con loaddata, `desubicado` ya viene en los datos de cada maestro
+    if not created and not raw:
+        from .models import Maestro
+        Maestro.recalcular_desubicados(Maestro.objects.filter(id_escuela=instance))
+
+# Mantiene el índice de directivos (LiderazgoEscuela / LiderazgoZona)
+@receiver(post_save, sender='gestion_escolar.Maestro')
+def actualizar_liderazgo_maestro(sender, instance, raw=False, **kwargs):
+    """El índice aún refleja el estado anterior: se recalcula donde figuraba y donde corresponde ahora."""
+    if raw:
+        return
+    from .liderazgo import actualizar_escuelas, actualizar_zonas, afectados_por_maestro
+    escuelas, zonas = afectados_por_maestro(instance)
+    actualizar_zonas(zonas)
+    actualizar_escuelas(escuelas)
+
+@receiver(pre_delete, sender='gestion_escolar.Maestro')
+def recordar_liderazgo_maestro(sender, instance, **kwargs):
+    # Al borrar, las FK del índice quedan en NULL: se guardan antes las escuelas y zonas afectadas
+    from .liderazgo import afectados_por_maestro
+    instance._liderazgo_afectado = afectados_por_maestro(instance)
+
+@receiver(post_delete, sender='gestion_escolar.Maestro')
+def actualizar_liderazgo_maestro_borrado(sender, instance, **kwargs):
+    from .liderazgo import actualizar_escuelas, actualizar_zonas
+    escuelas, zonas = getattr(instance, '_liderazgo_afectado', (set(), set()))
+    actualizar_zonas(zonas)
+    actualizar_escuelas(escuelas)
+
+@receiver(post_save, sender='gestion_escolar.Director')
+@receiver(post_delete, sender='gestion_escolar.Director')
+def actualizar_liderazgo_director(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .liderazgo import actualizar_escuelas
+    from .models import LiderazgoEscuela
+    escuelas = set(LiderazgoEscuela.objects.filter(director_id=instance.maestro_id).values_list('escuela_id', flat=True))
+    escuelas.add(instance.escuela_id)
+    actualizar_escuelas(escuelas)
+
+@receiver(post_save, sender='gestion_escolar.Zona')
+def actualizar_liderazgo_zona(sender, instance, raw=False, **kwargs):
+    if not raw:
+        from .liderazgo import actualizar_zonas
+        actualizar_zonas([instance.pk])
+
+@receiver(post_save, sender='gestion_escolar.Escuela')
+def actualizar_liderazgo_escuela(sender, instance, raw=False, **kwargs):
+    """Escuela nueva o posible cambio de zona."""
+    if not raw:
+        from .liderazgo import actualizar_escuelas
+        actualizar_escuelas([instance.pk])
@@ -1,3 +1,26 @@
+// Configuración "ajax" para tablas server-side que paginan por keyset.
+// Guarda el token "cursor" de cada respuesta y lo reenvía en la siguiente petición,
+// para que el servidor obtenga la página siguiente/anterior sin OFFSET.
+function ajaxDataTablesConCursor(url, datosExtra) {
+    var cursor = null;
+    return {
+        url: url,
+        type: 'GET',
+        data: function(d) {
+            if (cursor) {
+                d.cursor = cursor;
+            }
+            if (datosExtra) {
+                datosExtra(d);
+            }
+        },
+        dataSrc: function(json) {
+            cursor = json.cursor || null;
+            return json.data;
+        }
+    };
+}
+
 
 $(document).ready(function() {
     // Función para normalizar texto (quitar acentos)
@@ -18,10 +41,7 @@ $(document).ready(function() {
         $('#tablaMaestros').DataTable({
             processing: true,
             serverSide: true,
-            ajax: {
-                url: $('#tablaMaestros').data('ajax-url'),
-                type: 'GET'
-            },
+            ajax: ajaxDataTablesConCursor($('#tablaMaestros').data('ajax-url')),
             columns: [
                 { data: 0 }, // ID
                 { data: 1 }, // Nombre
@@ -56,10 +76,7 @@ $(document).ready(function() {
         $('#tablaFUPs').DataTable({
             processing: true,
             serverSide: true,
-            ajax: {
-                url: $('#tablaFUPs').data('ajax-url'),
-                type: 'GET'
-            },
+            ajax: ajaxDataTablesConCursor($('#tablaFUPs').data('ajax-url')),
             columns: [
                 { data: 0 }, // Folio
                 { data: 1 }, // Fecha
@@ -0,0 +1,42 @@
+// Select2 con búsqueda por AJAX para los campos BusquedaAjaxChoiceField (gestion_escolar/forms.py).
+// El widget SeleccionAjax solo renderiza la opción seleccionada y deja en el <select> la URL
+// de búsqueda (data-ajax-url), el placeholder y el mínimo de caracteres. La URL responde
+// {results: [{id, text}]} para el parámetro term.
+function inicializarSelect2Ajax(contenedor) {
+    $(contenedor || document).find('select[data-ajax-url]').each(function() {
+        var $select = $(this);
+        $select.select2({
+            placeholder: $select.data('placeholder') || '',
+            allowClear: true,
+            width: '100%',
+            minimumInputLength: $select.data('minimum-input-length') || 0,
+            ajax: {
+                url: $select.data('ajax-url'),
+                dataType: 'json',
+                delay: 250,
+                data: function(params) {
+                    return { term: params.term };
+                },
+                processResults: function(data) {
+                    return { results: data.results || [] };
+                },
+                cache: true
+            },
+            language: {
+                inputTooShort: function(args) {
+                    return 'Ingresa al menos ' + args.minimum + ' caracteres';
+                },
+                noResults: function() {
+                    return 'No se encontraron resultados';
+                },
+                searching: function() {
+                    return 'Buscando...';
+                }
+            }
+        });
+    });
+}
+
+$(function() {
+    inicializarSelect2Ajax();
+});
@@ -0,0 +1,48 @@
+// Seguimiento de trabajos en segundo plano (ver gestion_escolar/trabajos.py).
+// Las vistas que encolan un trabajo responden {status: 'encolado', job_id, url_estado};
+// esperarTrabajo consulta url_estado hasta que el trabajo termina y entonces llama a
+// alTerminar(resultado) o a alFallar(mensaje). alAvanzar(estado) recibe cada consulta.
+function esperarTrabajo(urlEstado, opciones) {
+    var intervalo = opciones.intervalo || 1000;
+    var consultar = function() {
+        $.getJSON(urlEstado)
+            .done(function(estado) {
+                if (estado.estado === 'COMPLETADO') {
+                    opciones.alTerminar(estado.resultado || {});
+                } else if (estado.estado === 'ERROR') {
+                    opciones.alFallar(estado.mensaje || 'Error al ejecutar el trabajo.');
+                } else {
+                    if (opciones.alAvanzar) {
+                        opciones.alAvanzar(estado);
+                    }
+                    setTimeout(consultar, intervalo);
+                }
+            })
+            .fail(function() {
+                // Un fallo de red momentáneo no cancela el trabajo: se vuelve a consultar
+                setTimeout(consultar, intervalo * 3);
+            });
+    };
+    consultar();
+}
+
+// Envía un POST que encola un trabajo y espera su resultado.
+// opciones: url, data, alAvanzar, alTerminar(resultado), alFallar(mensaje).
+function encolarYEsperar(opciones) {
+    $.ajax({
+        url: opciones.url,
+        type: 'POST',
+        data: opciones.data || {},
+        success: function(respuesta) {
+            if (respuesta.status === 'encolado') {
+                esperarTrabajo(respuesta.url_estado, opciones);
+            } else {
+                // Respuesta directa (sin trabajo de por medio)
+                opciones.alTerminar(respuesta);
+            }
+        },
+        error: function(xhr) {
+            opciones.alFallar(xhr.responseJSON ? xhr.responseJSON.message : 'Error de servidor.');
+        }
+    });
+}
@@ -1,3 +1,449 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core import serializers
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import trabajos
+from .datatables import SolicitudDataTables
+from .middleware import RendimientoMiddleware
+from .models import (
+    FUP, MAX_ID_MAESTRO, SECUENCIA_ID_MAESTRO, EntradaBusqueda, Escuela, JobEjecucion, KardexEvento, Maestro,
+    MuestraRendimiento, Secuencia, Zona,
+)
+from .views.fup import _fups_para_exportar
+
+
+def _clave_orden(maestro):
+    # Mismo orden que SolicitudDataTables._orden (invertido en descendente): nulos al
+    # inicio en ascendente y al final en descendente; el pk desempata
+    return (maestro.a_paterno is not None, maestro.a_paterno or '', maestro.pk)
+
+
+class PaginacionDataTablesTests(TestCase):
+    """Paginación por cursor de SolicitudDataTables sobre una columna con valores repetidos."""
+
+    POR_PAGINA = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        for i, apellido in enumerate(['PEREZ', 'LOPEZ', 'PEREZ', None, 'LOPEZ', 'PEREZ', 'AVILA', None, 'PEREZ', 'LOPEZ', 'ZU']):
+            Maestro.objects.create(nombres=f'NOMBRE{i}', a_paterno=apellido, a_materno='X')
+        cls.factory = RequestFactory()
+
+    def setUp(self):
+        cache.clear()
+
+    def esperado(self, descendente):
+        maestros = list(Maestro.objects.all())
+        maestros.sort(key=_clave_orden, reverse=descendente)
+        return [m.pk for m in maestros]
+
+    def pagina(self, start, descendente=False, cursor=None, exacto=False, total=None):
+        parametros = {
+            'draw': 1, 'start': start, 'length': self.POR_PAGINA,
+            'order[0][column]': 0, 'order[0][dir]': 'desc' if descendente else 'asc',
+        }
+        if cursor:
+            parametros['cursor'] = cursor
+        tabla = SolicitudDataTables(self.factory.get('/', parametros), ['a_paterno', 'id_maestro'])
+        total = Maestro.objects.count() if total is None else total
+        filas = tabla.paginar(Maestro.objects.all(), total, exacto=exacto)
+        return tabla, [m.pk for m in filas]
+
+    def test_avanza_y_retrocede_con_cursor(self):
+        for descendente in (False, True):
+            esperado = self.esperado(descendente)
+            total = len(esperado)
+
+            # Hacia adelante: cada página parte de la última fila de la anterior
+            vistas, cursores, cursor, start = [], [], None, 0
+            while start < total:
+                tabla, pks = self.pagina(start, descendente, cursor)
+                self.assertEqual(pks, esperado[start:start + self.POR_PAGINA], (descendente, start))
+                if cursor:
+                    self.assertIsNotNone(tabla.cursor)
+                vistas.extend(pks)
+                cursor = tabla.siguiente_cursor
+                cursores.append((start, cursor))
+                start += self.POR_PAGINA
+            self.assertEqual(vistas, esperado)
+
+            # Recarga de la misma página
+            ultimo_start, ultimo_cursor = cursores[-1]
+            tabla, pks = self.pagina(ultimo_start, descendente, ultimo_cursor)
+            self.assertIsNotNone(tabla.cursor)
+            self.assertEqual(pks, esperado[ultimo_start:ultimo_start + self.POR_PAGINA])
+
+            # Hacia atrás: cada página termina en la primera fila de la siguiente
+            start, cursor = ultimo_start, ultimo_cursor
+            while start > 0:
+                start -= self.POR_PAGINA
+                tabla, pks = self.pagina(start, descendente, cursor)
+                self.assertIsNotNone(tabla.cursor)
+                self.assertEqual(pks, esperado[start:start + self.POR_PAGINA], (descendente, start))
+                cursor = tabla.siguiente_cursor
+
+    def test_salto_cerca_del_final_con_conteo_exacto(self):
+        for descendente in (False, True):
+            esperado = self.esperado(descendente)
+            total = len(esperado)
+            for start in range(total // 2 + 1, total, 2):
+                _, pks = self.pagina(start, descendente, exacto=True)
+                self.assertEqual(pks, esperado[start:start + self.POR_PAGINA], (descendente, start))
+
+    def test_salto_con_conteo_desactualizado_no_usa_el_final(self):
+        # Con un conteo mayor que las filas reales, contar desde el final daría otra página
+        esperado = self.esperado(False)
+        start = len(esperado) - self.POR_PAGINA
+        _, pks = self.pagina(start, total=len(esperado) + 5)
+        self.assertEqual(pks, esperado[start:])
+
+    def test_cursor_alterado_se_ignora(self):
+        esperado = self.esperado(False)
+        primera, _ = self.pagina(0)
+        segunda, _ = self.pagina(self.POR_PAGINA, cursor=primera.siguiente_cursor)
+        # Datos de la segunda página con la firma de la primera
+        alterado = f"{segunda.siguiente_cursor.rsplit(':', 1)[0]}:{primera.siguiente_cursor.rsplit(':', 1)[1]}"
+
+        tabla, pks = self.pagina(self.POR_PAGINA, cursor=alterado)
+        self.assertIsNone(tabla.cursor)
+        self.assertEqual(pks, esperado[self.POR_PAGINA:2 * self.POR_PAGINA])
+
+    def test_cursor_de_otro_orden_se_ignora(self):
+        tabla, _ = self.pagina(0, descendente=False)
+        tabla, pks = self.pagina(self.POR_PAGINA, descendente=True, cursor=tabla.siguiente_cursor)
+        self.assertIsNone(tabla.cursor)
+        self.assertEqual(pks, self.esperado(True)[self.POR_PAGINA:2 * self.POR_PAGINA])
+
+
+class ConteoDataTablesTests(TestCase):
+    """recordsTotal se guarda en caché y las señales lo invalidan al guardar o borrar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin_pruebas', password='x')
+        for i in range(3):
+            Maestro.objects.create(nombres=f'NOMBRE{i}', a_paterno='PRUEBA', a_materno='X')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def records_total(self):
+        respuesta = self.client.get(reverse('lista_maestros_ajax'), {'draw': 1, 'start': 0, 'length': 10})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()['recordsTotal']
+
+    def test_conteo_se_invalida_al_guardar_y_borrar(self):
+        self.assertEqual(self.records_total(), 3)
+
+        # bulk_create no dispara señales: el conteo sigue saliendo de la caché
+        Maestro.objects.bulk_create([Maestro(id_maestro='90001', nombres='SIN', a_paterno='SENAL')])
+        self.assertEqual(self.records_total(), 3)
+
+        nuevo = Maestro.objects.create(nombres='NUEVO', a_paterno='PRUEBA', a_materno='X')
+        self.assertEqual(self.records_total(), 5)
+
+        nuevo.delete()
+        self.assertEqual(self.records_total(), 4)
+
+
+def tarea_no_serializable(trabajo):
+    return {'fecha': timezone.now()}
+
+
+def tarea_correcta(trabajo, valor):
+    return {'valor': valor}
+
+
+@mock.patch.dict(trabajos.TAREAS, {
+    'pruebas.no_serializable': 'gestion_escolar.tests.tarea_no_serializable',
+    'pruebas.correcta': 'gestion_escolar.tests.tarea_correcta',
+})
+class ColaTrabajosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('usuario_pruebas', password='x')
+
+    def test_un_trabajo_se_toma_una_sola_vez(self):
+        trabajo = JobEjecucion.objects.create(tipo='pruebas.correcta', parametros={'valor': 1})
+
+        self.assertEqual(trabajos._tomar(trabajo.pk, 'trabajador-a'), 1)
+        self.assertEqual(trabajos._tomar(trabajo.pk, 'trabajador-b'), 0)
+        self.assertIsNone(trabajos.tomar_siguiente('trabajador-b'))
+
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.trabajador, trabajo.intentos), ('EJECUTANDO', 'trabajador-a', 1))
+
+    def test_tomar_siguiente_respeta_el_orden_de_la_cola(self):
+        primero = JobEjecucion.objects.create(tipo='pruebas.correcta', parametros={'valor': 1})
+        segundo = JobEjecucion.objects.create(tipo='pruebas.correcta', parametros={'valor': 2})
+
+        self.assertEqual(trabajos.tomar_siguiente('a').pk, primero.pk)
+        self.assertEqual(trabajos.tomar_siguiente('b').pk, segundo.pk)
+        self.assertIsNone(trabajos.tomar_siguiente('c'))
+
+    @override_settings(TRABAJOS_ABANDONO_SEGUNDOS=600, TRABAJOS_MAX_INTENTOS=3)
+    def test_trabajo_sin_latido_vuelve_a_la_cola(self):
+        hace_rato = timezone.now() - timedelta(seconds=601)
+        abandonado = JobEjecucion.objects.create(
+            tipo='pruebas.correcta', estado='EJECUTANDO', trabajador='caido', intentos=1, fecha_latido=hace_rato,
+        )
+        agotado = JobEjecucion.objects.create(
+            tipo='pruebas.correcta', estado='EJECUTANDO', trabajador='caido', intentos=3, fecha_latido=hace_rato,
+        )
+        vivo = JobEjecucion.objects.create(
+            tipo='pruebas.correcta', estado='EJECUTANDO', trabajador='vivo', intentos=1, fecha_latido=timezone.now(),
+        )
+
+        with self.assertLogs('gestion_escolar.trabajos', 'WARNING'):
+            self.assertEqual(trabajos.recuperar_abandonados(), (1, 1))
+
+        abandonado.refresh_from_db()
+        agotado.refresh_from_db()
+        vivo.refresh_from_db()
+        self.assertEqual((abandonado.estado, abandonado.trabajador), ('PENDIENTE', ''))
+        self.assertEqual(agotado.estado, 'ERROR')
+        self.assertEqual(vivo.estado, 'EJECUTANDO')
+        self.assertEqual(trabajos.tomar_siguiente('nuevo').pk, abandonado.pk)
+
+    def test_resultado_correcto_completa_el_trabajo(self):
+        trabajo = JobEjecucion.objects.create(tipo='pruebas.correcta', parametros={'valor': 7})
+        trabajos.ejecutar(trabajos.tomar_siguiente('a'))
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'COMPLETADO')
+        self.assertEqual(trabajo.resultado, {'valor': 7})
+
+    def test_resultado_no_serializable_termina_en_error(self):
+        trabajo = JobEjecucion.objects.create(tipo='pruebas.no_serializable')
+        with self.assertLogs('gestion_escolar.trabajos', 'ERROR'):
+            trabajos.ejecutar(trabajos.tomar_siguiente('a'))
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'ERROR')
+        self.assertIsNone(trabajo.resultado)
+        self.assertIn('JSON', trabajo.mensaje)
+
+
+class DescargaResultadoTrabajoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.duenio = User.objects.create_user('duenio', password='x')
+        cls.otro = User.objects.create_user('otro', password='x')
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.media_root = os.path.join(directorio.name, 'media')
+        os.makedirs(os.path.join(self.media_root, 'exportaciones'))
+        with open(os.path.join(self.media_root, 'exportaciones', 'reporte.xlsx'), 'wb') as archivo:
+            archivo.write(b'contenido')
+        # Archivo dentro del directorio temporal pero fuera de MEDIA_ROOT
+        with open(os.path.join(directorio.name, 'secreto.txt'), 'wb') as archivo:
+            archivo.write(b'secreto')
+        ajustes = override_settings(MEDIA_ROOT=self.media_root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def trabajo_con_archivo(self, archivo, usuario=None):
+        return JobEjecucion.objects.create(
+            tipo='exportacion.maestros', usuario=usuario or self.duenio, estado='COMPLETADO',
+            resultado={'archivo': archivo, 'nombre': 'reporte.xlsx'},
+        )
+
+    def descargar(self, trabajo, usuario):
+        self.client.force_login(usuario)
+        return self.client.get(reverse('descargar_resultado_trabajo', args=[trabajo.pk]))
+
+    def test_el_duenio_descarga_su_archivo(self):
+        respuesta = self.descargar(self.trabajo_con_archivo(os.path.join('exportaciones', 'reporte.xlsx')), self.duenio)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(b''.join(respuesta.streaming_content), b'contenido')
+
+    def test_otro_usuario_no_puede_descargar(self):
+        respuesta = self.descargar(self.trabajo_con_archivo(os.path.join('exportaciones', 'reporte.xlsx')), self.otro)
+        self.assertEqual(respuesta.status_code, 404)
+
+    def test_rutas_fuera_de_media_root_se_rechazan(self):
+        for archivo in (
+            os.path.join('..', 'secreto.txt'),
+            os.path.join('exportaciones', '..', '..', 'secreto.txt'),
+            os.path.join(os.path.dirname(self.media_root), 'secreto.txt'),
+        ):
+            respuesta = self.descargar(self.trabajo_con_archivo(archivo), self.duenio)
+            self.assertEqual(respuesta.status_code, 404, archivo)
+
+
+class SecuenciaIdMaestroTests(TestCase):
+
+    def test_bloques_consecutivos(self):
+        self.assertEqual(Maestro.reservar_ids(3), ['00001', '00002', '00003'])
+        self.assertEqual(Maestro.reservar_ids(2), ['00004', '00005'])
+        self.assertEqual(Secuencia.objects.get(nombre=SECUENCIA_ID_MAESTRO).ultimo_valor, 5)
+
+    def test_cantidad_invalida(self):
+        with self.assertRaises(ValueError):
+            Secuencia.reservar(SECUENCIA_ID_MAESTRO, 0)
+
+    def test_secuencia_nueva_parte_del_mayor_id_registrado(self):
+        Maestro.objects.bulk_create([
+            Maestro(id_maestro='00041', nombres='A'),
+            Maestro(id_maestro='00007', nombres='B'),
+            Maestro(id_maestro='X0100', nombres='C'),  # no numérico: no cuenta
+        ])
+        self.assertEqual(Maestro.reservar_ids(2), ['00042', '00043'])
+
+    def test_id_ocupado_por_fuera_de_la_secuencia_se_salta(self):
+        Maestro.objects.create(nombres='PRIMERO')
+        self.assertEqual(Secuencia.objects.get(nombre=SECUENCIA_ID_MAESTRO).ultimo_valor, 1)
+        # Alta con ID explícito (admin, loaddata, SQL) que la secuencia no conoce
+        Maestro.objects.bulk_create([Maestro(id_maestro='00002', nombres='EXISTENTE')])
+
+        nuevo = Maestro.objects.create(nombres='NUEVO')
+
+        self.assertEqual(nuevo.id_maestro, '00003')
+        self.assertEqual(Maestro.objects.get(pk='00002').nombres, 'EXISTENTE')
+        self.assertEqual(Maestro.objects.get(pk='00003').nombres, 'NUEVO')
+        self.assertEqual(Maestro.objects.count(), 3)
+
+    def test_guardar_un_maestro_existente_no_toma_otro_id(self):
+        maestro = Maestro.objects.create(nombres='ORIGINAL')
+        maestro.nombres = 'EDITADO'
+        maestro.save()
+        self.assertEqual(Maestro.objects.get().nombres, 'EDITADO')
+        self.assertEqual(Secuencia.objects.get(nombre=SECUENCIA_ID_MAESTRO).ultimo_valor, 1)
+
+    def test_se_agotan_los_ids_de_cinco_digitos(self):
+        Secuencia.objects.create(nombre=SECUENCIA_ID_MAESTRO, ultimo_valor=MAX_ID_MAESTRO - 1)
+        self.assertEqual(Maestro.reservar_ids(1), [f'{MAX_ID_MAESTRO:05d}'])
+        with self.assertRaisesMessage(ValueError, 'Se agotaron los IDs'):
+            Maestro.reservar_ids(1)
+        with self.assertRaises(ValueError):
+            Maestro.objects.create(nombres='SIN ID')
+
+
+class CargaFixturesTests(TestCase):
+    """loaddata con registros que aparecen antes que los maestros a los que apuntan."""
+
+    FIXTURE = [
+        {'model': 'gestion_escolar.historial', 'pk': 1, 'fields': {
+            'fecha_creacion': '2026-01-15T10:00:00Z', 'tipo_documento': 'OFICIO DE PRUEBA',
+            'maestro': '00050', 'ruta_archivo': 'oficio.docx', 'motivo': 'JUBILACION',
+        }},
+        {'model': 'gestion_escolar.maestro', 'pk': '00050', 'fields': {
+            'nombres': 'JUANA', 'a_paterno': 'RIOS', 'a_materno': 'PAZ',
+            'fecha_registro': '2026-01-01T00:00:00Z', 'fecha_actualizacion': '2026-01-01T00:00:00Z',
+        }},
+    ]
+
+    def cargar(self, registros):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = os.path.join(directorio.name, 'datos.json')
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(registros, archivo)
+        call_command('loaddata', ruta, verbosity=0)
+
+    def test_indice_de_texto_se_reconstruye_al_terminar(self):
+        self.cargar(self.FIXTURE)
+
+        entrada = EntradaBusqueda.objects.get(tipo='HISTORIAL', objeto_id=1)
+        self.assertEqual(entrada.titulo, 'OFICIO DE PRUEBA - JUANA RIOS PAZ')
+
+    def test_kardex_se_reconstruye_al_terminar(self):
+        self.cargar(self.FIXTURE)
+
+        evento = KardexEvento.objects.get(tipo='TRAMITE', objeto_id=1)
+        self.assertEqual((evento.maestro_id, evento.descripcion), ('00050', 'OFICIO DE PRUEBA'))
+
+    def test_escuela_cargada_no_recalcula_al_personal(self):
+        escuela = Escuela.objects.create(id_escuela='10DML0001A', nombre_ct='ESCUELA', zona_esc=Zona.objects.create(numero=1))
+        maestro = Maestro.objects.create(nombres='ANA', id_escuela=escuela, techo_f='10DML0001A')
+        # `desubicado` se carga tal como viene en los datos; la carga de la escuela no lo recalcula
+        Maestro.objects.filter(pk=maestro.pk).update(desubicado=True)
+
+        self.cargar(json.loads(serializers.serialize('json', [escuela])))
+
+        maestro.refresh_from_db()
+        self.assertTrue(maestro.desubicado)
+
+
+class BusquedaFupTests(TestCase):
+    """La tabla y la exportación de FUPs aplican la misma búsqueda por nombre."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin_fup', password='x')
+        cls.maestro = Maestro.objects.create(nombres='ANA', a_paterno='RIOS', a_materno='PAZ')
+        cls.fup = FUP.objects.create(maestro=cls.maestro, folio='F-1')
+        # El FUP conserva el nombre con el que se capturó
+        cls.maestro.a_paterno = 'MORA'
+        cls.maestro.save()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def en_tabla(self, texto):
+        respuesta = self.client.get(reverse('fup_datatable_ajax'), {'draw': 1, 'start': 0, 'length': 10, 'search[value]': texto})
+        return [fila[0] for fila in respuesta.json()['data']]
+
+    def en_exportacion(self, texto):
+        return [fup.folio for fup in _fups_para_exportar(texto)]
+
+    def test_tabla_y_exportacion_coinciden(self):
+        for texto, esperado in (('rios ana', ['F-1']), ('RÍOS', ['F-1']), ('MORA', []), ('F-1', ['F-1'])):
+            self.assertEqual(self.en_exportacion(texto), esperado, texto)
+            self.assertEqual(len(self.en_tabla(texto)), len(esperado), texto)
+
+
+@override_settings(RENDIMIENTO_MUESTREO=1.0, RENDIMIENTO_UMBRAL_N1=10, RENDIMIENTO_URLS_EXCLUIDAS=())
+class RendimientoStreamingTests(TestCase):
+    """Las consultas que hace una respuesta por streaming al enviarse cuentan en su muestra."""
+
+    def peticion(self, contenido):
+        request = RequestFactory().get(reverse('exportar_fup_excel'))
+        request.resolver_match = resolve(request.path)
+        return RendimientoMiddleware(lambda request: StreamingHttpResponse(contenido))(request)
+
+    def test_muestra_se_guarda_al_terminar_el_streaming(self):
+        def contenido():
+            for _ in range(12):
+                Maestro.objects.count()
+                yield b'bloque'
+
+        response = self.peticion(contenido())
+        self.assertFalse(MuestraRendimiento.objects.exists())
+
+        with self.assertLogs('gestion_escolar.rendimiento', 'WARNING'):
+            self.assertEqual(b''.join(response.streaming_content), b'bloque' * 12)
+        response.close()
+
+        muestra = MuestraRendimiento.objects.get()
+        self.assertEqual(muestra.nombre_url, 'exportar_fup_excel')
+        self.assertEqual((muestra.consultas, muestra.repeticiones_sql), (12, 12))
+
+    def test_muestra_se_guarda_si_se_cierra_antes_de_terminar(self):
+        def contenido():
+            while True:
+                Maestro.objects.count()
+                yield b'bloque'
+
+        response = self.peticion(contenido())
+        next(iter(response.streaming_content))
+        response.close()
+
+        self.assertEqual(MuestraRendimiento.objects.get().consultas, 1)
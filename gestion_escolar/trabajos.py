@@ -0,0 +1,239 @@
+"""
+Cola de trabajos en segundo plano guardada en la base de datos (JobEjecucion).
+
+Las vistas que generan documentos o exportaciones grandes encolan el trabajo con
+`encolar(...)` y responden de inmediato con su id; `manage.py run_workers` toma los
+trabajos pendientes y los ejecuta fuera del ciclo de la petición. La pantalla consulta
+`trabajos/<id>/estado/` para mostrar el avance y, al terminar, el resultado.
+
+Cada tipo de trabajo se registra en TAREAS con la ruta de la función que lo ejecuta.
+La función recibe el JobEjecucion y sus parámetros como argumentos con nombre, informa
+su avance con `reportar_avance` y devuelve un dict (JSON) que queda en `resultado`.
+Si lanza una excepción el trabajo termina en ERROR con el mensaje de la excepción.
+
+Para tomar un trabajo se usa un UPDATE condicionado a que siga PENDIENTE, de modo que
+dos trabajadores nunca ejecutan el mismo aunque consulten la cola a la vez; no hace
+falta un broker externo. Mientras un trabajo se ejecuta, un hilo renueva su
+`fecha_latido`; si un trabajador se cae, sus trabajos vuelven a la cola pasado
+TRABAJOS_ABANDONO_SEGUNDOS (hasta TRABAJOS_MAX_INTENTOS veces).
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TAREAS = {
+    'vacancias.paso_word': 'gestion_escolar.views.vacancias.tarea_paso_word',
+    'vacancias.paso_gsheets': 'gestion_escolar.views.vacancias.tarea_paso_gsheets',
+    'vacancias.paso_excel': 'gestion_escolar.views.vacancias.tarea_paso_excel',
+    'exportacion.maestros': 'gestion_escolar.views.reportes.tarea_exportar_maestros',
+    'exportacion.fup': 'gestion_escolar.views.fup.tarea_exportar_fup',
+}
+
+# Trabajos pendientes que se intentan tomar en cada consulta a la cola
+CANDIDATOS_POR_CONSULTA = 10
+INTERVALO_RESCATE = 60  # segundos entre búsquedas de trabajos abandonados
+
+
+def nombre_trabajador():
+    return f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+
+def encolar(tipo, usuario=None, **parametros):
+    """Crea un trabajo PENDIENTE y lo devuelve. Los parámetros deben ser serializables a JSON."""
+    from .models import JobEjecucion
+
+    if tipo not in TAREAS:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+
+    trabajo = JobEjecucion.objects.create(tipo=tipo, usuario=usuario, parametros=parametros)
+    if getattr(settings, 'TRABAJOS_SINCRONOS', False) and _tomar(trabajo.pk, 'sincrono'):
+        trabajo.refresh_from_db()
+        ejecutar(trabajo)
+    return trabajo
+
+
+def _tomar(pk, trabajador):
+    from .models import JobEjecucion
+
+    ahora = timezone.now()
+    return JobEjecucion.objects.filter(pk=pk, estado='PENDIENTE').update(
+        estado='EJECUTANDO', trabajador=trabajador, intentos=F('intentos') + 1,
+        fecha_inicio=ahora, fecha_latido=ahora,
+    )
+
+
+def tomar_siguiente(trabajador):
+    """Toma el trabajo pendiente más antiguo que ningún otro trabajador haya tomado, o None."""
+    from .models import JobEjecucion
+
+    candidatos = (
+        JobEjecucion.objects.filter(estado='PENDIENTE')
+        .order_by('fecha_creacion', 'pk')
+        .values_list('pk', flat=True)[:CANDIDATOS_POR_CONSULTA]
+    )
+    for pk in list(candidatos):
+        if _tomar(pk, trabajador):
+            return JobEjecucion.objects.select_related('usuario').get(pk=pk)
+    return None
+
+
+def reportar_avance(trabajo, completados, total=None, mensaje=None):
+    """Guarda el avance del trabajo sin tocar sus demás campos."""
+    from .models import JobEjecucion
+
+    campos = {'completados': completados, 'fecha_latido': timezone.now()}
+    if total is not None:
+        campos['total'] = total
+    if mensaje is not None:
+        campos['mensaje'] = mensaje[:255]
+    JobEjecucion.objects.filter(pk=trabajo.pk).update(**campos)
+    for campo, valor in campos.items():
+        setattr(trabajo, campo, valor)
+
+
+def _finalizar(trabajo, estado, resultado=None, mensaje=None):
+    from .models import JobEjecucion
+
+    campos = {'estado': estado, 'resultado': resultado, 'fecha_fin': timezone.now()}
+    if mensaje is not None:
+        campos['mensaje'] = mensaje[:255]
+    JobEjecucion.objects.filter(pk=trabajo.pk).update(**campos)
+    for campo, valor in campos.items():
+        setattr(trabajo, campo, valor)
+
+
+class _Latido(threading.Thread):
+    """Renueva fecha_latido del trabajo en curso para que no se tome como abandonado."""
+
+    def __init__(self, pk, intervalo):
+        super().__init__(daemon=True)
+        self.pk = pk
+        self.intervalo = intervalo
+        self.detener = threading.Event()
+
+    def run(self):
+        from .models import JobEjecucion
+
+        try:
+            while not self.detener.wait(self.intervalo):
+                try:
+                    JobEjecucion.objects.filter(pk=self.pk, estado='EJECUTANDO').update(fecha_latido=timezone.now())
+                except Exception as e:
+                    # Con SQLite la tabla puede estar bloqueada por el propio trabajo; se reintenta después
+                    logger.debug("No se pudo renovar el latido del trabajo %s: %s", self.pk, e)
+        finally:
+            connection.close()
+
+
+def ejecutar(trabajo):
+    """Ejecuta un trabajo ya tomado (EJECUTANDO) y guarda su resultado o su error."""
+    latido = _Latido(trabajo.pk, max(getattr(settings, 'TRABAJOS_ABANDONO_SEGUNDOS', 600) / 4, 1))
+    latido.start()
+    try:
+        funcion = import_string(TAREAS[trabajo.tipo])
+        resultado = funcion(trabajo, **(trabajo.parametros or {}))
+        # Un resultado que no se puede guardar en el JSONField se reporta como error del
+        # trabajo; si fallara en _finalizar, el trabajo quedaría EJECUTANDO y se reintentaría
+        json.dumps(resultado)
+    except Exception as e:
+        logger.exception("Error en el trabajo %s (%s)", trabajo.pk, trabajo.tipo)
+        _finalizar(trabajo, 'ERROR', mensaje=str(e) or type(e).__name__)
+    else:
+        _finalizar(trabajo, 'COMPLETADO', resultado=resultado)
+    finally:
+        latido.detener.set()
+        latido.join()
+    return trabajo
+
+
+def recuperar_abandonados():
+    """
+    Devuelve a la cola los trabajos EJECUTANDO cuyo trabajador dejó de dar señales, o
+    los marca en ERROR si ya agotaron sus intentos. Devuelve (reencolados, fallidos).
+    """
+    from .models import JobEjecucion
+
+    limite = timezone.now() - timedelta(seconds=getattr(settings, 'TRABAJOS_ABANDONO_SEGUNDOS', 600))
+    abandonados = JobEjecucion.objects.filter(estado='EJECUTANDO', fecha_latido__lt=limite)
+    max_intentos = getattr(settings, 'TRABAJOS_MAX_INTENTOS', 3)
+
+    fallidos = abandonados.filter(intentos__gte=max_intentos).update(
+        estado='ERROR', mensaje='El trabajador dejó de responder.', fecha_fin=timezone.now()
+    )
+    reencolados = abandonados.filter(intentos__lt=max_intentos).update(estado='PENDIENTE', trabajador='')
+    if reencolados or fallidos:
+        logger.warning("Trabajos abandonados: %d reencolados, %d marcados con error", reencolados, fallidos)
+    return reencolados, fallidos
+
+
+def atender_cola(trabajador=None, intervalo=None, una_vez=False, al_terminar=None, detener=None):
+    """
+    Ciclo de un trabajador: toma y ejecuta trabajos hasta que `detener` (threading.Event)
+    se active, o hasta vaciar la cola si `una_vez`. `al_terminar(trabajo, segundos)` se
+    llama después de cada trabajo. Devuelve cuántos trabajos ejecutó.
+    """
+    trabajador = trabajador or nombre_trabajador()
+    intervalo = intervalo or getattr(settings, 'TRABAJOS_INTERVALO', 2)
+    detener = detener or threading.Event()
+    ejecutados = 0
+    ultimo_rescate = None
+
+    while not detener.is_set():
+        close_old_connections()
+        if ultimo_rescate is None or time.monotonic() - ultimo_rescate >= INTERVALO_RESCATE:
+            recuperar_abandonados()
+            ultimo_rescate = time.monotonic()
+
+        trabajo = tomar_siguiente(trabajador)
+        if trabajo is None:
+            if una_vez:
+                break
+            detener.wait(intervalo)
+            continue
+
+        inicio = time.monotonic()
+        ejecutar(trabajo)
+        ejecutados += 1
+        if al_terminar:
+            al_terminar(trabajo, time.monotonic() - inicio)
+
+    close_old_connections()
+    return ejecutados
+
+
+def estado_trabajo(trabajo):
+    """Datos del trabajo que consulta la pantalla (el resultado solo cuando ya terminó)."""
+    from .models import JobEjecucion
+
+    datos = {
+        'id': trabajo.pk,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'completados': trabajo.completados,
+        'total': trabajo.total,
+        'porcentaje': round(trabajo.completados * 100 / trabajo.total) if trabajo.total else None,
+        'mensaje': trabajo.mensaje,
+        'terminado': trabajo.terminado,
+    }
+    if trabajo.estado == 'PENDIENTE':
+        # Trabajos que se ejecutarán antes que este
+        datos['en_espera'] = JobEjecucion.objects.filter(
+            estado='PENDIENTE', fecha_creacion__lt=trabajo.fecha_creacion
+        ).count()
+    if trabajo.terminado:
+        datos['resultado'] = trabajo.resultado
+    return datos
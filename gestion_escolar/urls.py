@@ -53,6 +53,8 @@ urlpatterns = [
     path('tramites/get_motivos_tramite/', views.get_motivos_tramite_ajax, name='get_motivos_tramite_ajax'),
     path('tramites/get_maestro_data/', views.get_maestro_data_ajax, name='get_maestro_data'),
     path('buscar_maestros/', views.buscar_maestros_ajax, name='buscar_maestros_ajax'),
+    path('buscar_escuelas/', views.buscar_escuelas_ajax, name='buscar_escuelas_ajax'),
+    path('buscar_categorias/', views.buscar_categorias_ajax, name='buscar_categorias_ajax'),
 
     # URLs para Reporte de Vacancia
     path('vacancias/gestionar/', views.gestionar_lote_vacancia, name='gestionar_lote_vacancia'),
@@ -63,10 +65,13 @@ urlpatterns = [
     path('vacancias/get_interino_data_ajax/', views.get_maestro_data_for_vacancia, name='get_interino_data_for_vacancia'),
     path('vacancias/get_interino_and_prelacion_data_ajax/', views.get_interino_and_prelacion_data_ajax, name='get_interino_and_prelacion_data_ajax'),
     path('vacancias/eliminar/<int:pk>/', views.eliminar_vacancia_lote, name='eliminar_vacancia_lote'),
+    path('trabajos/<int:job_id>/estado/', views.estado_trabajo, name='estado_trabajo'),
+    path('trabajos/<int:job_id>/descargar/', views.descargar_resultado_trabajo, name='descargar_resultado_trabajo'),
     path('tramites/get_prelacion_data/', views.get_prelacion_data_ajax, name='get_prelacion_data_ajax'),
 
     # URLs para Historial
     path('historial/', views.historial, name='historial'),
+    path('historial/ajax/', views.historial_ajax, name='historial_ajax'),
     path('historial/descargar/<int:item_id>/', views.descargar_archivo_historial, name='descargar_archivo_historial'),
     path('historial/eliminar/<int:item_id>/', views.eliminar_historial_item, name='eliminar_historial_item'),
     path('historial/guardar_observacion/<int:item_id>/', views.guardar_observacion_historial, name='guardar_observacion_historial'),
@@ -76,6 +81,7 @@ urlpatterns = [
     # URLs para Reportes
     path('reportes/', views.reportes_dashboard, name='reportes_dashboard'),
     path('reportes/personal_fuera_adscripcion/', views.reporte_personal_fuera_adscripcion, name='reporte_personal_fuera_adscripcion'),
+    path('reportes/personal_fuera_adscripcion/ajax/', views.reporte_personal_fuera_adscripcion_ajax, name='reporte_personal_fuera_adscripcion_ajax'),
     path('reportes/distribucion_funcion/', views.reporte_distribucion_funcion, name='reporte_distribucion_funcion'),
     path('reportes/personal_fuera_adscripcion/export/excel/', views.export_personal_fuera_adscripcion_excel, name='export_personal_fuera_adscripcion_excel'),
 
@@ -84,6 +90,7 @@ urlpatterns = [
     path('pendientes/todos/', views.PendienteAllListView.as_view(), name='pendientes_todos'),
     path('pendientes/crear/', views.PendienteCreateView.as_view(), name='pendientes_crear'),
     path('pendientes/<int:pk>/completar/', views.pendiente_marcar_completado, name='pendiente_marcar_completado'),
+    path('alertas/', views.alertas_usuario_ajax, name='alertas_usuario_ajax'),
     path('correspondencia/', views.CorrespondenciaInboxView.as_view(), name='correspondencia_inbox'),
     path('correspondencia/crear/', views.CorrespondenciaCreateView.as_view(), name='correspondencia_crear'),
     path('correspondencia/<int:pk>/', views.CorrespondenciaDetailView.as_view(), name='correspondencia_detail'),
@@ -101,6 +108,7 @@ urlpatterns = [
     path('ajustes/cambiar-password/', views.cambiar_password, name='cambiar_password'),
     path('ajustes/editar-perfil/', views.editar_perfil, name='editar_perfil'),
     path('ajustes/asignar-director/', views.asignar_director, name='asignar_director'),
+    path('ajustes/rendimiento/', views.rendimiento_view, name='rendimiento'),
 
     # URLs para Roles y Permisos
     path('ajustes/roles/', views.RoleListView.as_view(), name='role_list'),
@@ -149,4 +157,8 @@ urlpatterns = [
     path('kardex/ajax/', views.kardex_maestros_ajax, name='kardex_maestros_ajax'),
     path('kardex/', views.kardex_maestro_list, name='kardex_list'),
     path('kardex/maestro/<str:maestro_id>/', views.kardex_maestro_detail, name='kardex_maestro_detail'),
+
+    # URLs para Búsqueda Global
+    path('busqueda/', views.busqueda_global, name='busqueda_global'),
+    path('busqueda/ajax/', views.busqueda_global_ajax, name='busqueda_global_ajax'),
 ]
\ No newline at end of file
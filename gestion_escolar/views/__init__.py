@@ -14,3 +14,6 @@ from .roles import *
 from .mensajeria import *
 from .fup import *
 from .usuarios import *
+from .busqueda import *
+from .trabajos import *
+from .rendimiento import *
@@ -1,8 +1,12 @@
 from django.http import JsonResponse
-from django.contrib.auth.decorators import login_required
 from django.db.models import Q
+from django.contrib.auth.decorators import login_required
+from django.template.defaultfilters import date as formato_fecha
 
-from ..models import Prelacion, MotivoTramite, PlantillaTramite, Maestro
+from ..models import MotivoTramite, PlantillaTramite, Maestro, Escuela, Categoria
+from ..busqueda import buscar_maestros
+from ..identificadores import buscar_prelacion
+from ..context_processors import listar_alertas
 
 # Vista AJAX para obtener datos de prelación
 def get_prelacion_data_ajax(request):
@@ -17,7 +21,7 @@ def get_prelacion_data_ajax(request):
 
     if curp_interino:
         try:
-            prelacion = Prelacion.objects.filter(curp=curp_interino).first()
+            prelacion = buscar_prelacion(curp_interino)
             
             if prelacion:
                 datos_prelacion = {
@@ -78,14 +82,8 @@ def buscar_maestros_ajax(request):
     if not search_term or len(search_term) < 2:
         return JsonResponse({'results': []})
     
-    from unidecode import unidecode
-    # Normalizamos el término de búsqueda (mayúsculas y sin acentos)
-    search_unaccented = unidecode(search_term.upper())
-
-    # Buscamos en el campo pre-calculado y normalizado
-    query = Q(nombre_completo_unaccented__icontains=search_unaccented)
-    
-    maestros = Maestro.objects.filter(query).order_by('nombres', 'a_paterno', 'a_materno')[:20]
+    # Búsqueda por el índice de trigramas del nombre normalizado, ordenada por relevancia
+    maestros = buscar_maestros(search_term, limite=20)
     
     results = []
     for maestro in maestros:
@@ -98,6 +96,33 @@ def buscar_maestros_ajax(request):
     
     return JsonResponse({'results': results})
 
+# Límite de resultados de las búsquedas de Select2 (EscuelaChoiceField y CategoriaChoiceField)
+LIMITE_BUSQUEDA = 20
+
+@login_required
+def buscar_escuelas_ajax(request):
+    termino = request.GET.get('term', '').strip()
+    escuelas = Escuela.objects.order_by('id_escuela')
+    if termino:
+        escuelas = escuelas.filter(Q(id_escuela__icontains=termino) | Q(nombre_ct__icontains=termino))
+    results = [
+        {'id': pk, 'text': f"{id_escuela} - {nombre_ct}"}
+        for pk, id_escuela, nombre_ct in escuelas.values_list('pk', 'id_escuela', 'nombre_ct')[:LIMITE_BUSQUEDA]
+    ]
+    return JsonResponse({'results': results})
+
+@login_required
+def buscar_categorias_ajax(request):
+    termino = request.GET.get('term', '').strip()
+    categorias = Categoria.objects.order_by('id_categoria')
+    if termino:
+        categorias = categorias.filter(Q(id_categoria__icontains=termino) | Q(descripcion__icontains=termino))
+    results = [
+        {'id': id_categoria, 'text': id_categoria}
+        for id_categoria in categorias.values_list('id_categoria', flat=True)[:LIMITE_BUSQUEDA]
+    ]
+    return JsonResponse({'results': results})
+
 @login_required
 def get_maestro_data_ajax(request):
     maestro_id = request.GET.get('maestro_id')
@@ -151,7 +176,7 @@ def get_interino_and_prelacion_data_ajax(request):
             data['curp_interino'] = maestro.curp or ''
 
             if maestro.curp:
-                prelacion = Prelacion.objects.filter(curp=maestro.curp).first()
+                prelacion = buscar_prelacion(maestro.curp)
                 if prelacion:
                     data['folio_prelacion'] = prelacion.folio or ''
                     data['posicion_orden'] = prelacion.pos_orden or ''
@@ -165,3 +190,11 @@ def get_interino_and_prelacion_data_ajax(request):
             data['curp_interino'] = 'Error'
 
     return JsonResponse(data)
+
+@login_required
+def alertas_usuario_ajax(request):
+    """Alertas del menú de la campana; se piden al abrirlo en lugar de armarse en cada página."""
+    alertas = listar_alertas(request.user)
+    for alerta in alertas:
+        alerta['date'] = formato_fecha(alerta['date'], 'd/m/Y')
+    return JsonResponse({'alertas': alertas, 'total': len(alertas)})
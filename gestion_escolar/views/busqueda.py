@@ -0,0 +1,74 @@
+from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.urls import reverse
+
+from ..models import Historial
+from ..busqueda_texto import (
+    PERMISOS_POR_TIPO, TIPO_CORRESPONDENCIA, TIPO_FUP, TIPO_HISTORIAL, buscar_texto,
+)
+
+RESULTADOS_POR_PAGINA = 20
+
+
+def _tipos_permitidos(user):
+    return [tipo for tipo, permiso in PERMISOS_POR_TIPO.items() if user.has_perm(permiso)]
+
+
+def _url_historial(item):
+    if item is None:
+        return reverse('historial')
+    if item.lote_reporte_id and item.tipo_documento in ("Reporte de Vacancia", "Asignación de Vacancia"):
+        return reverse('historial_detalle_lote', args=[item.id])
+    if item.tipo_documento.startswith(("Trámite -", "Oficio -")):
+        return reverse('historial_detalle_tramite', args=[item.id])
+    return reverse('historial')
+
+
+def _resultados(request):
+    texto = request.GET.get('q', '').strip()
+    try:
+        pagina = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        pagina = 1
+
+    entradas, total = buscar_texto(texto, _tipos_permitidos(request.user), pagina, RESULTADOS_POR_PAGINA)
+
+    # Los registros de Historial se cargan en una sola consulta para decidir su enlace de detalle
+    historiales = Historial.objects.only('id', 'tipo_documento', 'lote_reporte').in_bulk(
+        [e.objeto_id for e in entradas if e.tipo == TIPO_HISTORIAL]
+    )
+    resultados = []
+    for entrada in entradas:
+        if entrada.tipo == TIPO_HISTORIAL:
+            url = _url_historial(historiales.get(entrada.objeto_id))
+        elif entrada.tipo == TIPO_CORRESPONDENCIA:
+            url = reverse('registrocorrespondencia_detail', args=[entrada.objeto_id])
+        elif entrada.tipo == TIPO_FUP:
+            url = reverse('detalle_fup', args=[entrada.objeto_id])
+        resultados.append({
+            'tipo': entrada.get_tipo_display(),
+            'titulo': entrada.titulo,
+            'fecha': entrada.fecha.strftime('%d/%m/%Y') if entrada.fecha else '',
+            'fragmento': entrada.contenido[:200],
+            'url': url,
+        })
+
+    return {
+        'q': texto,
+        'resultados': resultados,
+        'total': total,
+        'page': pagina,
+        'has_previous': pagina > 1,
+        'has_next': pagina * RESULTADOS_POR_PAGINA < total,
+    }
+
+
+@login_required
+def busqueda_global(request):
+    return render(request, 'gestion_escolar/busqueda_global.html', _resultados(request))
+
+
+@login_required
+def busqueda_global_ajax(request):
+    return JsonResponse(_resultados(request))
@@ -11,7 +11,7 @@ def lista_zonas(request):
     if request.user.groups.filter(name='Directores').exists():
         raise PermissionDenied
     
-    zonas = Zona.objects.select_related('supervisor').order_by('numero')
+    zonas = Zona.objects.select_related('liderazgo__supervisor').order_by('numero')
     return render(request, 'gestion_escolar/lista_zonas.html', {'zonas': zonas})
 
 def agregar_zona(request):
@@ -28,7 +28,7 @@ def agregar_zona(request):
     return render(request, 'gestion_escolar/form_zona.html', {'form': form, 'titulo': 'Agregar Zona'})
 
 def editar_zona(request, pk):
-    zona = get_object_or_404(Zona.objects.select_related('supervisor'), pk=pk)
+    zona = get_object_or_404(Zona.objects.select_related('liderazgo__supervisor'), pk=pk)
     if request.method == 'POST':
         form = ZonaForm(request.POST, instance=zona)
         if form.is_valid():
@@ -110,7 +110,9 @@ def eliminar_escuela(request, pk):
     return render(request, 'gestion_escolar/eliminar_escuela.html', {'escuela': escuela})
 
 def detalle_escuela(request, pk):
-    escuela = get_object_or_404(Escuela, pk=pk)
+    escuela = get_object_or_404(
+        Escuela.objects.select_related('zona_esc', 'liderazgo__director', 'liderazgo__supervisor'), pk=pk
+    )
     personal = Maestro.objects.filter(id_escuela=escuela)
     context = {
         'escuela': escuela,
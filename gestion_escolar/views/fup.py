@@ -3,61 +3,56 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.db.models import Q
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from ..models import FUP, Maestro
 from ..forms import FUPForm
-import openpyxl
-from openpyxl.styles import Font, Alignment
-from datetime import date
+from ..datatables import SolicitudDataTables
+from ..exportacion import COLUMNAS_FUP, exportar_tabla
+from ..trabajos import encolar
+from .trabajos import exportar_tabla_en_trabajo, respuesta_encolado
 
 @login_required
 def lista_fup(request):
     return render(request, 'gestion_escolar/lista_fup.html')
 
+def _filtro_busqueda_fup(texto):
+    """
+    Q de la búsqueda de FUPs, la misma en la tabla y en la exportación. El nombre se busca
+    en el que quedó guardado en el FUP (el que muestra la tabla), no en el del maestro actual.
+    """
+    from unidecode import unidecode
+
+    query = Q(folio__icontains=texto) | \
+            Q(rfc__icontains=texto) | \
+            Q(clave_presupuestal__icontains=texto) | \
+            Q(techo_financiero__icontains=texto)
+
+    # Para el nombre completo, buscar que todas las palabras estén presentes
+    palabras = unidecode(texto.upper()).split()
+    if palabras:
+        nombre_query = Q()
+        for palabra in palabras:
+            nombre_query &= Q(nombre_completo__icontains=palabra)
+        query |= nombre_query
+    return query
+
 @login_required
 def fup_datatable_ajax(request):
-    draw = int(request.GET.get('draw', 0))
-    start = int(request.GET.get('start', 0))
-    length = int(request.GET.get('length', 10))
-    search_value = request.GET.get('search[value]', '')
-
-    order_column_index = int(request.GET.get('order[0][column]', 0))
-    order_dir = request.GET.get('order[0][dir]', 'asc')
     column_names = ['folio', 'fecha', 'nombre_completo', 'rfc', 'clave_presupuestal', 'techo_financiero', 'efectos']
-    order_column = column_names[order_column_index]
-    if order_dir == 'desc':
-        order_column = f'-{order_column}'
+    tabla = SolicitudDataTables(request, column_names)
+    search_value = tabla.busqueda
 
     queryset = FUP.objects.select_related('maestro').all()
-    records_total = queryset.count()
+    modelos_conteo = (FUP,)
+    records_total = tabla.contar(queryset, 'fup', modelos_conteo)
+    records_filtered = records_total
 
     if search_value:
-        from unidecode import unidecode
-        search_unaccented = unidecode(search_value.upper()).strip()
-        
-        # Dividir el texto de búsqueda en palabras
-        search_words = search_unaccented.split()
-        
-        # Crear query base para campos simples
-        query = Q(folio__icontains=search_value) | \
-                Q(rfc__icontains=search_value) | \
-                Q(clave_presupuestal__icontains=search_value) | \
-                Q(techo_financiero__icontains=search_value)
-        
-        # Para el nombre completo, buscar que todas las palabras estén presentes
-        if search_words:
-            nombre_query = Q()
-            for word in search_words:
-                nombre_query &= Q(nombre_completo__icontains=word)
-            query |= nombre_query
-        
-        queryset = queryset.filter(query)
-
-    records_filtered = queryset.count()
-    queryset = queryset.order_by(order_column)[start:start + length]
+        queryset = queryset.filter(_filtro_busqueda_fup(search_value))
+        records_filtered = tabla.contar(queryset, 'fup', modelos_conteo, filtrado=True)
 
     data = []
-    for fup in queryset:
+    for fup in tabla.paginar(queryset, records_filtered):
         
         pdf_button = ''
         if fup.archivo:
@@ -86,13 +81,7 @@ def fup_datatable_ajax(request):
             actions
         ])
 
-    response = {
-        'draw': draw,
-        'recordsTotal': records_total,
-        'recordsFiltered': records_filtered,
-        'data': data,
-    }
-    return JsonResponse(response)
+    return tabla.respuesta(data, records_total, records_filtered)
 
 @login_required
 def crear_fup(request):
@@ -157,79 +146,26 @@ def get_maestro_data_fup(request):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
-@login_required
-def exportar_fup_excel(request):
-    """Exporta la lista de FUPs a un archivo Excel."""
-    filtro = request.GET.get('filtro', '')
+def _fups_para_exportar(filtro=''):
     fup_qs = FUP.objects.select_related('maestro').all().order_by('-fecha')
 
     if filtro:
-        from unidecode import unidecode
-        search_unaccented = unidecode(filtro.upper()).strip()
-        search_words = search_unaccented.split()
-        
-        query = Q(folio__icontains=filtro) | \
-                Q(rfc__icontains=filtro) | \
-                Q(clave_presupuestal__icontains=filtro) | \
-                Q(techo_financiero__icontains=filtro)
-        
-        if search_words:
-            nombre_query = Q()
-            for word in search_words:
-                nombre_query &= Q(nombre_completo__icontains=word)
-            query |= nombre_query
-        
-        fup_qs = fup_qs.filter(query)
-    
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Reporte FUPs"
-
-    headers = [
-        "Folio", "Fecha", "Nombre Completo", "RFC", "Clave Presupuestal", 
-        "Techo Financiero", "Efectos", "Sostenimiento", "Observaciones"
-    ]
-    ws.append(headers)
-    
-    # Apply styles to headers
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal='center', vertical='center')
+        fup_qs = fup_qs.filter(_filtro_busqueda_fup(filtro))
+    return fup_qs
 
-    for fup in fup_qs:
-        row = [
-            fup.folio,
-            fup.fecha.strftime("%Y-%m-%d") if isinstance(fup.fecha, date) else fup.fecha,
-            fup.nombre_completo,
-            fup.rfc,
-            fup.clave_presupuestal,
-            fup.techo_financiero,
-            fup.efectos,
-            fup.sostenimiento,
-            fup.observaciones,
-        ]
-        ws.append(row)
-
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 15
-    ws.column_dimensions['B'].width = 12
-    ws.column_dimensions['C'].width = 40
-    ws.column_dimensions['D'].width = 18
-    ws.column_dimensions['E'].width = 30
-    ws.column_dimensions['F'].width = 20
-    ws.column_dimensions['G'].width = 30
-    ws.column_dimensions['H'].width = 15
-    ws.column_dimensions['I'].width = 50
+@login_required
+def exportar_fup_excel(request):
+    """Exporta la lista de FUPs a un archivo Excel (con ?asincrono=1, mediante un trabajo en segundo plano)."""
+    filtro = request.GET.get('filtro', '')
+    if request.GET.get('asincrono'):
+        return respuesta_encolado(encolar('exportacion.fup', request.user, filtro=filtro))
 
     # Generar nombre de archivo con fecha actual
     from datetime import datetime
     fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'reporte_fups_{fecha_actual}.xlsx'
-    
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
\ No newline at end of file
+
+    return exportar_tabla(_fups_para_exportar(filtro), COLUMNAS_FUP, filename, "Reporte FUPs", encabezado_resaltado=True)
+
+def tarea_exportar_fup(trabajo, filtro=''):
+    return exportar_tabla_en_trabajo(trabajo, _fups_para_exportar(filtro), COLUMNAS_FUP, 'reporte_fups.xlsx', "Reporte FUPs", encabezado_resaltado=True)
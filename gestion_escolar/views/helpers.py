@@ -1,15 +1,18 @@
+import logging
 import os
 import openpyxl
-from docxtpl import DocxTemplate
 from datetime import datetime, date
 from django.conf import settings
-import gspread
-from google.oauth2 import service_account
 
 # Asegúrate de que los modelos necesarios estén disponibles.
 # A veces es mejor pasar los objetos como argumentos en lugar de importarlos directamente
 # para evitar dependencias circulares, pero por ahora los importamos.
-from ..models import Maestro, Escuela
+from ..models import Escuela
+from ..liderazgo import actualizar_escuelas, director_de_escuela, supervisor_de_zona
+from ..hojas_calculo import ErrorHojaCalculo, agregar_filas
+from ..plantillas_word import DIRECTORIO_PLANTILLAS_WORD, renderizar_en_archivo
+
+logger = logging.getLogger(__name__)
 
 # Helper function to get full name
 def get_full_name(maestro):
@@ -31,21 +34,61 @@ def get_school_info(escuela):
         'sostenimiento': escuela.get_sostenimiento_display() or '',
     }
 
-# Helper function to get director
+def _info_persona(maestro, no_encontrado):
+    if maestro:
+        return {'nombre': get_full_name(maestro), 'nivel': maestro.nivel_estudio or ''}
+    return {'nombre': no_encontrado, 'nivel': ''}
+
+# Director y supervisor vienen del índice de directivos (ver gestion_escolar/liderazgo.py)
 def get_director_info(escuela):
     if not escuela: return {'nombre': 'DIRECTOR NO ENCONTRADO', 'nivel': ''}
-    director = Maestro.objects.filter(id_escuela=escuela, funcion__in=['DIRECTOR', 'DIRECTOR (A)']).first()
-    if director:
-        return {'nombre': get_full_name(director), 'nivel': director.nivel_estudio or ''}
-    return {'nombre': 'DIRECTOR NO ENCONTRADO', 'nivel': ''}
+    return _info_persona(director_de_escuela(escuela), 'DIRECTOR NO ENCONTRADO')
 
-# Helper function to get supervisor
 def get_supervisor_info(zona):
     if not zona: return {'nombre': 'SUPERVISOR NO ENCONTRADO', 'nivel': ''}
-    supervisor = Maestro.objects.filter(id_escuela__zona_esc=zona, funcion__in=['SUPERVISOR', 'SUPERVISOR (A)', 'SUPERVISOR(A)']).first()
-    if supervisor:
-        return {'nombre': get_full_name(supervisor), 'nivel': supervisor.nivel_estudio or ''}
-    return {'nombre': 'SUPERVISOR NO ENCONTRADO', 'nivel': ''}
+    return _info_persona(supervisor_de_zona(zona), 'SUPERVISOR NO ENCONTRADO')
+
+class ContextoEscuelas:
+    """
+    Datos de escuela, director y supervisor para documentos e historial, resueltos una
+    sola vez por petición. Cada escuela se consulta junto con su zona y su entrada del
+    índice de directivos en una sola consulta y se memoriza por CCT, de modo que el
+    renderizado y el registro en Historial (o todos los documentos de un lote) la comparten.
+    """
+
+    def __init__(self):
+        self._por_cct = {}
+
+    def precargar(self, ccts):
+        """Carga de una vez las escuelas indicadas (por ejemplo, todas las de un lote)."""
+        pendientes = {cct for cct in ccts if cct and cct not in self._por_cct}
+        if not pendientes:
+            return
+        consulta = Escuela.objects.select_related('zona_esc', 'liderazgo__director', 'liderazgo__supervisor')
+        escuelas = list(consulta.filter(id_escuela__in=pendientes))
+        sin_indice = [escuela.pk for escuela in escuelas if not hasattr(escuela, 'liderazgo')]
+        if sin_indice:
+            actualizar_escuelas(sin_indice)
+            escuelas = list(consulta.filter(id_escuela__in=pendientes))
+        for escuela in escuelas:
+            self._por_cct[escuela.id_escuela] = {
+                'escuela': escuela,
+                'info': get_school_info(escuela),
+                'director': _info_persona(escuela.liderazgo.director, 'DIRECTOR NO ENCONTRADO'),
+                'supervisor': _info_persona(escuela.liderazgo.supervisor, 'SUPERVISOR NO ENCONTRADO'),
+            }
+        for cct in pendientes:
+            self._por_cct.setdefault(cct, None)
+
+    def por_cct(self, cct):
+        """{'escuela', 'info', 'director', 'supervisor'} de la escuela, o None si no existe."""
+        if not cct:
+            return None
+        self.precargar([cct])
+        return self._por_cct[cct]
+
+    def de_escuela(self, escuela):
+        return self.por_cct(escuela.id_escuela) if escuela else None
 
 # Helper function to get user initials
 def get_user_initials(user):
@@ -152,297 +195,287 @@ def serialize_form_data(cleaned_data):
     return serialized_data
 
 def send_to_google_sheet(row_data):
-    # print("DEBUG GS: Iniciando envío a Google Sheets...") # Comentado para producción
+    """Envía una sola fila; para varias filas usar hojas_calculo.EscritorHoja."""
     try:
-        if not hasattr(settings, 'GOOGLE_SHEETS_CREDENTIALS'):
-            return False, "Configuración de credenciales no encontrada"
-        creds_json = settings.GOOGLE_SHEETS_CREDENTIALS
-        if not creds_json.get('private_key') or not creds_json.get('client_email'):
-            return False, "Credenciales incompletas - falta private_key o client_email"
-        
-        # Crear una copia de las credenciales para modificar la clave privada
-        creds_for_auth = creds_json.copy()
-        # Reemplazar los '\n' escapados por saltos de línea reales
-        creds_for_auth['private_key'] = creds_for_auth['private_key'].replace('\\n', '\n')
-        
-        # print(f"DEBUG GS: Usando cuenta: {creds_for_auth['client_email']}") # Comentado para producción
-        SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-        credentials = service_account.Credentials.from_service_account_info(creds_for_auth, scopes=SCOPES)
-        # Usar gspread.Client directamente con el objeto de credenciales
-        gc = gspread.Client(auth=credentials)
-        # print("DEBUG GS: ✅ Autenticación exitosa") # Comentado para producción
-        spreadsheet = gc.open_by_key(settings.GOOGLE_SHEET_ID)
-        worksheet = spreadsheet.worksheet(settings.GOOGLE_SHEET_WORKSHEET_NAME)
-        # print("DEBUG GS: ✅ Hoja abierta correctamente") # Comentado para producción
-        cleaned_data = []
-        for item in row_data:
-            if item is None:
-                cleaned_data.append('')
-            elif isinstance(item, (date, datetime)):
-                cleaned_data.append(item.strftime('%Y-%m-%d'))
-            else:
-                cleaned_data.append(str(item))
-        worksheet.append_row(cleaned_data)
-        # print(f"DEBUG GS: ✅ Fila agregada: {cleaned_data}") # Comentado para producción
+        agregar_filas([row_data])
         return True, "Datos enviados correctamente a Google Sheets"
-    except gspread.exceptions.SpreadsheetNotFound:
-        error_msg = "Google Sheet no encontrado. Verifica el GOOGLE_SHEET_ID."
-        # print(f"DEBUG GS: ❌ {error_msg}") # Comentado para producción
-        return False, error_msg
-    except gspread.exceptions.WorksheetNotFound:
-        error_msg = f"Hoja '{settings.GOOGLE_SHEET_WORKSHEET_NAME}' no encontrada."
-        # print(f"DEBUG GS: ❌ {error_msg}") # Comentado para producción
-        return False, error_msg
-    except Exception as e:
-        error_msg = f"Error: {str(e)}"
-        # print(f"DEBUG GS: ❌ {error_msg}") # Comentado para producción
-        return False, error_msg
+    except ErrorHojaCalculo as e:
+        return False, str(e)
 
-def generate_word_document(form_data, plantilla_tramite, user):
-    try:
-        maestro_titular = form_data.get('maestro_titular')
-        template_name_upper = plantilla_tramite.nombre.upper().strip()
-        ruta_plantilla_final = plantilla_tramite.ruta_archivo
-        is_desubicado = False
-        if maestro_titular and maestro_titular.techo_f and maestro_titular.id_escuela:
-            if maestro_titular.techo_f.strip().upper() != maestro_titular.id_escuela.id_escuela.strip().upper():
-                is_desubicado = True
-        plantillas_especiales = {
-            "REINGRESO": "REINGRESODESUBICADO.docx",
-            "FILIACION": "FILIACIONDESUBICADO.docx",
-        }
-        if template_name_upper in plantillas_especiales and is_desubicado:
-            nueva_plantilla = plantillas_especiales[template_name_upper]
-            ruta_plantilla_final = nueva_plantilla
-            print(f"DEBUG: Maestro desubicado detectado para {template_name_upper}. Usando plantilla especial: {ruta_plantilla_final}")
-        template_path = os.path.join(settings.BASE_DIR, 'tramites', 'Plantillas', 'Word', ruta_plantilla_final)
-        doc = DocxTemplate(template_path)
-        maestro_interino = form_data.get('maestro_interino')
-        motivo_tramite_obj = form_data.get('motivo_tramite')
-        nombre_titular = get_full_name(maestro_titular)
-        curp_titular = maestro_titular.curp or '' if maestro_titular else ''
-        rfc_titular = maestro_titular.rfc or '' if maestro_titular else ''
-        categoria_titular = maestro_titular.categog.descripcion if maestro_titular and maestro_titular.categog else ''
-        presupuestal_titular = maestro_titular.clave_presupuestal or '' if maestro_titular else ''
-        techo_financiero_titular = maestro_titular.techo_f or '' if maestro_titular else ''
-        funcion_titular = maestro_titular.funcion or '' if maestro_titular else ''
-        nombre_interino = get_full_name(maestro_interino)
-        curp_interino = maestro_interino.curp or '' if maestro_interino else ''
-        rfc_interino = maestro_interino.rfc or '' if maestro_interino else ''
-        domicilio_part_interino = maestro_interino.domicilio_part or '' if maestro_interino else ''
-        codigo_postal_interino = maestro_interino.codigo_postal or '' if maestro_interino else ''
-        poblacion_interino = maestro_interino.poblacion or '' if maestro_interino else ''
-        telefono_interino = maestro_interino.telefono or '' if maestro_interino else ''
-        codigo_interino = maestro_interino.codigo or '' if maestro_interino else ''
-        paterno_interino = maestro_interino.a_paterno or '' if maestro_interino else ''
-        materno_interino = maestro_interino.a_materno or '' if maestro_interino else ''
-        nombre_interino_solo = maestro_interino.nombres or '' if maestro_interino else ''
-        formacion_academica_interino = maestro_interino.form_academica or '' if maestro_interino else ''
-        presupuestal_interino = presupuestal_titular
-        if motivo_tramite_obj and presupuestal_titular and len(presupuestal_titular) >= 2:
-            motivo_text = motivo_tramite_obj.motivo_tramite.upper().strip()
-            if motivo_text == "BECA COMISIÓN" or motivo_text == "PRORROGA DE BECA COMISION":
-                presupuestal_interino = "48" + presupuestal_titular[2:]
-            elif motivo_text == "LIC. DE GRAVIDEZ":
-                presupuestal_interino = "14" + presupuestal_titular[2:]
-            elif motivo_text == "LIC. PREPENSIONARIA":
-                presupuestal_interino = "15" + presupuestal_titular[2:]
-            elif motivo_text == "PREJUBILATORIO":
-                presupuestal_interino = "15" + presupuestal_titular[2:]
-        funcion_interino = maestro_titular.funcion or '' if maestro_titular else ''
-        folio = form_data.get('folio') or ''
-        fecha_efecto1 = form_data.get('fecha_efecto1')
-        fecha_efecto2 = form_data.get('fecha_efecto2')
-        fecha_efecto3 = form_data.get('fecha_efecto3')
-        fecha_efecto4 = form_data.get('fecha_efecto4')
-        motivo_movimiento = motivo_tramite_obj.motivo_tramite if motivo_tramite_obj else ''
-        observaciones = form_data.get('observaciones') or ''
-        quincena_inicial = form_data.get('quincena_inicial') or ''
-        quincena_final = form_data.get('quincena_final') or ''
-        motivo_tramite_text = motivo_tramite_obj.motivo_tramite.upper().strip() if motivo_tramite_obj else ''
-        tipo_movimiento_interino = ""
-        if motivo_tramite_text == "LIC. DE GRAVIDEZ":
-            tipo_movimiento_interino = "ALTA INTERINA EN GRAVIDEZ"
-        elif motivo_tramite_text == "LIC. POR PASAR A OTRO EMPLEO":
-            tipo_movimiento_interino = "ALTA INICIAL POR PROMOCIÓN O ADMISIÓN"
+def construir_contexto_word(form_data, plantilla_tramite, user, escuelas=None):
+    """
+    Devuelve la ruta de la plantilla a usar y el contexto con el que se renderiza el trámite.
+    `escuelas` es el ContextoEscuelas de la petición (se crea uno si no se indica).
+    """
+    maestro_titular = form_data.get('maestro_titular')
+    template_name_upper = plantilla_tramite.nombre.upper().strip()
+    ruta_plantilla_final = plantilla_tramite.ruta_archivo
+    is_desubicado = False
+    if maestro_titular and maestro_titular.techo_f and maestro_titular.id_escuela:
+        if maestro_titular.techo_f.strip().upper() != maestro_titular.id_escuela.id_escuela.strip().upper():
+            is_desubicado = True
+    plantillas_especiales = {
+        "REINGRESO": "REINGRESODESUBICADO.docx",
+        "FILIACION": "FILIACIONDESUBICADO.docx",
+    }
+    if template_name_upper in plantillas_especiales and is_desubicado:
+        nueva_plantilla = plantillas_especiales[template_name_upper]
+        ruta_plantilla_final = nueva_plantilla
+        logger.debug("Maestro desubicado en %s: se usa la plantilla %s", template_name_upper, ruta_plantilla_final)
+    template_path = os.path.join(DIRECTORIO_PLANTILLAS_WORD, ruta_plantilla_final)
+    maestro_interino = form_data.get('maestro_interino')
+    motivo_tramite_obj = form_data.get('motivo_tramite')
+    nombre_titular = get_full_name(maestro_titular)
+    curp_titular = maestro_titular.curp or '' if maestro_titular else ''
+    rfc_titular = maestro_titular.rfc or '' if maestro_titular else ''
+    categoria_titular = maestro_titular.categog.descripcion if maestro_titular and maestro_titular.categog else ''
+    presupuestal_titular = maestro_titular.clave_presupuestal or '' if maestro_titular else ''
+    techo_financiero_titular = maestro_titular.techo_f or '' if maestro_titular else ''
+    funcion_titular = maestro_titular.funcion or '' if maestro_titular else ''
+    nombre_interino = get_full_name(maestro_interino)
+    curp_interino = maestro_interino.curp or '' if maestro_interino else ''
+    rfc_interino = maestro_interino.rfc or '' if maestro_interino else ''
+    domicilio_part_interino = maestro_interino.domicilio_part or '' if maestro_interino else ''
+    codigo_postal_interino = maestro_interino.codigo_postal or '' if maestro_interino else ''
+    poblacion_interino = maestro_interino.poblacion or '' if maestro_interino else ''
+    telefono_interino = maestro_interino.telefono or '' if maestro_interino else ''
+    codigo_interino = maestro_interino.codigo or '' if maestro_interino else ''
+    paterno_interino = maestro_interino.a_paterno or '' if maestro_interino else ''
+    materno_interino = maestro_interino.a_materno or '' if maestro_interino else ''
+    nombre_interino_solo = maestro_interino.nombres or '' if maestro_interino else ''
+    formacion_academica_interino = maestro_interino.form_academica or '' if maestro_interino else ''
+    presupuestal_interino = presupuestal_titular
+    if motivo_tramite_obj and presupuestal_titular and len(presupuestal_titular) >= 2:
+        motivo_text = motivo_tramite_obj.motivo_tramite.upper().strip()
+        if motivo_text == "BECA COMISIÓN" or motivo_text == "PRORROGA DE BECA COMISION":
+            presupuestal_interino = "48" + presupuestal_titular[2:]
+        elif motivo_text == "LIC. DE GRAVIDEZ":
+            presupuestal_interino = "14" + presupuestal_titular[2:]
+        elif motivo_text == "LIC. PREPENSIONARIA":
+            presupuestal_interino = "15" + presupuestal_titular[2:]
+        elif motivo_text == "PREJUBILATORIO":
+            presupuestal_interino = "15" + presupuestal_titular[2:]
+    funcion_interino = maestro_titular.funcion or '' if maestro_titular else ''
+    folio = form_data.get('folio') or ''
+    fecha_efecto1 = form_data.get('fecha_efecto1')
+    fecha_efecto2 = form_data.get('fecha_efecto2')
+    fecha_efecto3 = form_data.get('fecha_efecto3')
+    fecha_efecto4 = form_data.get('fecha_efecto4')
+    motivo_movimiento = motivo_tramite_obj.motivo_tramite if motivo_tramite_obj else ''
+    observaciones = form_data.get('observaciones') or ''
+    quincena_inicial = form_data.get('quincena_inicial') or ''
+    quincena_final = form_data.get('quincena_final') or ''
+    motivo_tramite_text = motivo_tramite_obj.motivo_tramite.upper().strip() if motivo_tramite_obj else ''
+    tipo_movimiento_interino = ""
+    if motivo_tramite_text == "LIC. DE GRAVIDEZ":
+        tipo_movimiento_interino = "ALTA INTERINA EN GRAVIDEZ"
+    elif motivo_tramite_text == "LIC. POR PASAR A OTRO EMPLEO":
+        tipo_movimiento_interino = "ALTA INICIAL POR PROMOCIÓN O ADMISIÓN"
+    else:
+        if not fecha_efecto3 or not fecha_efecto4:
+            tipo_movimiento_interino = "FECHAS INSUFICIENTES"
         else:
-            if not fecha_efecto3 or not fecha_efecto4:
-                tipo_movimiento_interino = "FECHAS INSUFICIENTES"
-            else:
-                diferencia_meses = get_month_diff(fecha_efecto3, fecha_efecto4)
-                if motivo_tramite_text in ["LIC. PREPENSIONARIA", "PREJUBILATORIO"]:
-                    if diferencia_meses < 6:
-                        tipo_movimiento_interino = "ALTA EN PENSION"
-                    else:
-                        tipo_movimiento_interino = "ALTA PROVISIONAL"
-                elif motivo_tramite_text in ["BECA COMISIÓN", "PRORROGA DE BECA COMISION", "PRÓRROGA DE BECA COMISIÓN"]:
-                    if diferencia_meses < 6:
-                        tipo_movimiento_interino = "SUSTITUTO BECARIO"
-                    else:
-                        tipo_movimiento_interino = "ALTA PROVISIONAL"
-                elif motivo_tramite_text in ["BAJA POR DEFUNCIÓN", "LIC. POR ASUNTOS PARTICULARES", "LIC. POR COM. SINDICAL", "PRORROGA DE LIC. POR COM. SINDICAL"]:
-                    if diferencia_meses < 6:
-                        tipo_movimiento_interino = "ALTA INTERINA LIMITADA"
-                    else:
-                        tipo_movimiento_interino = "ALTA PROVISIONAL"
-                elif motivo_tramite_text == "JUBILACIÓN":
-                    if diferencia_meses < 6:
-                        tipo_movimiento_interino = "ALTA INTERINA LIMITADA EN VACANTE DEFINITIVA"
-                    else:
-                        tipo_movimiento_interino = "ALTA PROVISIONAL EN VACante DEFINITIVA"
+            diferencia_meses = get_month_diff(fecha_efecto3, fecha_efecto4)
+            if motivo_tramite_text in ["LIC. PREPENSIONARIA", "PREJUBILATORIO"]:
+                if diferencia_meses < 6:
+                    tipo_movimiento_interino = "ALTA EN PENSION"
                 else:
-                    tipo_movimiento_interino = "NO PROCEDENTE"
-        today = datetime.now()
-        meses = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
-        f_hoy = f"{today.day} de {meses[today.month - 1]} del {today.year}"
-        f_hoy_letras = convertir_fecha_a_letras(today)
-        escuela_adscripcion = None
-        if maestro_titular:
-            escuela_adscripcion = maestro_titular.id_escuela
-        escuela_adscripcion_info = get_school_info(escuela_adscripcion)
-        if escuela_adscripcion:
-            director_adscripcion_info = get_director_info(escuela_adscripcion)
-            supervisor_adscripcion_info = get_supervisor_info(escuela_adscripcion.zona_esc)
-        else:
-            director_adscripcion_info = {'nombre': 'DIRECTOR NO ENCONTRADO', 'nivel': ''}
-            supervisor_adscripcion_info = {'nombre': 'SUPERVISOR NO ENCONTRADO', 'nivel': ''}
-        escuela_pago = None
-        if maestro_titular and maestro_titular.techo_f:
-            try:
-                escuela_pago = Escuela.objects.get(id_escuela=maestro_titular.techo_f)
-            except Escuela.DoesNotExist:
-                escuela_pago = None
-        escuela_pago_info = get_school_info(escuela_pago)
-        if escuela_pago:
-            director_pago_info = get_director_info(escuela_pago)
-            supervisor_pago_info = get_supervisor_info(escuela_pago.zona_esc)
-        else:
-            director_pago_info = {'nombre': 'DIRECTOR (PAGO) NO ENCONTRADO', 'nivel': ''}
-            supervisor_pago_info = {'nombre': 'SUPERVISOR (PAGO) NO ENCONTRADO', 'nivel': ''}
-        quincena_inicial = form_data.get('quincena_inicial') or ''
-        quincena_final = form_data.get('quincena_final') or ''
-        i_dia = f"{fecha_efecto3.day:02d}" if fecha_efecto3 else ''
-        i_mes = f"{fecha_efecto3.month:02d}" if fecha_efecto3 else ''
-        i_ano = fecha_efecto3.year if fecha_efecto3 else ''
-        f_dia = f"{fecha_efecto4.day:02d}" if fecha_efecto4 else ''
-        f_mes = f"{fecha_efecto4.month:02d}" if fecha_efecto4 else ''
-        f_ano = fecha_efecto4.year if fecha_efecto4 else ''
-        no_prel = form_data.get('no_prel_display') or ''
-        folio_prel = form_data.get('folio_prel_display') or ''
-        tipo_val = form_data.get('tipo_val_display') or ''
-        quienlohizo = get_user_initials(user)
-        context = {
-            'quienlohizo': quienlohizo,
-            'Nombre_Titular': nombre_titular,
-            'CURP_Titular': curp_titular,
-            'RFC_Titular': rfc_titular,
-            'Categoria_Titular': categoria_titular,
-            'Presupuestal_Titular': presupuestal_titular,
-            'Techo_Financiero': techo_financiero_titular,
-            'Funcion_Titular': funcion_titular,
-            'Clave_CT': escuela_adscripcion_info['id_escuela'],
-            'Nombre_CT': escuela_adscripcion_info['nombre_ct'],
-            'Turno': escuela_adscripcion_info['turno'],
-            'Domicilio_CT': escuela_adscripcion_info['domicilio'],
-            'Z_economica': escuela_adscripcion_info['zona_economica'],
-            'Z_Escolar': escuela_adscripcion_info['zona_esc_numero'],
-            'Poblacion': escuela_adscripcion_info['region'],
-            'U_D': escuela_adscripcion_info['u_d'],
-            'Sostenimiento': escuela_adscripcion_info['sostenimiento'],
-            'Nom_CTCompleto': escuela_adscripcion_info['nombre_ct'],
-            'Clave_CT_Techo_F': escuela_pago_info['id_escuela'],
-            'Nombre_CT_Techo_F': escuela_pago_info['nombre_ct'],
-            'Turno_Techo_F': escuela_pago_info['turno'],
-            'Domicilio_CT_Techo_F': escuela_pago_info['domicilio'],
-            'Poblacion_Techo_F': escuela_pago_info['region'],
-            'Nom_CT_Techo_F_Completo': escuela_pago_info['nombre_ct'],
-            'T_Movimiento': motivo_movimiento,
-            'Efecto_1': fecha_efecto1.strftime("%d/%m/%Y") if fecha_efecto1 else '',
-            'Efecto_2': fecha_efecto2.strftime("%d/%m/%Y") if fecha_efecto2 else '',
-            'Efecto_3': format_date_for_solicitud_asignacion(fecha_efecto3) if plantilla_tramite.nombre == "SOLICITUD DE ASIGNACION" else (fecha_efecto3.strftime("%d/%m/%Y") if fecha_efecto3 else ''),
-            'Efecto_4': format_date_for_solicitud_asignacion(fecha_efecto4) if plantilla_tramite.nombre == "SOLICITUD DE ASIGNACION" else (fecha_efecto4.strftime("%d/%m/%Y") if fecha_efecto4 else ''),
-            'F_Hoy': f_hoy,
-            'F_OfPres': folio,
-            'COMENTARIOS': observaciones,
-            'Nombre_Interino': nombre_interino,
-            'CURP_Interino': curp_interino,
-            'RFC_Interino': rfc_interino,
-            'Dom_Particular': domicilio_part_interino,
-            'C_P_Interino': codigo_postal_interino,
-            'Poblacion_Interino': poblacion_interino,
-            'Telefono_Interino': telefono_interino,
-            'Presupuestal_Interino': presupuestal_interino,
-            'Funcion_Interino': funcion_interino,
-            'Tipo_Movimiento_Interino': tipo_movimiento_interino,
-            'Codigo_Interino': codigo_interino,
-            'Paterno': paterno_interino,
-            'Materno': materno_interino,
-            'Nombre': nombre_interino_solo,
-            'Formacion_Academica': formacion_academica_interino,
-            'No_Prel': no_prel,
-            'Folio_Prel': folio_prel,
-            'Tipo_Val': tipo_val,
-            'Supervisor': supervisor_adscripcion_info['nombre'],
-            'P_Sup': supervisor_adscripcion_info['nivel'],
-            'Director': director_adscripcion_info['nombre'],
-            'P_Dir': director_adscripcion_info['nivel'],
-            'Supervisor_Techo_F': supervisor_pago_info['nombre'],
-            'P_Sup_Techo_F': supervisor_pago_info['nivel'],
-            'Director_Techo_F': director_pago_info['nombre'],
-            'P_Dir_Techo_F': director_pago_info['nivel'],
-            'Resultado_Alta': tipo_movimiento_interino,
-            'QuincenaInicial': '',
-            'QuincenaFinal': '',
-            'Horario': maestro_titular.horario if maestro_titular else '',
-            'TipoPlaza': 'JORNADA' if (maestro_titular and maestro_titular.hrs == "00.0") else "HORA/SEMANA/MES",
-            'Horas': maestro_titular.hrs.split('.')[0] if (maestro_titular and maestro_titular.hrs and '.' in maestro_titular.hrs) else '',
-            'Nivel': 'Educación Especial',
-            'Entidad': 'DURANGO',
-            'Municipio': escuela_adscripcion_info['region'],
-            'Region': escuela_adscripcion_info['region'],
-            'ZonaEconomica': escuela_adscripcion_info['zona_economica'],
-            'Destino': '',
-            'Apreciacion': '',
-            'TipoVacante': '',
-            'NoOrdenamiento': '',
-            'FolioOrdenamiento': '',
-            'CurpInterino': curp_interino,
-            'NombreInterino': nombre_interino,
-            'Tipo': motivo_movimiento,
-            'Observaciones': observaciones,
-            'QuincenaInicio': quincena_inicial,
-            'QuincenaFinal': quincena_final,
-            'I_Dia': i_dia,
-            'I_Mes': i_mes,
-            'I_Ano': i_ano,
-            'F_Dia': f_dia,
-            'F_Mes': f_mes,
-            'F_Ano': f_ano,
-            'F_HoyLetra': f_hoy_letras,
-        }
-        doc.render(context)
-        output_base_dir = os.path.join(settings.BASE_DIR, 'tramites_generados')
-        template_name_clean = plantilla_tramite.nombre.replace(" ", "_").replace(".", "").replace("(", "").replace(")", "").replace(",", "").replace("-", "").upper()
-        subfolder_map = {
-            "REINGRESO": "reingresos",
-            "FILIACION": "filiacion",
-            "SOLICITUD_DE_ASIGNACION": "solicitud_asignacion",
-            "REINGRESO_SIN_PRELACION": "reingreso_sin_prelacion",
-            "JUSTIFICACION_DE_PERFIL": "justificacion_perfil",
-            "REPORTE_DE_VACANCIA": "reporte_vacancia",
-            "CONSTANCIAS": "constancias",
-            "CAMBIO_DEL_CENTRO_DE_TRABAJO": "cambio_ct",
-            "CUADRO_CAMBIOS_CON_FOLIO": "cuadro_cambios",
-            "PROPUESTA_DE_MOVIMIENTO": "propuesta_movimiento",
-            "OFICIO_DE_REINCORPORACION": "oficio_reincorporacion",
-        }
-        subfolder = subfolder_map.get(template_name_clean, "otros_tramites")
-        output_dir = os.path.join(output_base_dir, subfolder)
-        os.makedirs(output_dir, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"TRAMITE_{template_name_clean}_{timestamp}.docx"
-        output_path = os.path.join(output_dir, output_filename)
-        doc.save(output_path)
+                    tipo_movimiento_interino = "ALTA PROVISIONAL"
+            elif motivo_tramite_text in ["BECA COMISIÓN", "PRORROGA DE BECA COMISION", "PRÓRROGA DE BECA COMISIÓN"]:
+                if diferencia_meses < 6:
+                    tipo_movimiento_interino = "SUSTITUTO BECARIO"
+                else:
+                    tipo_movimiento_interino = "ALTA PROVISIONAL"
+            elif motivo_tramite_text in ["BAJA POR DEFUNCIÓN", "LIC. POR ASUNTOS PARTICULARES", "LIC. POR COM. SINDICAL", "PRORROGA DE LIC. POR COM. SINDICAL"]:
+                if diferencia_meses < 6:
+                    tipo_movimiento_interino = "ALTA INTERINA LIMITADA"
+                else:
+                    tipo_movimiento_interino = "ALTA PROVISIONAL"
+            elif motivo_tramite_text == "JUBILACIÓN":
+                if diferencia_meses < 6:
+                    tipo_movimiento_interino = "ALTA INTERINA LIMITADA EN VACANTE DEFINITIVA"
+                else:
+                    tipo_movimiento_interino = "ALTA PROVISIONAL EN VACante DEFINITIVA"
+            else:
+                tipo_movimiento_interino = "NO PROCEDENTE"
+    today = datetime.now()
+    meses = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
+    f_hoy = f"{today.day} de {meses[today.month - 1]} del {today.year}"
+    f_hoy_letras = convertir_fecha_a_letras(today)
+    if escuelas is None:
+        escuelas = ContextoEscuelas()
+    adscripcion = escuelas.de_escuela(maestro_titular.id_escuela if maestro_titular else None)
+    if adscripcion:
+        escuela_adscripcion_info = adscripcion['info']
+        director_adscripcion_info = adscripcion['director']
+        supervisor_adscripcion_info = adscripcion['supervisor']
+    else:
+        escuela_adscripcion_info = get_school_info(None)
+        director_adscripcion_info = {'nombre': 'DIRECTOR NO ENCONTRADO', 'nivel': ''}
+        supervisor_adscripcion_info = {'nombre': 'SUPERVISOR NO ENCONTRADO', 'nivel': ''}
+    pago = escuelas.por_cct(maestro_titular.techo_f if maestro_titular else None)
+    if pago:
+        escuela_pago_info = pago['info']
+        director_pago_info = pago['director']
+        supervisor_pago_info = pago['supervisor']
+    else:
+        escuela_pago_info = get_school_info(None)
+        director_pago_info = {'nombre': 'DIRECTOR (PAGO) NO ENCONTRADO', 'nivel': ''}
+        supervisor_pago_info = {'nombre': 'SUPERVISOR (PAGO) NO ENCONTRADO', 'nivel': ''}
+    quincena_inicial = form_data.get('quincena_inicial') or ''
+    quincena_final = form_data.get('quincena_final') or ''
+    i_dia = f"{fecha_efecto3.day:02d}" if fecha_efecto3 else ''
+    i_mes = f"{fecha_efecto3.month:02d}" if fecha_efecto3 else ''
+    i_ano = fecha_efecto3.year if fecha_efecto3 else ''
+    f_dia = f"{fecha_efecto4.day:02d}" if fecha_efecto4 else ''
+    f_mes = f"{fecha_efecto4.month:02d}" if fecha_efecto4 else ''
+    f_ano = fecha_efecto4.year if fecha_efecto4 else ''
+    no_prel = form_data.get('no_prel_display') or ''
+    folio_prel = form_data.get('folio_prel_display') or ''
+    tipo_val = form_data.get('tipo_val_display') or ''
+    quienlohizo = get_user_initials(user)
+    context = {
+        'quienlohizo': quienlohizo,
+        'Nombre_Titular': nombre_titular,
+        'CURP_Titular': curp_titular,
+        'RFC_Titular': rfc_titular,
+        'Categoria_Titular': categoria_titular,
+        'Presupuestal_Titular': presupuestal_titular,
+        'Techo_Financiero': techo_financiero_titular,
+        'Funcion_Titular': funcion_titular,
+        'Clave_CT': escuela_adscripcion_info['id_escuela'],
+        'Nombre_CT': escuela_adscripcion_info['nombre_ct'],
+        'Turno': escuela_adscripcion_info['turno'],
+        'Domicilio_CT': escuela_adscripcion_info['domicilio'],
+        'Z_economica': escuela_adscripcion_info['zona_economica'],
+        'Z_Escolar': escuela_adscripcion_info['zona_esc_numero'],
+        'Poblacion': escuela_adscripcion_info['region'],
+        'U_D': escuela_adscripcion_info['u_d'],
+        'Sostenimiento': escuela_adscripcion_info['sostenimiento'],
+        'Nom_CTCompleto': escuela_adscripcion_info['nombre_ct'],
+        'Clave_CT_Techo_F': escuela_pago_info['id_escuela'],
+        'Nombre_CT_Techo_F': escuela_pago_info['nombre_ct'],
+        'Turno_Techo_F': escuela_pago_info['turno'],
+        'Domicilio_CT_Techo_F': escuela_pago_info['domicilio'],
+        'Poblacion_Techo_F': escuela_pago_info['region'],
+        'Nom_CT_Techo_F_Completo': escuela_pago_info['nombre_ct'],
+        'T_Movimiento': motivo_movimiento,
+        'Efecto_1': fecha_efecto1.strftime("%d/%m/%Y") if fecha_efecto1 else '',
+        'Efecto_2': fecha_efecto2.strftime("%d/%m/%Y") if fecha_efecto2 else '',
+        'Efecto_3': format_date_for_solicitud_asignacion(fecha_efecto3) if plantilla_tramite.nombre == "SOLICITUD DE ASIGNACION" else (fecha_efecto3.strftime("%d/%m/%Y") if fecha_efecto3 else ''),
+        'Efecto_4': format_date_for_solicitud_asignacion(fecha_efecto4) if plantilla_tramite.nombre == "SOLICITUD DE ASIGNACION" else (fecha_efecto4.strftime("%d/%m/%Y") if fecha_efecto4 else ''),
+        'F_Hoy': f_hoy,
+        'F_OfPres': folio,
+        'COMENTARIOS': observaciones,
+        'Nombre_Interino': nombre_interino,
+        'CURP_Interino': curp_interino,
+        'RFC_Interino': rfc_interino,
+        'Dom_Particular': domicilio_part_interino,
+        'C_P_Interino': codigo_postal_interino,
+        'Poblacion_Interino': poblacion_interino,
+        'Telefono_Interino': telefono_interino,
+        'Presupuestal_Interino': presupuestal_interino,
+        'Funcion_Interino': funcion_interino,
+        'Tipo_Movimiento_Interino': tipo_movimiento_interino,
+        'Codigo_Interino': codigo_interino,
+        'Paterno': paterno_interino,
+        'Materno': materno_interino,
+        'Nombre': nombre_interino_solo,
+        'Formacion_Academica': formacion_academica_interino,
+        'No_Prel': no_prel,
+        'Folio_Prel': folio_prel,
+        'Tipo_Val': tipo_val,
+        'Supervisor': supervisor_adscripcion_info['nombre'],
+        'P_Sup': supervisor_adscripcion_info['nivel'],
+        'Director': director_adscripcion_info['nombre'],
+        'P_Dir': director_adscripcion_info['nivel'],
+        'Supervisor_Techo_F': supervisor_pago_info['nombre'],
+        'P_Sup_Techo_F': supervisor_pago_info['nivel'],
+        'Director_Techo_F': director_pago_info['nombre'],
+        'P_Dir_Techo_F': director_pago_info['nivel'],
+        'Resultado_Alta': tipo_movimiento_interino,
+        'QuincenaInicial': '',
+        'QuincenaFinal': '',
+        'Horario': maestro_titular.horario if maestro_titular else '',
+        'TipoPlaza': 'JORNADA' if (maestro_titular and maestro_titular.hrs == "00.0") else "HORA/SEMANA/MES",
+        'Horas': maestro_titular.hrs.split('.')[0] if (maestro_titular and maestro_titular.hrs and '.' in maestro_titular.hrs) else '',
+        'Nivel': 'Educación Especial',
+        'Entidad': 'DURANGO',
+        'Municipio': escuela_adscripcion_info['region'],
+        'Region': escuela_adscripcion_info['region'],
+        'ZonaEconomica': escuela_adscripcion_info['zona_economica'],
+        'Destino': '',
+        'Apreciacion': '',
+        'TipoVacante': '',
+        'NoOrdenamiento': '',
+        'FolioOrdenamiento': '',
+        'CurpInterino': curp_interino,
+        'NombreInterino': nombre_interino,
+        'Tipo': motivo_movimiento,
+        'Observaciones': observaciones,
+        'QuincenaInicio': quincena_inicial,
+        'QuincenaFinal': quincena_final,
+        'I_Dia': i_dia,
+        'I_Mes': i_mes,
+        'I_Ano': i_ano,
+        'F_Dia': f_dia,
+        'F_Mes': f_mes,
+        'F_Ano': f_ano,
+        'F_HoyLetra': f_hoy_letras,
+    }
+    return template_path, context
+
+def ruta_salida_word(plantilla_tramite, sufijo=''):
+    """Ruta del .docx generado, en la subcarpeta de tramites_generados que corresponde a la plantilla."""
+    output_base_dir = os.path.join(settings.BASE_DIR, 'tramites_generados')
+    template_name_clean = plantilla_tramite.nombre.replace(" ", "_").replace(".", "").replace("(", "").replace(")", "").replace(",", "").replace("-", "").upper()
+    subfolder_map = {
+        "REINGRESO": "reingresos",
+        "FILIACION": "filiacion",
+        "SOLICITUD_DE_ASIGNACION": "solicitud_asignacion",
+        "REINGRESO_SIN_PRELACION": "reingreso_sin_prelacion",
+        "JUSTIFICACION_DE_PERFIL": "justificacion_perfil",
+        "REPORTE_DE_VACANCIA": "reporte_vacancia",
+        "CONSTANCIAS": "constancias",
+        "CAMBIO_DEL_CENTRO_DE_TRABAJO": "cambio_ct",
+        "CUADRO_CAMBIOS_CON_FOLIO": "cuadro_cambios",
+        "PROPUESTA_DE_MOVIMIENTO": "propuesta_movimiento",
+        "OFICIO_DE_REINCORPORACION": "oficio_reincorporacion",
+    }
+    subfolder = subfolder_map.get(template_name_clean, "otros_tramites")
+    output_dir = os.path.join(output_base_dir, subfolder)
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # En lotes varios documentos se generan en el mismo segundo: el sufijo evita que se sobrescriban
+    output_filename = f"TRAMITE_{template_name_clean}_{timestamp}{f'_{sufijo}' if sufijo else ''}.docx"
+    return os.path.join(output_dir, output_filename)
+
+def datos_para_historial_tramite(cleaned_data, escuelas):
+    """Datos del formulario más los de la escuela del titular, tal como se guardan en Historial."""
+    datos_para_historial = cleaned_data.copy()
+    maestro_titular_obj = cleaned_data.get('maestro_titular')
+    adscripcion = escuelas.de_escuela(maestro_titular_obj.id_escuela if maestro_titular_obj else None)
+    escuela_info = adscripcion['info'] if adscripcion else get_school_info(None)
+    director_info = adscripcion['director'] if adscripcion else {'nombre': 'DIRECTOR NO ENCONTRADO', 'nivel': ''}
+    supervisor_info = adscripcion['supervisor'] if adscripcion else {'nombre': 'SUPERVISOR NO ENCONTRADO', 'nivel': ''}
+
+    datos_para_historial['techo_financiero_titular'] = maestro_titular_obj.techo_f if maestro_titular_obj else ''
+    datos_para_historial['clave_ct'] = escuela_info.get('id_escuela', '')
+    datos_para_historial['nombre_ct'] = escuela_info.get('nombre_ct', '')
+    datos_para_historial['turno'] = escuela_info.get('turno', '')
+    datos_para_historial['domicilio_ct'] = escuela_info.get('domicilio', '')
+    datos_para_historial['z_escolar'] = escuela_info.get('zona_esc_numero', '')
+    datos_para_historial['region'] = escuela_info.get('region', '')
+    datos_para_historial['sostenimiento'] = escuela_info.get('sostenimiento', '')
+    datos_para_historial['supervisor'] = supervisor_info.get('nombre', '')
+    datos_para_historial['director'] = director_info.get('nombre', '')
+    return datos_para_historial
+
+def generate_word_document(form_data, plantilla_tramite, user, escuelas=None):
+    try:
+        template_path, context = construir_contexto_word(form_data, plantilla_tramite, user, escuelas)
+        output_path = ruta_salida_word(plantilla_tramite)
+        renderizar_en_archivo(template_path, context, output_path)
         return True, output_path
     except Exception as e:
         print(f"Error generating Word document: {e}")
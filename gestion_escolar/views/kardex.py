@@ -1,29 +1,22 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required, permission_required
-from django.http import JsonResponse
+from django.core.paginator import Paginator
 from django.urls import reverse
-from django.db.models import Q
-from django.utils import timezone
-from datetime import datetime
 
-from ..models import Maestro, Historial, RegistroCorrespondencia, KardexMovimiento, FUP
+from ..models import Maestro, KardexEvento
+from ..datatables import SolicitudDataTables
+
+EVENTOS_POR_PAGINA = 25
 
 @login_required
 def kardex_maestros_ajax(request):
-    draw = int(request.GET.get('draw', 0))
-    start = int(request.GET.get('start', 0))
-    length = int(request.GET.get('length', 10))
-    search_value = request.GET.get('search[value]', '')
-
-    order_column_index = int(request.GET.get('order[0][column]', 0))
-    order_dir = request.GET.get('order[0][dir]', 'asc')
-    column_names = ['a_paterno', 'clave_presupuestal'] 
-    order_column = column_names[order_column_index]
-    if order_dir == 'desc':
-        order_column = f'-{order_column}'
+    column_names = ['a_paterno', 'clave_presupuestal']
+    tabla = SolicitudDataTables(request, column_names)
+    search_value = tabla.busqueda
 
     queryset = Maestro.objects.all().exclude(id_maestro__isnull=True).exclude(id_maestro='')
-    records_total = queryset.count()
+    records_total = tabla.contar(queryset, 'kardex', (Maestro,))
+    records_filtered = records_total
 
     if search_value:
         from unidecode import unidecode
@@ -50,12 +43,10 @@ def kardex_maestros_ajax(request):
 
         if where_clauses:
             queryset = queryset.extra(where=[" AND ".join(where_clauses)], params=params)
-
-    records_filtered = queryset.count()
-    queryset = queryset.order_by(order_column)[start:start + length]
+            records_filtered = tabla.contar(queryset, 'kardex', (Maestro,), filtrado=True)
 
     data = []
-    for maestro in queryset:
+    for maestro in tabla.paginar(queryset, records_filtered):
         kardex_url = reverse("kardex_maestro_detail", args=[maestro.pk]) + "?from=lista"
         actions = f'<a href="{kardex_url}" class="btn btn-sm btn-warning">Ver Kardex</a>'
         data.append([
@@ -64,13 +55,7 @@ def kardex_maestros_ajax(request):
             actions
         ])
 
-    response = {
-        'draw': draw,
-        'recordsTotal': records_total,
-        'recordsFiltered': records_filtered,
-        'data': data,
-    }
-    return JsonResponse(response)
+    return tabla.respuesta(data, records_total, records_filtered)
 
 @permission_required('gestion_escolar.acceder_kardex', raise_exception=True)
 def kardex_maestro_list(request):
@@ -84,66 +69,23 @@ def kardex_maestro_detail(request, maestro_id):
     maestro = get_object_or_404(Maestro, pk=maestro_id)
     
     from_page = request.GET.get('from', 'lista')
-    
-    timeline = []
-
-    maestro_full_name = f"{maestro.nombres or ''} {maestro.a_paterno or ''} {maestro.a_materno or ''}".strip()
-    historial_maestro = Historial.objects.filter(
-        Q(maestro=maestro) | Q(maestro_secundario_nombre=maestro_full_name)
-    ).select_related('usuario')
-    for item in historial_maestro:
-        detalle_display = item.motivo or 'Ver documento'
-        timeline.append({
-            'fecha': item.fecha_creacion,
-            'tipo': 'Trámite',
-            'descripcion': item.tipo_documento,
-            'detalle': detalle_display,
-            'usuario': item.usuario.username if item.usuario else 'Sistema',
-            'objeto': item
-        })
-
-    correspondencia_recibida = RegistroCorrespondencia.objects.filter(maestro=maestro)
-    for item in correspondencia_recibida:
-        fecha_dt_naive = datetime.combine(item.fecha_recibido, datetime.min.time())
-        fecha_dt_aware = timezone.make_aware(fecha_dt_naive, timezone.get_current_timezone())
-        timeline.append({
-            'fecha': fecha_dt_aware,
-            'tipo': 'Correspondencia',
-            'descripcion': f"Recibido: {item.get_tipo_documento_display()} de {item.remitente}",
-            'detalle': item.contenido,
-            'usuario': item.quien_recibio or 'N/A',
-            'objeto': item
-        })
-
-    movimientos_kardex = KardexMovimiento.objects.filter(maestro=maestro).select_related('usuario')
-    for item in movimientos_kardex:
-        timeline.append({
-            'fecha': item.fecha,
-            'tipo': 'Movimiento Manual',
-            'descripcion': 'Anotación en Kardex',
-            'detalle': item.descripcion,
-            'usuario': item.usuario.username if item.usuario else 'Sistema',
-            'objeto': item
-        })
-
-    fups_maestro = FUP.objects.filter(maestro=maestro).select_related('maestro')
-    for item in fups_maestro:
-        fecha_dt_naive = datetime.combine(item.fecha, datetime.min.time())
-        fecha_dt_aware = timezone.make_aware(fecha_dt_naive, timezone.get_current_timezone())
-        timeline.append({
-            'fecha': fecha_dt_aware,
-            'tipo': 'FUP',
-            'descripcion': 'Captura de FUP',
-            'detalle': f"Folio: {item.folio}",
-            'usuario': 'Sistema',
-            'objeto': item
-        })
 
-    timeline.sort(key=lambda x: x['fecha'], reverse=True)
+    # Línea de tiempo precalculada en KardexEvento (ver kardex_eventos.py), paginada por índice (maestro, fecha)
+    tipos = dict(KardexEvento.TIPO_CHOICES)
+    tipo = request.GET.get('tipo', '')
+    eventos = KardexEvento.objects.filter(maestro=maestro)
+    if tipo in tipos:
+        eventos = eventos.filter(tipo=tipo)
+    else:
+        tipo = ''
+    page_obj = Paginator(eventos.order_by('-fecha', '-id'), EVENTOS_POR_PAGINA).get_page(request.GET.get('page'))
 
     context = {
         'maestro': maestro,
-        'timeline': timeline,
+        'timeline': page_obj,
+        'page_obj': page_obj,
+        'tipos': KardexEvento.TIPO_CHOICES,
+        'tipo': tipo,
         'titulo': f'Kardex de {maestro}',
         'from_page': from_page
     }
@@ -3,10 +3,12 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.db.models import Q
-from django.http import JsonResponse
 
 from ..models import Maestro, Escuela, DocumentoExpediente
 from ..forms import MaestroForm, DocumentoExpedienteForm
+from ..busqueda import filtro_nombre
+from ..datatables import SolicitudDataTables
+from ..liderazgo import FUNCIONES_DIRECTOR, FUNCIONES_SUPERVISOR
 
 # Vistas para Maestros
 from unidecode import unidecode
@@ -18,53 +20,45 @@ def lista_maestros(request):
 
 @login_required
 def lista_maestros_ajax(request):
-    draw = int(request.GET.get('draw', 0))
-    start = int(request.GET.get('start', 0))
-    length = int(request.GET.get('length', 10))
-    search_value = request.GET.get('search[value]', '')
-
-    order_column_index = int(request.GET.get('order[0][column]', 0))
-    order_dir = request.GET.get('order[0][dir]', 'asc')
     column_names = ['id_maestro', 'a_paterno', 'id_escuela__id_escuela', 'curp', 'clave_presupuestal', 'status']
-    order_column = column_names[order_column_index]
-    if order_dir == 'desc':
-        order_column = f'-{order_column}'
+    tabla = SolicitudDataTables(request, column_names)
+    search_value = tabla.busqueda
 
     user = request.user
     if user.groups.filter(name='Directores').exists():
         try:
             maestro_director = user.maestro_profile
             queryset = Maestro.objects.filter(id_escuela=maestro_director.id_escuela)
+            alcance = f'escuela-{maestro_director.id_escuela_id}'
         except AttributeError:
             queryset = Maestro.objects.none()
+            alcance = 'ninguno'
     else:
         queryset = Maestro.objects.all()
+        alcance = 'todos'
     
     queryset = queryset.select_related('id_escuela')
     queryset = queryset.exclude(id_maestro__isnull=True).exclude(id_maestro='')
 
-    records_total = queryset.count()
+    modelos_conteo = (Maestro, Escuela)
+    records_total = tabla.contar(queryset, 'maestros', modelos_conteo, alcance)
+    records_filtered = records_total
 
     if search_value:
-        from unidecode import unidecode
-        # Normalizamos el término de búsqueda para el nombre (mayúsculas y sin acentos)
-        search_unaccented = unidecode(search_value.upper())
-
         # Búsqueda en campos que no necesitan normalización especial (o usan la entrada directa)
+        # El nombre se resuelve con el índice de trigramas (ver gestion_escolar.busqueda)
         query = Q(id_maestro__icontains=search_value) | \
                 Q(curp__icontains=search_value) | \
                 Q(rfc__icontains=search_value) | \
                 Q(clave_presupuestal__icontains=search_value) | \
                 Q(id_escuela__id_escuela__icontains=search_value) | \
-                Q(nombre_completo_unaccented__icontains=search_unaccented)
+                filtro_nombre(search_value)
 
         queryset = queryset.filter(query)
-
-    records_filtered = queryset.count()
-    queryset = queryset.order_by(order_column)[start:start + length]
+        records_filtered = tabla.contar(queryset, 'maestros', modelos_conteo, alcance, filtrado=True)
 
     data = []
-    for maestro in queryset:
+    for maestro in tabla.paginar(queryset, records_filtered):
         actions = '<div class="btn-group" role="group">'
         actions += f'<a href="{reverse('detalle_maestro', args=[maestro.pk])}" class="btn btn-sm btn-outline-info"><i class="fas fa-eye"></i></a>'
         
@@ -95,13 +89,7 @@ def lista_maestros_ajax(request):
             is_misplaced
         ])
 
-    response = {
-        'draw': draw,
-        'recordsTotal': records_total,
-        'recordsFiltered': records_filtered,
-        'data': data,
-    }
-    return JsonResponse(response)
+    return tabla.respuesta(data, records_total, records_filtered)
 
 def agregar_maestro(request):
     all_escuelas = Escuela.objects.all()
@@ -232,8 +220,8 @@ def eliminar_documento_expediente(request, doc_pk):
 # Vistas para diferentes funciones
 def lista_por_funcion(request, funcion):
     funcion_mapping = {
-        'DIRECTOR': {'display': 'Director', 'values': ['DIRECTOR', 'DIRECTOR (A)']},
-        'SUPERVISOR': {'display': 'Supervisor', 'values': ['SUPERVISOR', 'SUPERVISOR (A)', 'SUPERVISOR(A)']},
+        'DIRECTOR': {'display': 'Director', 'values': FUNCIONES_DIRECTOR},
+        'SUPERVISOR': {'display': 'Supervisor', 'values': FUNCIONES_SUPERVISOR},
         'MAESTRO_GRUPO': {'display': 'Maestro de Grupo', 'values': ['MAESTRO_GRUPO', 'MAESTRO(A) DE GRUPO', 'MAESTRO(A) DE GRUPO CON ESPECIALIDAD', 'MAESTRO(A) DE GRUPO ESPECIALISTA','MATRO(A) DE GRUPO ESPECIALISTA']},
         'DOCENTE_APOYO': {'display': 'Docente de Apoyo', 'values': ['MAESTRO(A) DE APOYO']},
         'PSICOLOGO': {'display': 'Psicólogo', 'values': ['PSICOLOGO', 'PSICÓLOGO(A)', 'PSICÓLOGO (A)']},
@@ -270,8 +258,6 @@ def lista_por_funcion(request, funcion):
         funcion_values = funcion_info['values']
         funcion_display = funcion_info['display']
 
-    print(f"DEBUG: Buscando maestros con funcion__in: {funcion_values}")
-
     trabajadores = Maestro.objects.filter(
         funcion__in=funcion_values
     ).exclude(
@@ -280,8 +266,6 @@ def lista_por_funcion(request, funcion):
         id_maestro=''
     ).order_by('a_paterno', 'a_materno', 'nombres')
 
-    print(f"DEBUG: Se encontraron {trabajadores.count()} maestros.")
-
     return render(request, 'gestion_escolar/lista_por_funcion.html', {
         'trabajadores': trabajadores,
         'funcion': funcion,
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.contrib.auth.decorators import user_passes_test
+from django.shortcuts import render
+from django.utils import timezone
+
+from ..models import MuestraRendimiento
+from ..rendimiento import resumen_por_url
+
+PERIODOS_DIAS = [1, 7, 30]
+
+
+@user_passes_test(lambda u: u.is_superuser)
+def rendimiento_view(request):
+    """Ajustes > Rendimiento: p50/p95 de duración y consultas por nombre de URL."""
+    try:
+        dias = int(request.GET.get('dias', 7))
+    except ValueError:
+        dias = 7
+    if dias not in PERIODOS_DIAS:
+        dias = 7
+
+    muestras = MuestraRendimiento.objects.filter(fecha__gte=timezone.now() - timedelta(days=dias))
+    context = {
+        'titulo': 'Rendimiento',
+        'dias': dias,
+        'periodos': PERIODOS_DIAS,
+        'filas': resumen_por_url(muestras),
+        'total_muestras': muestras.count(),
+        # Últimas peticiones con la misma consulta repetida muchas veces (posibles N+1)
+        'muestras_n1': muestras.exclude(sql_repetido='').select_related('usuario')[:20],
+    }
+    return render(request, 'gestion_escolar/ajustes/rendimiento.html', context)
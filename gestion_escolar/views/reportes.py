@@ -1,20 +1,20 @@
 import json
-import openpyxl
-from datetime import date
 
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required, permission_required
-from django.http import HttpResponse
 from django.db.models import Q, Count
-from django.db.models.functions import Upper, Trim
 
 from ..models import Maestro, Zona, Escuela, RegistroCorrespondencia # Import RegistroCorrespondencia
+from ..datatables import SolicitudDataTables
+from ..liderazgo import FUNCIONES_DIRECTOR
+from ..exportacion import COLUMNAS_MAESTRO, FICHA_MAESTRO, exportar_ficha, exportar_tabla
+from ..trabajos import encolar
+from .trabajos import exportar_tabla_en_trabajo, respuesta_encolado
 
 @permission_required('gestion_escolar.acceder_reportes', raise_exception=True)
 def reportes_dashboard(request):
     ultimos_registros_correspondencia = []
     has_correspondencia_perm = request.user.has_perm('gestion_escolar.ver_ultima_correspondencia')
-    print(f"DEBUG: User has 'ver_ultima_correspondencia' permission: {has_correspondencia_perm}")
     if has_correspondencia_perm:
         ultimos_registros_correspondencia = RegistroCorrespondencia.objects.all().order_by('-fecha_recibido', '-fecha_registro')[:5] # Get latest 5
 
@@ -24,86 +24,74 @@ def reportes_dashboard(request):
     }
     return render(request, 'gestion_escolar/reportes_dashboard.html', context)
 
+def _personal_fuera_adscripcion(filtro=''):
+    """Personal fuera de adscripción (campo indexado Maestro.desubicado), con filtro de búsqueda opcional."""
+    queryset = Maestro.objects.filter(desubicado=True)
+    if filtro:
+        queryset = queryset.filter(
+            Q(nombres__icontains=filtro) |
+            Q(a_paterno__icontains=filtro) |
+            Q(a_materno__icontains=filtro) |
+            Q(clave_presupuestal__icontains=filtro) |
+            Q(id_escuela__id_escuela__icontains=filtro) | # CCT Físico
+            Q(techo_f__icontains=filtro) # CCT de Pago
+        )
+    return queryset
+
 @login_required
 def reporte_personal_fuera_adscripcion(request):
-    personal_qs = Maestro.objects.annotate(
-        techo_f_clean=Trim(Upper('techo_f')),
-        id_escuela_clean=Trim(Upper('id_escuela__id_escuela'))
-    ).exclude(techo_f__isnull=True).exclude(techo_f='')
-
-    personal_fuera_adscripcion = [p for p in personal_qs if p.techo_f_clean != p.id_escuela_clean]
-
     context = {
-        'personal_fuera_adscripcion': personal_fuera_adscripcion,
         'titulo': 'Reporte de Personal Fuera de Adscripción'
     }
     return render(request, 'gestion_escolar/reporte_fuera_adscripcion.html', context)
 
+@login_required
+def reporte_personal_fuera_adscripcion_ajax(request):
+    column_names = [
+        'a_paterno', 'clave_presupuestal', 'id_escuela__id_escuela', 'techo_f',
+        'id_escuela__zona_esc__numero', 'id_escuela__zona_economica', 'status',
+    ]
+    tabla = SolicitudDataTables(request, column_names)
+
+    queryset = _personal_fuera_adscripcion().select_related('id_escuela', 'id_escuela__zona_esc')
+    modelos_conteo = (Maestro, Escuela)
+    records_total = tabla.contar(queryset, 'fuera_adscripcion', modelos_conteo)
+    records_filtered = records_total
+    if tabla.busqueda:
+        queryset = _personal_fuera_adscripcion(tabla.busqueda).select_related('id_escuela', 'id_escuela__zona_esc')
+        records_filtered = tabla.contar(queryset, 'fuera_adscripcion', modelos_conteo, filtrado=True)
+
+    data = []
+    for maestro in tabla.paginar(queryset, records_filtered):
+        escuela = maestro.id_escuela
+        status_class = 'success' if maestro.status in ('ACTIVO', 'ACTIVA') else 'warning'
+        data.append([
+            f'{maestro.a_paterno or ""} {maestro.a_materno or ""} {maestro.nombres or ""}',
+            maestro.clave_presupuestal or '',
+            escuela.id_escuela if escuela else '',
+            maestro.techo_f or '',
+            escuela.zona_esc.numero if escuela and escuela.zona_esc else '',
+            escuela.zona_economica if escuela else '',
+            f'<span class="badge bg-{status_class}">{maestro.get_status_display() or ""}</span>',
+        ])
+
+    return tabla.respuesta(data, records_total, records_filtered)
+
 @login_required
 def export_maestro_excel(request, pk):
     maestro = get_object_or_404(Maestro, id_maestro=pk)
-    
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Detalle_{maestro.id_maestro}"
-
-    data = {
-        "ID Maestro": maestro.id_maestro,
-        "Nombre Completo": f'{maestro.nombres} {maestro.a_paterno} {maestro.a_materno}',
-        "CURP": maestro.curp,
-        "RFC": maestro.rfc,
-        "Sexo": maestro.get_sexo_display(),
-        "Estado Civil": maestro.get_est_civil_display(),
-        "Fecha de Nacimiento": maestro.fecha_nacimiento,
-        "Techo Financiero": maestro.techo_f,
-        "C.C.T.": maestro.id_escuela.id_escuela if maestro.id_escuela else 'N/A',
-        "Nombre del Centro de Trabajo": maestro.id_escuela.nombre_ct if maestro.id_escuela else 'N/A',
-        "Zona Escolar": maestro.id_escuela.zona_esc.numero if maestro.id_escuela and maestro.id_escuela.zona_esc else 'N/A',
-        "Clave Presupuestal": maestro.clave_presupuestal,
-        "Categoría": str(maestro.categog) if maestro.categog else '',
-        "Código": maestro.codigo,
-        "Fecha de Ingreso": maestro.fecha_ingreso,
-        "Fecha de Promoción": maestro.fecha_promocion,
-        "Formación Académica": maestro.form_academica,
-        "Horario": maestro.horario,
-        "Función": maestro.get_funcion_display(),
-        "Nivel de Estudio": maestro.get_nivel_estudio_display(),
-        "Domicilio Particular": maestro.domicilio_part,
-        "Población": maestro.poblacion,
-        "Código Postal": maestro.codigo_postal,
-        "Teléfono": maestro.telefono,
-        "Email": maestro.email,
-        "Status": maestro.get_status_display(),
-        "Observaciones": maestro.observaciones,
-    }
-
-    for key, value in data.items():
-        if isinstance(value, date):
-            value = value.strftime("%d/%m/%Y")
-        ws.append([key, value])
-
-    ws.column_dimensions['A'].width = 30
-    ws.column_dimensions['B'].width = 50
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': f'attachment; filename="detalle_{maestro.a_paterno}_{maestro.id_maestro}.xlsx"'},
+    return exportar_ficha(
+        Maestro.objects.filter(pk=maestro.pk), FICHA_MAESTRO,
+        f"detalle_{maestro.a_paterno}_{maestro.id_maestro}.xlsx", f"Detalle_{maestro.id_maestro}",
     )
-    wb.save(response)
-
-    return response
-
-@login_required
-def exportar_maestros_excel(request):
-    filtro = request.GET.get('filtro', '')
-    funcion = request.GET.get('funcion', '')
 
+def _maestros_para_exportar(filtro='', funcion=''):
     maestros_qs = Maestro.objects.select_related('id_escuela', 'id_escuela__zona_esc', 'categog').all().order_by('a_paterno', 'a_materno', 'nombres')
 
     if funcion:
         # This mapping should ideally be in a more centralized place
         funcion_mapping = {
-            'DIRECTOR': {'values': ['DIRECTOR', 'DIRECTOR (A)']},
+            'DIRECTOR': {'values': FUNCIONES_DIRECTOR},
             # ... add all other mappings here ...
         }
         funcion_info = funcion_mapping.get(funcion)
@@ -123,48 +111,21 @@ def exportar_maestros_excel(request):
             Q(categog__descripcion__icontains=filtro)
         )
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Maestros"
+    return maestros_qs
 
-    headers = [
-        "ID Maestro", "Nombre(s)", "Apellido Paterno", "Apellido Materno", "RFC", "CURP",
-        "Sexo", "Estado Civil", "Fecha Nacimiento", "Techo Financiero",
-        "CCT", "Nombre del CT", "Zona Escolar", "Función", "Categoría",
-        "Clave Presupuestal", "Código", "Fecha Ingreso", "Fecha Promoción",
-        "Formación Académica", "Horario", "Nivel de Estudio", "Domicilio Particular",
-        "Población", "Código Postal", "Teléfono", "Email", "Status", "Observaciones"
-    ]
-    ws.append(headers)
-
-    for maestro in maestros_qs:
-        escuela = maestro.id_escuela
-        zona_numero = ''
-        if escuela and escuela.zona_esc:
-            zona_numero = escuela.zona_esc.numero
+@login_required
+def exportar_maestros_excel(request):
+    filtro = request.GET.get('filtro', '')
+    funcion = request.GET.get('funcion', '')
 
-        row = [
-            maestro.id_maestro, maestro.nombres, maestro.a_paterno, maestro.a_materno, maestro.rfc, maestro.curp,
-            maestro.get_sexo_display(), maestro.get_est_civil_display(),
-            maestro.fecha_nacimiento.strftime("%Y-%m-%d") if maestro.fecha_nacimiento else '',
-            maestro.techo_f, escuela.id_escuela if escuela else '', escuela.nombre_ct if escuela else '', zona_numero,
-            maestro.get_funcion_display(), maestro.categog.descripcion if maestro.categog else '',
-            maestro.clave_presupuestal, maestro.codigo,
-            maestro.fecha_ingreso.strftime("%Y-%m-%d") if maestro.fecha_ingreso else '',
-            maestro.fecha_promocion.strftime("%Y-%m-%d") if maestro.fecha_promocion else '',
-            maestro.form_academica, maestro.horario, maestro.get_nivel_estudio_display(),
-            maestro.domicilio_part, maestro.poblacion, maestro.codigo_postal, maestro.telefono, maestro.email,
-            maestro.get_status_display(), maestro.observaciones,
-        ]
-        ws.append(row)
+    # Con ?asincrono=1 el archivo lo genera un trabajador y la respuesta es el id del trabajo
+    if request.GET.get('asincrono'):
+        return respuesta_encolado(encolar('exportacion.maestros', request.user, filtro=filtro, funcion=funcion))
 
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': 'attachment; filename="reporte_maestros.xlsx"'},
-    )
-    wb.save(response)
+    return exportar_tabla(_maestros_para_exportar(filtro, funcion), COLUMNAS_MAESTRO, "reporte_maestros.xlsx", "Maestros")
 
-    return response
+def tarea_exportar_maestros(trabajo, filtro='', funcion=''):
+    return exportar_tabla_en_trabajo(trabajo, _maestros_para_exportar(filtro, funcion), COLUMNAS_MAESTRO, "reporte_maestros.xlsx", "Maestros")
 
 @login_required
 def reporte_distribucion_funcion(request):
@@ -203,77 +164,14 @@ def export_personal_fuera_adscripcion_excel(request):
     """Exporta el reporte de personal fuera de adscripción a un archivo Excel, aplicando un filtro de búsqueda."""
     filtro = request.GET.get('filtro', '')
 
-    # 1. Obtener el queryset base
-    personal_qs = Maestro.objects.annotate(
-        techo_f_clean=Trim(Upper('techo_f')),
-        id_escuela_clean=Trim(Upper('id_escuela__id_escuela'))
-    ).exclude(techo_f__isnull=True).exclude(techo_f='').select_related('id_escuela', 'id_escuela__zona_esc', 'categog')
-
-    personal_fuera_adscripcion = [p for p in personal_qs if p.techo_f_clean != p.id_escuela_clean]
-    
-    # Convertir la lista de objetos a un queryset para poder filtrar más
-    pks = [p.pk for p in personal_fuera_adscripcion]
-    queryset = Maestro.objects.filter(pk__in=pks)
+    # 1. Obtener el personal fuera de adscripción aplicando el filtro si existe
+    queryset = _personal_fuera_adscripcion(filtro)
 
-    # 2. Aplicar el filtro si existe
-    if filtro:
-        queryset = queryset.filter(
-            Q(nombres__icontains=filtro) |
-            Q(a_paterno__icontains=filtro) |
-            Q(a_materno__icontains=filtro) |
-            Q(clave_presupuestal__icontains=filtro) |
-            Q(id_escuela__id_escuela__icontains=filtro) | # CCT Físico
-            Q(techo_f__icontains=filtro) # CCT de Pago
-        )
-
-    # 3. Crear el libro de Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Personal Fuera de Adscripción"
-
-    # 4. Definir los encabezados
-    headers = [
-        "ID Maestro", "Nombre(s)", "Apellido Paterno", "Apellido Materno", "RFC", "CURP",
-        "Sexo", "Estado Civil", "Fecha Nacimiento", "Techo Financiero",
-        "CCT Físico", "Nombre del CT Físico", "Zona Escolar", "Función", "Categoría",
-        "Clave Presupuestal", "Código", "Fecha Ingreso", "Fecha Promoción",
-        "Formación Académica", "Horario", "Nivel de Estudio", "Domicilio Particular",
-        "Población", "Código Postal", "Teléfono", "Email", "Status", "Observaciones"
+    # 2. Generar el libro de Excel por streaming (CCT y nombre del CT físicos)
+    columnas = [
+        columna.renombrada(f"{columna.encabezado} Físico") if columna.encabezado in ("CCT", "Nombre del CT") else columna
+        for columna in COLUMNAS_MAESTRO
     ]
-    ws.append(headers)
-
-    # 5. Escribir los datos de cada maestro
-    for maestro in queryset:
-        escuela = maestro.id_escuela
-        zona_numero = ''
-        if escuela and escuela.zona_esc:
-            zona_numero = escuela.zona_esc.numero
-
-        row = [
-            maestro.id_maestro, maestro.nombres, maestro.a_paterno, maestro.a_materno, maestro.rfc, maestro.curp,
-            maestro.get_sexo_display(), maestro.get_est_civil_display(),
-            maestro.fecha_nacimiento.strftime("%Y-%m-%d") if maestro.fecha_nacimiento else '',
-            maestro.techo_f, 
-            escuela.id_escuela if escuela else '', 
-            escuela.nombre_ct if escuela else '', 
-            zona_numero,
-            maestro.get_funcion_display(), 
-            maestro.categog.descripcion if maestro.categog else '',
-            maestro.clave_presupuestal, maestro.codigo,
-            maestro.fecha_ingreso.strftime("%Y-%m-%d") if maestro.fecha_ingreso else '',
-            maestro.fecha_promocion.strftime("%Y-%m-%d") if maestro.fecha_promocion else '',
-            maestro.form_academica, maestro.horario, maestro.get_nivel_estudio_display(),
-            maestro.domicilio_part, maestro.poblacion, maestro.codigo_postal, maestro.telefono, maestro.email,
-            maestro.get_status_display(), maestro.observaciones,
-        ]
-        ws.append(row)
-
-    # 6. Preparar la respuesta para la descarga
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': 'attachment; filename="reporte_personal_fuera_adscripcion.xlsx"'},
+    return exportar_tabla(
+        queryset, columnas, "reporte_personal_fuera_adscripcion.xlsx", "Personal Fuera de Adscripción"
     )
-    wb.save(response)
-
-    return response
-
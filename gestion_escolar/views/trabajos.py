@@ -0,0 +1,83 @@
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from ..models import JobEjecucion
+from ..exportacion import guardar_tabla
+from ..trabajos import estado_trabajo as datos_estado_trabajo, reportar_avance
+
+DIRECTORIO_EXPORTACIONES = 'exportaciones'
+
+
+def respuesta_encolado(trabajo):
+    """Respuesta de una vista que encoló un trabajo: su id y la URL para seguir su avance."""
+    return JsonResponse({
+        'status': 'encolado',
+        'job_id': trabajo.pk,
+        'url_estado': reverse('estado_trabajo', args=[trabajo.pk]),
+    }, status=202)
+
+
+def ruta_exportacion(nombre_archivo):
+    """(ruta absoluta, ruta relativa a MEDIA_ROOT) para un archivo generado por un trabajo."""
+    directorio = os.path.join(settings.MEDIA_ROOT, DIRECTORIO_EXPORTACIONES)
+    os.makedirs(directorio, exist_ok=True)
+    return os.path.join(directorio, nombre_archivo), os.path.join(DIRECTORIO_EXPORTACIONES, nombre_archivo)
+
+
+def exportar_tabla_en_trabajo(trabajo, queryset, columnas, nombre_archivo, titulo_hoja, encabezado_resaltado=False):
+    """
+    Cuerpo común de los trabajos de exportación: guarda el Excel en MEDIA_ROOT/exportaciones
+    informando el avance y devuelve el resultado con la URL de descarga.
+    """
+    total = queryset.count()
+    reportar_avance(trabajo, 0, total, 'Generando el archivo Excel')
+
+    base, extension = os.path.splitext(nombre_archivo)
+    ruta, relativa = ruta_exportacion(f"{base}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{trabajo.pk}{extension}")
+    guardar_tabla(
+        queryset, columnas, ruta, titulo_hoja, encabezado_resaltado,
+        al_avanzar=lambda escritas: reportar_avance(trabajo, escritas),
+    )
+    reportar_avance(trabajo, total, mensaje='')
+
+    return {
+        'status': 'success',
+        'message': f'Se exportaron {total} registro(s).',
+        'archivo': relativa,
+        'nombre': nombre_archivo,
+        'url': reverse('descargar_resultado_trabajo', args=[trabajo.pk]),
+    }
+
+
+def _trabajo_del_usuario(request, job_id):
+    trabajos = JobEjecucion.objects.all()
+    if not request.user.is_superuser:
+        trabajos = trabajos.filter(usuario=request.user)
+    return get_object_or_404(trabajos, pk=job_id)
+
+
+@login_required
+def estado_trabajo(request, job_id):
+    """Estado, avance y (al terminar) resultado de un trabajo en segundo plano, en JSON."""
+    return JsonResponse(datos_estado_trabajo(_trabajo_del_usuario(request, job_id)))
+
+
+@login_required
+def descargar_resultado_trabajo(request, job_id):
+    """Descarga el archivo generado por un trabajo de exportación."""
+    trabajo = _trabajo_del_usuario(request, job_id)
+    archivo = (trabajo.resultado or {}).get('archivo') if trabajo.estado == 'COMPLETADO' else None
+    if not archivo:
+        raise Http404("El trabajo no generó ningún archivo.")
+
+    directorio = os.path.abspath(os.path.join(settings.MEDIA_ROOT, DIRECTORIO_EXPORTACIONES))
+    ruta = os.path.abspath(os.path.join(settings.MEDIA_ROOT, archivo))
+    if not ruta.startswith(directorio + os.sep) or not os.path.exists(ruta):
+        raise Http404("El archivo no fue encontrado en el servidor.")
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=trabajo.resultado.get('nombre') or os.path.basename(ruta))
@@ -1,18 +1,28 @@
+import hashlib
 import os
 import json
+from datetime import date, datetime, time, timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.http import HttpResponse, JsonResponse, FileResponse
 from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import escape
 
 from ..forms import TramiteForm
 from ..models import PlantillaTramite, Historial, MotivoTramite
+from ..busqueda import filtro_nombre
+from ..datatables import SolicitudDataTables
 
 # Import helpers from the new module
 from .helpers import (
-    generate_word_document, get_full_name, get_school_info, 
-    get_director_info, get_supervisor_info, serialize_form_data
+    ContextoEscuelas, datos_para_historial_tramite, generate_word_document,
+    get_full_name, serialize_form_data
 )
 
 # Vistas para Trámites
@@ -24,29 +34,14 @@ def generar_tramites_generales(request):
             plantilla_id = form.cleaned_data['plantilla'].id
             plantilla_tramite = PlantillaTramite.objects.get(id=plantilla_id)
 
-            success, message = generate_word_document(form.cleaned_data, plantilla_tramite, request.user)
+            # Escuela, director y supervisor se consultan una vez para el documento y el historial
+            escuelas = ContextoEscuelas()
+            success, message = generate_word_document(form.cleaned_data, plantilla_tramite, request.user, escuelas)
 
             if success:
                 try:
-                    datos_para_historial = form.cleaned_data.copy()
+                    datos_para_historial = datos_para_historial_tramite(form.cleaned_data, escuelas)
                     maestro_titular_obj = form.cleaned_data.get('maestro_titular')
-                    escuela_titular = maestro_titular_obj.id_escuela if maestro_titular_obj else None
-                    zona_esc = escuela_titular.zona_esc if escuela_titular else None
-
-                    escuela_info = get_school_info(escuela_titular)
-                    director_info = get_director_info(escuela_titular)
-                    supervisor_info = get_supervisor_info(zona_esc)
-
-                    datos_para_historial['techo_financiero_titular'] = maestro_titular_obj.techo_f if maestro_titular_obj else ''
-                    datos_para_historial['clave_ct'] = escuela_info.get('id_escuela', '')
-                    datos_para_historial['nombre_ct'] = escuela_info.get('nombre_ct', '')
-                    datos_para_historial['turno'] = escuela_info.get('turno', '')
-                    datos_para_historial['domicilio_ct'] = escuela_info.get('domicilio', '')
-                    datos_para_historial['z_escolar'] = escuela_info.get('zona_esc_numero', '')
-                    datos_para_historial['region'] = escuela_info.get('region', '')
-                    datos_para_historial['sostenimiento'] = escuela_info.get('sostenimiento', '')
-                    datos_para_historial['supervisor'] = supervisor_info.get('nombre', '')
-                    datos_para_historial['director'] = director_info.get('nombre', '')
                     
                     Historial.objects.create(
                         usuario=request.user,
@@ -55,6 +50,7 @@ def generar_tramites_generales(request):
                         ruta_archivo=message,
                         motivo=form.cleaned_data.get('motivo_tramite').motivo_tramite if form.cleaned_data.get('motivo_tramite') else '',
                         maestro_secundario_nombre=get_full_name(form.cleaned_data.get('maestro_interino')),
+                        maestro_secundario=form.cleaned_data.get('maestro_interino'),
                         datos_tramite=serialize_form_data(datos_para_historial)
                     )
                 except Exception as e:
@@ -87,29 +83,13 @@ def generar_oficios(request):
             plantilla_id = form.cleaned_data['plantilla'].id
             plantilla_tramite = PlantillaTramite.objects.get(id=plantilla_id)
 
-            success, message = generate_word_document(form.cleaned_data, plantilla_tramite, request.user)
+            # Escuela, director y supervisor se consultan una vez para el documento y el historial
+            escuelas = ContextoEscuelas()
+            success, message = generate_word_document(form.cleaned_data, plantilla_tramite, request.user, escuelas)
 
             if success:
                 try:
-                    datos_para_historial = form.cleaned_data.copy()
-                    maestro_titular_obj = form.cleaned_data.get('maestro_titular')
-                    escuela_titular = maestro_titular_obj.id_escuela if maestro_titular_obj else None
-                    zona_esc = escuela_titular.zona_esc if escuela_titular else None
-
-                    escuela_info = get_school_info(escuela_titular)
-                    director_info = get_director_info(escuela_titular)
-                    supervisor_info = get_supervisor_info(zona_esc)
-
-                    datos_para_historial['techo_financiero_titular'] = maestro_titular_obj.techo_f if maestro_titular_obj else ''
-                    datos_para_historial['clave_ct'] = escuela_info.get('id_escuela', '')
-                    datos_para_historial['nombre_ct'] = escuela_info.get('nombre_ct', '')
-                    datos_para_historial['turno'] = escuela_info.get('turno', '')
-                    datos_para_historial['domicilio_ct'] = escuela_info.get('domicilio', '')
-                    datos_para_historial['z_escolar'] = escuela_info.get('zona_esc_numero', '')
-                    datos_para_historial['region'] = escuela_info.get('region', '')
-                    datos_para_historial['sostenimiento'] = escuela_info.get('sostenimiento', '')
-                    datos_para_historial['supervisor'] = supervisor_info.get('nombre', '')
-                    datos_para_historial['director'] = director_info.get('nombre', '')
+                    datos_para_historial = datos_para_historial_tramite(form.cleaned_data, escuelas)
 
                     Historial.objects.create(
                         usuario=request.user,
@@ -118,6 +98,7 @@ def generar_oficios(request):
                         ruta_archivo=message,
                         motivo=form.cleaned_data.get('motivo_tramite').motivo_tramite if form.cleaned_data.get('motivo_tramite') else '',
                         maestro_secundario_nombre=get_full_name(form.cleaned_data.get('maestro_interino')),
+                        maestro_secundario=form.cleaned_data.get('maestro_interino'),
                         datos_tramite=serialize_form_data(datos_para_historial)
                     )
                 except Exception as e:
@@ -144,13 +125,139 @@ def generar_oficios(request):
 
 @permission_required('gestion_escolar.acceder_historial', raise_exception=True)
 def historial(request):
-    historial_items = Historial.objects.select_related('usuario', 'maestro').all().order_by('-fecha_creacion')
+    # Las filas se cargan por página desde historial_ajax; aquí solo van las opciones de los filtros
+    tipos_documento = ['Reporte de Vacancia', 'Asignación de Vacancia']
+    for nombre, tipo in PlantillaTramite.objects.order_by('nombre').values_list('nombre', 'tipo_documento'):
+        prefijo = 'Oficio' if tipo == 'OFICIO' else 'Trámite'
+        tipos_documento.append(f"{prefijo} - {nombre}")
+
     context = {
-        'historial_items': historial_items,
+        'usuarios': User.objects.order_by('username').only('id', 'username'),
+        'tipos_documento': tipos_documento,
         'titulo': 'Historial de Documentos'
     }
     return render(request, 'gestion_escolar/historial.html', context)
 
+def _filtros_historial(params):
+    """
+    Filtros de la tabla de historial a partir de los parámetros GET: rango de fechas
+    (fecha_desde/fecha_hasta, AAAA-MM-DD), usuario, tipo_documento y maestro.
+    Devuelve (Q, firma) donde la firma distingue el conjunto filtrado en el cursor y en los conteos.
+    """
+    filtros = Q()
+    firma = []
+
+    # El rango se compara contra la fecha/hora para aprovechar el índice de fecha_creacion
+    for nombre, comparacion, dias in (('fecha_desde', 'gte', 0), ('fecha_hasta', 'lt', 1)):
+        try:
+            dia = date.fromisoformat(params.get(nombre, ''))
+        except ValueError:
+            continue
+        limite = timezone.make_aware(datetime.combine(dia + timedelta(days=dias), time.min))
+        filtros &= Q(**{f'fecha_creacion__{comparacion}': limite})
+        firma.append(f'{nombre}={dia.isoformat()}')
+
+    usuario_id = params.get('usuario', '')
+    if usuario_id.isdigit():
+        filtros &= Q(usuario_id=int(usuario_id))
+        firma.append(f'usuario={usuario_id}')
+
+    tipo_documento = params.get('tipo_documento', '').strip()
+    if tipo_documento:
+        filtros &= Q(tipo_documento=tipo_documento)
+        firma.append(f'tipo={tipo_documento}')
+
+    maestro_id = params.get('maestro', '').strip()
+    if maestro_id:
+        # Como titular o como interino/secundario, ambos por índice
+        filtros &= Q(maestro_id=maestro_id) | Q(maestro_secundario_id=maestro_id)
+        firma.append(f'maestro={maestro_id}')
+
+    firma = '|'.join(firma)
+    return filtros, hashlib.md5(firma.encode('utf-8')).hexdigest()[:16] if firma else ''
+
+def _celda_observaciones(item):
+    observaciones = escape(item.observaciones or '')
+    return f'''
+        <div class="observacion-display">
+            {observaciones or 'Sin observaciones'}
+            <button class="btn btn-link btn-sm btn-edit-observacion"><i class="fas fa-pencil-alt"></i></button>
+        </div>
+        <div class="observacion-edit" style="display: none;">
+            <textarea class="form-control">{observaciones}</textarea>
+            <button class="btn btn-success btn-sm mt-1 btn-save-observacion">Guardar</button>
+            <button class="btn btn-secondary btn-sm mt-1 btn-cancel-observacion">Cancelar</button>
+        </div>'''
+
+def _acciones_historial(item):
+    acciones = '<div class="btn-group" role="group">'
+    if item.lote_reporte_id and item.tipo_documento in ('Reporte de Vacancia', 'Asignación de Vacancia'):
+        acciones += f'<a href="{reverse("historial_detalle_lote", args=[item.id])}" class="btn btn-sm btn-outline-info" title="Ver Detalles"><i class="fas fa-eye"></i></a>'
+    elif item.tipo_documento.startswith(('Trámite -', 'Oficio -')):
+        acciones += f'<a href="{reverse("historial_detalle_tramite", args=[item.id])}" class="btn btn-sm btn-outline-info" title="Ver Detalles"><i class="fas fa-eye"></i></a>'
+    if item.ruta_archivo or (item.lote_reporte and item.lote_reporte.archivo_generado):
+        acciones += f'<a href="{reverse("descargar_archivo_historial", args=[item.id])}" class="btn btn-sm btn-outline-primary" target="_blank" title="Descargar"><i class="fas fa-download"></i></a>'
+    acciones += (
+        f'<button class="btn btn-sm btn-outline-danger btn-delete-historial" data-item-id="{item.id}" title="Eliminar">'
+        '<i class="fas fa-trash"></i></button>'
+    )
+    return acciones + '</div>'
+
+@permission_required('gestion_escolar.acceder_historial', raise_exception=True)
+def historial_ajax(request):
+    column_names = [
+        'usuario__username', 'fecha_creacion', 'tipo_documento', 'maestro__a_paterno',
+        'maestro_secundario_nombre', 'maestro__clave_presupuestal', 'motivo', 'observaciones',
+    ]
+    filtros, firma_filtros = _filtros_historial(request.GET)
+    tabla = SolicitudDataTables(request, column_names, extra=firma_filtros)
+    search_value = tabla.busqueda
+
+    queryset = Historial.objects.select_related('usuario', 'maestro', 'lote_reporte')
+    records_total = tabla.contar(queryset, 'historial', (Historial,))
+    records_filtered = records_total
+
+    if firma_filtros:
+        queryset = queryset.filter(filtros)
+        records_filtered = tabla.contar(queryset, 'historial', (Historial,), alcance=firma_filtros)
+
+    if search_value:
+        query = Q(tipo_documento__icontains=search_value) | \
+                Q(usuario__username__icontains=search_value) | \
+                Q(maestro_secundario_nombre__icontains=search_value) | \
+                Q(motivo__icontains=search_value) | \
+                Q(observaciones__icontains=search_value)
+
+        # Nombre del maestro: todas las palabras, por el índice de trigramas
+        nombre_query = Q()
+        for word in search_value.split():
+            nombre_query &= filtro_nombre(word, campo='maestro')
+        queryset = queryset.filter(query | nombre_query)
+        records_filtered = tabla.contar(queryset, 'historial', (Historial,), alcance=firma_filtros, filtrado=True)
+
+    data = []
+    for item in tabla.paginar(queryset, records_filtered):
+        if item.tipo_documento == "Reporte de Vacancia":
+            maestro, interino, clave = 'Múltiples', 'N/A', 'N/A'
+        else:
+            maestro = escape(item.maestro) if item.maestro else 'N/A'
+            interino = escape(item.maestro_secundario_nombre or 'N/A')
+            clave = escape((item.maestro.clave_presupuestal if item.maestro else None) or 'N/A')
+        data.append({
+            'DT_RowData': {'item-id': item.id},
+            'usuario': escape(item.usuario.username) if item.usuario else 'N/A',
+            'fecha': timezone.localtime(item.fecha_creacion).strftime('%d/%m/%Y %H:%M'),
+            'tipo_documento': escape(item.tipo_documento),
+            'maestro': maestro,
+            'interino': interino,
+            'clave_presupuestal': clave,
+            'motivo': escape(item.motivo or 'N/A'),
+            'observaciones': _celda_observaciones(item),
+            'acciones': _acciones_historial(item),
+        })
+
+    return tabla.respuesta(data, records_total, records_filtered)
+
 @login_required
 def historial_detalle_lote(request, historial_id):
     historial_item = get_object_or_404(Historial, id=historial_id)
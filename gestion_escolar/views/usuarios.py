@@ -13,6 +13,7 @@ import json
 
 from ..user_forms import UserCreationFormCustom, UserUpdateFormCustom, AdminPasswordChangeForm
 from ..models import Maestro
+from ..datatables import SolicitudDataTables
 
 
 def is_admin_user(user):
@@ -232,23 +233,13 @@ class UserPasswordChangeView(LoginRequiredMixin, AdminRequiredMixin, UpdateView)
 def user_datatable_ajax(request):
     """Endpoint AJAX para DataTable de usuarios"""
     
-    # Parámetros de DataTable
-    draw = int(request.GET.get('draw', 1))
-    start = int(request.GET.get('start', 0))
-    length = int(request.GET.get('length', 10))
-    search_value = request.GET.get('search[value]', '')
-    order_column_index = int(request.GET.get('order[0][column]', 0))
-    order_dir = request.GET.get('order[0][dir]', 'asc')
-    
     # Filtro por estado
     estado = request.GET.get('estado', 'todos')
     
-    # Columnas para ordenamiento
+    # Parámetros de DataTable (columnas para ordenamiento)
     columns = ['username', 'first_name', 'email', 'is_active', 'date_joined', 'last_login']
-    order_column = columns[order_column_index] if order_column_index < len(columns) else 'username'
-    
-    if order_dir == 'desc':
-        order_column = f'-{order_column}'
+    tabla = SolicitudDataTables(request, columns, extra=estado)
+    search_value = tabla.busqueda
     
     # Construir queryset
     queryset = User.objects.all()
@@ -276,12 +267,9 @@ def user_datatable_ajax(request):
     total_records = User.objects.count()
     filtered_records = queryset.count()
     
-    # Aplicar ordenamiento y paginación
-    queryset = queryset.order_by(order_column)[start:start + length]
-    
-    # Construir datos
+    # Construir datos de la página (ordenamiento y paginación por keyset)
     data = []
-    for user in queryset:
+    for user in tabla.paginar(queryset.prefetch_related('groups'), filtered_records, exacto=True):
         # Obtener grupos
         grupos = ', '.join([g.name for g in user.groups.all()]) or 'Sin grupo'
         
@@ -336,12 +324,7 @@ def user_datatable_ajax(request):
             'acciones': acciones
         })
     
-    return JsonResponse({
-        'draw': draw,
-        'recordsTotal': total_records,
-        'recordsFiltered': filtered_records,
-        'data': data
-    })
+    return tabla.respuesta(data, total_records, filtered_records)
 
 
 @login_required
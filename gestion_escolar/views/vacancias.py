@@ -1,6 +1,6 @@
+import logging
 import os
-import openpyxl
-from datetime import datetime, date
+from datetime import datetime
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
@@ -10,10 +10,21 @@ from django.db import transaction
 from django.urls import reverse
 from django.conf import settings
 
-from ..models import LoteReporteVacancia, Vacancia, Prelacion, MotivoTramite, PlantillaTramite, Historial
+from ..models import LoteReporteVacancia, Vacancia, MotivoTramite, PlantillaTramite, Historial
 from ..forms import VacanciaForm
+from ..busqueda_texto import indexar_objetos
+from ..datatables import invalidar_conteos
+from ..kardex_eventos import sincronizar_eventos
+from ..identificadores import buscar_prelacion, normalizar_clave, prelaciones_por_curp
+from ..hojas_calculo import EscritorHoja, ErrorHojaCalculo
+from ..plantillas_excel import FORMATO_VACANCIA_USICAMM, guardar_desde_plantilla
+from ..plantillas_word import renderizar_lote
+from ..trabajos import encolar, reportar_avance
 
-from .helpers import get_month_diff, get_full_name, send_to_google_sheet, generate_word_document, serialize_form_data, format_date_for_solicitud_asignacion
+from .trabajos import respuesta_encolado
+from .helpers import ContextoEscuelas, get_month_diff, get_full_name, construir_contexto_word, ruta_salida_word, serialize_form_data, format_date_for_solicitud_asignacion
+
+logger = logging.getLogger(__name__)
 
 @permission_required('gestion_escolar.acceder_vacancias', raise_exception=True)
 def gestionar_lote_vacancia(request):
@@ -48,7 +59,7 @@ def gestionar_lote_vacancia(request):
                 vacancia.nombre_interino = f'{maestro_interino_obj.nombres} {maestro_interino_obj.a_paterno} {maestro_interino_obj.a_materno}'
                 vacancia.curp_interino = maestro_interino_obj.curp
                 if maestro_interino_obj.curp:
-                    prelacion = Prelacion.objects.filter(curp=maestro_interino_obj.curp).first()
+                    prelacion = buscar_prelacion(maestro_interino_obj.curp)
                     if prelacion:
                         vacancia.posicion_orden = prelacion.pos_orden
                         vacancia.folio_prelacion = prelacion.folio
@@ -92,6 +103,7 @@ def gestionar_lote_vacancia(request):
                 tipo_documento="Asignación de Vacancia",
                 maestro=vacancia.maestro_titular,
                 maestro_secundario_nombre=get_full_name(vacancia.maestro_interino) if vacancia.maestro_interino else '',
+                maestro_secundario=vacancia.maestro_interino,
                 ruta_archivo="",
                 motivo="Asignación de Vacancia",
                 lote_reporte=lote,
@@ -129,92 +141,176 @@ def _get_lote_y_vacancias(request, lote_id):
     lote.save()
     return lote, vacancias
 
-@login_required
-@transaction.atomic
-def exportar_paso_word(request, lote_id):
+def _instantanea_lote(lote_id):
+    """
+    Lote y sus vacancias en orden de captura, con todo lo que usan los pasos de Word,
+    Google Sheets y Excel, en una sola consulta. Cada vacancia trae `ordinal`, su
+    posición (desde 1) dentro del lote.
+    """
+    lote = LoteReporteVacancia.objects.get(id=lote_id)
+    vacancias = list(
+        lote.vacancias.select_related(
+            'apreciacion', 'maestro_interino',
+            'maestro_titular__id_escuela__zona_esc', 'maestro_titular__categog',
+        ).order_by('id')
+    )
+    for ordinal, vacancia in enumerate(vacancias, start=1):
+        vacancia.ordinal = ordinal
+    return lote, vacancias
+
+def _con_interino_y_fechas(vacancia):
+    return vacancia.maestro_interino_id is not None and vacancia.fecha_inicio and vacancia.fecha_final
+
+def _datos_word_vacancia(vacancia, plantilla, motivo_tramite_obj, tipo_val_display):
+    return {
+        'plantilla': plantilla,
+        'maestro_titular': vacancia.maestro_titular,
+        'maestro_interino': vacancia.maestro_interino,
+        'fecha_efecto1': vacancia.fecha_inicio,
+        'fecha_efecto2': vacancia.fecha_final,
+        'fecha_efecto3': vacancia.fecha_inicio,
+        'fecha_efecto4': vacancia.fecha_final,
+        'folio': vacancia.folio_prelacion,
+        'observaciones': vacancia.observaciones,
+        'no_prel_display': vacancia.posicion_orden,
+        'folio_prel_display': vacancia.folio_prelacion,
+        'motivo_tramite': motivo_tramite_obj,
+        'tipo_val_display': tipo_val_display,
+    }
+
+def _encolar_paso(request, lote_id, tipo):
     try:
-        lote, vacancias = _get_lote_y_vacancias(request, lote_id)
+        lote, _ = _get_lote_y_vacancias(request, lote_id)
     except ValueError as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return respuesta_encolado(encolar(tipo, request.user, lote_id=lote.id))
+
+@login_required
+def exportar_paso_word(request, lote_id):
+    return _encolar_paso(request, lote_id, 'vacancias.paso_word')
+
+@login_required
+def exportar_paso_gsheets(request, lote_id):
+    return _encolar_paso(request, lote_id, 'vacancias.paso_gsheets')
+
+@login_required
+def exportar_paso_excel(request, lote_id):
+    return _encolar_paso(request, lote_id, 'vacancias.paso_excel')
+
+def tarea_paso_word(trabajo, lote_id):
+    """
+    Genera las solicitudes de asignación de las vacancias de corta duración con interino.
+    Los datos se consultan de una vez, los documentos se renderizan en paralelo
+    (plantillas_word.renderizar_lote) y los registros de Historial se crean al final en
+    bloque. El avance por documento queda en el trabajo (trabajos.reportar_avance).
+    """
+    lote, vacancias = _instantanea_lote(lote_id)
+    usuario = trabajo.usuario
 
     plantilla_solicitud_asignacion = PlantillaTramite.objects.filter(nombre="SOLICITUD DE ASIGNACION").first()
-    documentos_word_generados = 0
-    word_docs_info = []
 
     if not plantilla_solicitud_asignacion:
-        return JsonResponse({'status': 'warning', 'message': 'Plantilla "SOLICITUD DE ASIGNACION" no encontrada. Saltando paso de Word.', 'word_count': 0, 'word_docs': []})
-
+        return {'status': 'warning', 'message': 'Plantilla "SOLICITUD DE ASIGNACION" no encontrada. Saltando paso de Word.', 'word_count': 0, 'word_docs': []}
+
+    vacancias = [
+        vacancia for vacancia in vacancias
+        if _con_interino_y_fechas(vacancia) and get_month_diff(vacancia.fecha_inicio, vacancia.fecha_final) <= 3
+    ]
+
+    # Motivos y prelaciones de todo el lote en una consulta cada uno (el primero, como .first())
+    motivos = {}
+    for motivo in MotivoTramite.objects.filter(motivo_tramite__in={v.tipo_movimiento_original for v in vacancias}):
+        motivos.setdefault(motivo.motivo_tramite, motivo)
+    prelaciones = prelaciones_por_curp({v.maestro_interino.curp for v in vacancias if v.maestro_interino.curp})
+
+    # Escuelas de adscripción y de pago de todo el lote, con director y supervisor, en una consulta
+    escuelas = ContextoEscuelas()
+    escuelas.precargar(
+        {v.maestro_titular.id_escuela.id_escuela for v in vacancias if v.maestro_titular.id_escuela}
+        | {v.maestro_titular.techo_f for v in vacancias if v.maestro_titular.techo_f}
+    )
+
+    datos_por_vacancia = {}
+    documentos = []
     for vacancia in vacancias:
-        if vacancia.maestro_interino and vacancia.fecha_inicio and vacancia.fecha_final:
-            duration_months = get_month_diff(vacancia.fecha_inicio, vacancia.fecha_final)
-            if duration_months <= 3:
-                form_data_for_word = {
-                    'plantilla': plantilla_solicitud_asignacion,
-                    'maestro_titular': vacancia.maestro_titular,
-                    'maestro_interino': vacancia.maestro_interino,
-                    'fecha_efecto1': vacancia.fecha_inicio, 
-                    'fecha_efecto2': vacancia.fecha_final,
-                    'fecha_efecto3': vacancia.fecha_inicio, 
-                    'fecha_efecto4': vacancia.fecha_final,
-                    'folio': vacancia.folio_prelacion, 
-                    'observaciones': vacancia.observaciones,
-                    'no_prel_display': vacancia.posicion_orden, 
-                    'folio_prel_display': vacancia.folio_prelacion,
-                }
-                
-                motivo_tramite_obj = MotivoTramite.objects.filter(motivo_tramite=vacancia.tipo_movimiento_original).first()
-                form_data_for_word['motivo_tramite'] = motivo_tramite_obj
-                
-                tipo_val_display = ''
-                if vacancia.maestro_interino.curp:
-                    prelacion = Prelacion.objects.filter(curp=vacancia.maestro_interino.curp).first()
-                    if prelacion:
-                        tipo_val_display = prelacion.tipo_val
-                form_data_for_word['tipo_val_display'] = tipo_val_display
-
-                success, doc_path = generate_word_document(form_data_for_word, plantilla_solicitud_asignacion, request.user)
-                if success:
-                    try:
-                        historial_word = Historial.objects.create(
-                            usuario=request.user,
-                            tipo_documento=f"Oficio - {plantilla_solicitud_asignacion.nombre}",
-                            maestro=vacancia.maestro_titular,
-                            ruta_archivo=doc_path,
-                            motivo=motivo_tramite_obj.motivo_tramite if motivo_tramite_obj else '',
-                            maestro_secundario_nombre=get_full_name(vacancia.maestro_interino),
-                            datos_tramite=serialize_form_data(form_data_for_word)
-                        )
-                        word_docs_info.append({
-                            'id': historial_word.id,
-                            'nombre': os.path.basename(doc_path),
-                            'url': reverse('descargar_archivo_historial', args=[historial_word.id])
-                        })
-                        documentos_word_generados += 1
-                    except Exception as e:
-                        print(f"DEBUG: ❌ Error creando historial para Word: {e}")
-    
-    return JsonResponse({
+        form_data_for_word = _datos_word_vacancia(
+            vacancia, plantilla_solicitud_asignacion,
+            motivos.get(vacancia.tipo_movimiento_original),
+            getattr(prelaciones.get(normalizar_clave(vacancia.maestro_interino.curp)), 'tipo_val', ''),
+        )
+        try:
+            ruta_plantilla, contexto = construir_contexto_word(form_data_for_word, plantilla_solicitud_asignacion, usuario, escuelas)
+        except Exception as e:
+            logger.warning("Error preparando Word para la vacancia %s: %s", vacancia.pk, e)
+            continue
+        datos_por_vacancia[vacancia.pk] = (vacancia, form_data_for_word)
+        documentos.append((vacancia.pk, ruta_plantilla, contexto, ruta_salida_word(plantilla_solicitud_asignacion, sufijo=vacancia.pk)))
+
+    reportar_avance(trabajo, 0, len(documentos), 'Generando documentos Word')
+
+    rutas_generadas = {}
+    errores = 0
+    for completados, (vacancia_id, doc_path, error) in enumerate(renderizar_lote(documentos), start=1):
+        if error:
+            errores += 1
+            logger.warning("Error generando Word para la vacancia %s: %s", vacancia_id, error)
+        else:
+            rutas_generadas[vacancia_id] = doc_path
+        reportar_avance(trabajo, completados, mensaje=f'{errores} error(es)' if errores else None)
+
+    # Los documentos terminan en cualquier orden; el historial se registra en el orden del lote
+    historiales = []
+    for vacancia_id, (vacancia, form_data_for_word) in datos_por_vacancia.items():
+        if vacancia_id not in rutas_generadas:
+            continue
+        motivo_tramite_obj = form_data_for_word['motivo_tramite']
+        historiales.append(Historial(
+            usuario=usuario,
+            tipo_documento=f"Oficio - {plantilla_solicitud_asignacion.nombre}",
+            maestro=vacancia.maestro_titular,
+            ruta_archivo=rutas_generadas[vacancia_id],
+            motivo=motivo_tramite_obj.motivo_tramite if motivo_tramite_obj else '',
+            maestro_secundario_nombre=get_full_name(vacancia.maestro_interino),
+            maestro_secundario=vacancia.maestro_interino,
+            datos_tramite=serialize_form_data(form_data_for_word)
+        ))
+
+    with transaction.atomic():
+        historiales = Historial.objects.bulk_create(historiales)
+        indexar_objetos(historiales)
+        sincronizar_eventos(historiales)
+        # bulk_create no dispara la señal que invalida los conteos de la tabla de historial
+        invalidar_conteos(Historial)
+
+    word_docs_info = [{
+        'id': historial_word.id,
+        'nombre': os.path.basename(historial_word.ruta_archivo),
+        'url': reverse('descargar_archivo_historial', args=[historial_word.id])
+    } for historial_word in historiales]
+    documentos_word_generados = len(word_docs_info)
+
+    return {
         'status': 'success',
         'message': f'Se generaron {documentos_word_generados} documento(s) Word.',
         'word_count': documentos_word_generados,
         'word_docs': word_docs_info
-    })
+    }
 
-@login_required
-@transaction.atomic
-def exportar_paso_gsheets(request, lote_id):
-    try:
-        lote, vacancias = _get_lote_y_vacancias(request, lote_id)
-    except ValueError as e:
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+def tarea_paso_gsheets(trabajo, lote_id):
+    # Sin transacción: el envío puede reintentar durante ~30 s y en SQLite una transacción
+    # abierta bloquearía las escrituras de las peticiones web todo ese tiempo.
+    lote, vacancias = _instantanea_lote(lote_id)
 
     vacancias_enviadas = 0
     errores_gsheets = []
+    escritor = EscritorHoja()
+    hoy = datetime.now().strftime("%Y-%m-%d")
     for vacancia in vacancias:
-        if vacancia.maestro_interino and vacancia.fecha_inicio and vacancia.fecha_final:
+        if _con_interino_y_fechas(vacancia):
             google_sheet_row_data = [
-                str(vacancias.filter(id__lte=vacancia.id).count()),
-                datetime.now().strftime("%Y-%m-%d"),
+                # Posición dentro del lote (antes un COUNT por fila)
+                str(vacancia.ordinal),
+                hoy,
                 "EDUCACIÓN ESPECIAL",
                 "Durango",
                 vacancia.municipio or '',
@@ -248,100 +344,50 @@ def exportar_paso_gsheets(request, lote_id):
                 f"DEE/{vacancia.folio_prelacion}/2025" if vacancia.folio_prelacion else '',
                 '', '',
             ]
-            success_gs, message_gs = send_to_google_sheet(google_sheet_row_data)
-            if not success_gs:
-                error_msg = f"Fallo al enviar datos del interino '{get_full_name(vacancia.maestro_interino)}': {message_gs}"
-                errores_gsheets.append(error_msg)
-            else:
-                vacancias_enviadas += 1
-    
+            escritor.agregar(google_sheet_row_data)
+
+    # Todo el lote se envía en una sola llamada a la API
+    try:
+        vacancias_enviadas = escritor.enviar()
+    except ErrorHojaCalculo as e:
+        errores_gsheets.append(f"Fallo al enviar los datos de {len(escritor.filas)} vacancia(s): {e}")
+
     mensaje_final = f'Se enviaron datos de {vacancias_enviadas} vacancia(s) a Google Sheets.'
     if errores_gsheets:
         mensaje_final += f' Hubo {len(errores_gsheets)} error(es).'
 
-    return JsonResponse({
+    return {
         'status': 'success',
         'message': mensaje_final,
         'gsheets_count': vacancias_enviadas,
         'gsheets_errors': errores_gsheets
-    })
+    }
 
-@login_required
-@transaction.atomic
-def exportar_paso_excel(request, lote_id):
+def tarea_paso_excel(trabajo, lote_id):
+    lote, vacancias = _instantanea_lote(lote_id)
     try:
-        lote, vacancias = _get_lote_y_vacancias(request, lote_id)
-        
-        template_path = os.path.join(settings.BASE_DIR, 'tramites', 'Plantillas', 'Excel', 'FORMATOVACANCIAUSICAMM.xlsx')
-        
-        if not os.path.exists(template_path):
-            raise FileNotFoundError(f"No se encontró el template en la ruta: {template_path}")
-
-        workbook = openpyxl.load_workbook(template_path)
-        sheet = workbook.active
-        
-        row_num = 2
-        campos_excel = [
-            'nivel', 'entidad', 'municipio', 'direccion', 'region', 'zona_economica', 'destino', 'apreciacion',
-            'tipo_vacante', 'tipo_plaza', 'horas', 'sostenimiento', 'fecha_inicio', 'fecha_final', 'categoria',
-            'pseudoplaza', 'clave_presupuestal', 'techo_financiero', 'clave_ct', 'turno', 'tipo_movimiento_reporte', 'observaciones',
-            'posicion_orden', 'folio_prelacion', 'curp_interino', 'nombre_interino'
-        ]
-        
-        for vacancia in vacancias:
-            for i, field_name in enumerate(campos_excel):
-                cell = sheet.cell(row=row_num, column=i + 1)
-                valor = ''
-                
-                try:
-                    if field_name == 'curp_interino': 
-                        valor = vacancia.maestro_interino.curp if vacancia.maestro_interino else vacancia.curp_interino or ''
-                    elif field_name == 'nombre_interino': 
-                        valor = get_full_name(vacancia.maestro_interino) if vacancia.maestro_interino else vacancia.nombre_interino or ''
-                    elif field_name == 'apreciacion': 
-                        valor = vacancia.apreciacion.descripcion if vacancia.apreciacion else ''
-                    elif field_name == 'tipo_vacante': 
-                        valor = vacancia.get_tipo_vacante_display().capitalize() if vacancia.tipo_vacante else ''
-                    elif field_name == 'zona_economica':
-                        valor = getattr(vacancia, field_name, '') or ''
-                        if valor == 'Zona II':
-                            valor = 'Zona 2'
-                        elif valor == 'Zona III':
-                            valor = 'Zona 3'
-                    else: 
-                        valor = getattr(vacancia, field_name, '') or ''
-                        
-                    if field_name in ['fecha_inicio', 'fecha_final'] and valor and isinstance(valor, (datetime, date)):
-                        valor = valor.strftime("%Y-%m-%d")
-                            
-                except Exception as field_error:
-                    valor = f"Error: {field_error}"
-                
-                cell.value = valor
-                
-            row_num += 1
-
         output_dir = os.path.join(settings.MEDIA_ROOT, 'reportes_vacancias')
         os.makedirs(output_dir, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_filename = f"VACANCIA_{timestamp}.xlsx"
         output_path_server = os.path.join(output_dir, output_filename)
-        
-        workbook.save(output_path_server)
-
-        historial_excel = Historial.objects.create(
-            usuario=request.user, 
-            tipo_documento="Reporte de Vacancia", 
-            maestro=None,
-            ruta_archivo=output_path_server, 
-            motivo="Reporte de Vacancia", 
-            lote_reporte=lote
-        )
-        
-        lote.archivo_generado = os.path.join('reportes_vacancias', output_filename)
-        lote.estado = 'GENERADO'
-        lote.fecha_generado = datetime.now()
-        lote.save()
+
+        guardar_desde_plantilla(FORMATO_VACANCIA_USICAMM, vacancias, output_path_server)
+
+        with transaction.atomic():
+            historial_excel = Historial.objects.create(
+                usuario=trabajo.usuario, 
+                tipo_documento="Reporte de Vacancia", 
+                maestro=None,
+                ruta_archivo=output_path_server, 
+                motivo="Reporte de Vacancia", 
+                lote_reporte=lote
+            )
+            
+            lote.archivo_generado = os.path.join('reportes_vacancias', output_filename)
+            lote.estado = 'GENERADO'
+            lote.fecha_generado = datetime.now()
+            lote.save()
 
         response_data = {
             'status': 'success',
@@ -350,17 +396,15 @@ def exportar_paso_excel(request, lote_id):
             'excel_name': output_filename
         }
 
-        return JsonResponse(response_data)
+        return response_data
+
+    except Exception:
+        logger.exception("Error generando el Excel del lote %s", lote.pk)
 
-    except Exception as e:
-        import traceback
-        print(f"DEBUG: ❌ Error generando Excel: {str(e)}")
-        print(f"DEBUG: Traceback completo: {traceback.format_exc()}")
-        
-        messages.error(request, f"Error al generar el archivo Excel: {str(e)}")
+        # El lote vuelve a quedar editable; el error queda en el trabajo
         lote.estado = 'EN_PROCESO'
         lote.save()
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        raise
 
 @login_required
 def eliminar_vacancia_lote(request, pk):